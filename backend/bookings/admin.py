@@ -1,9 +1,16 @@
-from django.contrib import admin
+import json
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.utils import timezone
 from django.utils.html import format_html
 from django_jalali.admin.filters import JDateFieldListFilter
 from unfold.admin import ModelAdmin
 from unfold.decorators import action, display
-from .models import Space, Booking, Availability, AuditLog, Seat
+from .models import (
+    Space, Booking, BookingSeries, Availability, AuditLog, Seat, DailyStats, OutboxMessage, ArchivedBooking
+)
+from .services import BookingService, SeriesService
+from . import archive, catalog
 
 class SeatInline(admin.TabularInline):
     model = Seat
@@ -24,10 +31,12 @@ class SpaceAdmin(ModelAdmin):
     @action(description='Mark selected spaces as active')
     def make_active(self, request, queryset):
         queryset.update(is_active=True)
+        catalog.bump()
 
     @action(description='Mark selected spaces as inactive')
     def make_inactive(self, request, queryset):
         queryset.update(is_active=False)
+        catalog.bump()
 
 @admin.register(Seat)
 class SeatAdmin(ModelAdmin):
@@ -40,7 +49,8 @@ class BookingAdmin(ModelAdmin):
     list_display = ('full_name', 'mobile', 'seat', 'booking_type', 'start_date_jalali', 'status_colored')
     list_filter = ('status', 'seat__space__type', 'gender', ('start_date_jalali', JDateFieldListFilter))
     search_fields = ('full_name', 'national_id', 'mobile', 'email')
-    readonly_fields = ('id', 'created_at', 'updated_at')
+    readonly_fields = ('id', 'confirmation_sent_at', 'confirmation_attempts', 'confirmation_error',
+                       'reminder_sent_at', 'reminder_attempts', 'created_at', 'updated_at')
     date_hierarchy = 'start_date_jalali'
     actions = ['mark_confirmed', 'mark_cancelled', 'mark_completed']
 
@@ -59,17 +69,50 @@ class BookingAdmin(ModelAdmin):
             obj.get_status_display()
         )
 
+    def _set_status(self, request, queryset, status):
+        try:
+            changed = BookingService.bulk_update_status(
+                queryset,
+                status,
+                changed_by=request.user.get_username(),
+                notes="Bulk admin action"
+            )
+        except ValidationError as e:
+            self.message_user(request, f"Nothing was changed: {' '.join(e.messages)}", level=messages.ERROR)
+            return
+        self.message_user(request, f"{changed} booking(s) marked as {status}.")
+
     @action(description='Mark selected bookings as Confirmed')
     def mark_confirmed(self, request, queryset):
-        queryset.update(status='confirmed')
+        self._set_status(request, queryset, 'confirmed')
 
     @action(description='Mark selected bookings as Cancelled')
     def mark_cancelled(self, request, queryset):
-        queryset.update(status='cancelled')
+        self._set_status(request, queryset, 'cancelled')
 
     @action(description='Mark selected bookings as Completed')
     def mark_completed(self, request, queryset):
-        queryset.update(status='completed')
+        self._set_status(request, queryset, 'completed')
+
+@admin.register(BookingSeries)
+class BookingSeriesAdmin(ModelAdmin):
+    list_display = ('full_name', 'seat', 'frequency', 'interval', 'start_date_jalali', 'until_date_jalali',
+                    'materialized_until', 'status')
+    list_filter = ('status', 'frequency', 'seat__space')
+    search_fields = ('full_name', 'national_id', 'mobile', 'email')
+    readonly_fields = ('id', 'materialized_until', 'created_at', 'updated_at')
+    actions = ['cancel_series']
+
+    # Series are created through the API so every occurrence is checked for conflicts
+    def has_add_permission(self, request):
+        return False
+
+    @action(description='Cancel selected series and their upcoming bookings')
+    def cancel_series(self, request, queryset):
+        cancelled = 0
+        for series in queryset.filter(status='active'):
+            cancelled += SeriesService.cancel_series(series, changed_by=request.user.get_username())
+        self.message_user(request, f"{cancelled} upcoming booking(s) cancelled.")
 
 @admin.register(Availability)
 class AvailabilityAdmin(ModelAdmin):
@@ -98,4 +141,55 @@ class AuditLogAdmin(ModelAdmin):
         return False
 
     def has_delete_permission(self, request, obj=None):
-        return False
\ No newline at end of file
+        return False
+
+@admin.register(DailyStats)
+class DailyStatsAdmin(ModelAdmin):
+    list_display = ('date_jalali', 'space', 'pending_count', 'confirmed_count', 'cancelled_count',
+                    'completed_count', 'seat_hours', 'revenue', 'refreshed_at')
+    list_filter = ('space', ('date_jalali', JDateFieldListFilter))
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(ModelAdmin):
+    list_display = ('id', 'topic', 'status', 'attempts', 'available_at', 'created_at', 'dispatched_at')
+    list_filter = ('status', 'topic')
+    readonly_fields = ('topic', 'payload', 'status', 'attempts', 'available_at', 'last_error',
+                       'created_at', 'dispatched_at')
+    actions = ['retry_now']
+
+    def has_add_permission(self, request):
+        return False
+
+    @action(description='Retry selected messages now')
+    def retry_now(self, request, queryset):
+        retried = queryset.exclude(status='done').update(status='pending', available_at=timezone.now())
+        self.message_user(request, f"{retried} message(s) queued for retry.")
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(ModelAdmin):
+    list_display = ('full_name', 'national_id', 'status', 'start_date_jalali', 'end_date_jalali', 'archived_at')
+    list_filter = ('status',)
+    search_fields = ('=booking_id', '=national_id', 'full_name')
+    readonly_fields = ('booking_id', 'full_name', 'national_id', 'status', 'start_date_jalali', 'end_date_jalali',
+                       'path', 'archived_at', 'record')
+    exclude = ('offset',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @display(description='Archived record')
+    def record(self, obj):
+        return format_html('<pre>{}</pre>', json.dumps(archive.read_record(obj), indent=2, ensure_ascii=False))
+
@@ -0,0 +1,194 @@
+"""
+Cold archival of finished bookings.
+
+Completed and cancelled bookings that ended more than
+settings.BOOKING_RETENTION_DAYS ago are written, together with their audit
+log, to gzip-compressed JSON Lines files under settings.ARCHIVE_ROOT,
+partitioned by the Jalali month the booking ended in
+(bookings/1403/05.jsonl.gz). Each chunk of a run is appended to its
+partition as a separate gzip member. Concatenated members are still one valid
+gzip file, and the ArchivedBooking row keeps the member's byte offset, so a
+lookup decompresses one chunk instead of the whole month.
+
+A run streams the candidates with iterator(chunk_size=...), writes and indexes
+each chunk, then deletes the indexed rows from the hot tables in chunks. A run
+that dies half way is finished by the next one: rows that are already indexed
+are not written again, only deleted.
+"""
+import fcntl
+import gzip
+import json
+import os
+import zlib
+from collections import defaultdict
+from pathlib import Path
+import jdatetime
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from .models import ArchivedBooking, AuditLog, Booking
+
+ARCHIVED_STATUSES = ('completed', 'cancelled')
+
+# Bookings per gzip member and per delete
+ARCHIVE_CHUNK_SIZE = 500
+
+AUDIT_LOG_FIELDS = ('action', 'previous_status', 'new_status', 'changed_by', 'timestamp', 'notes')
+
+
+class ArchiveEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        if isinstance(o, jdatetime.date):
+            return str(o)
+        return super().default(o)
+
+
+def archive_root():
+    return Path(settings.ARCHIVE_ROOT)
+
+
+def partition(booking):
+    day = booking.end_date_jalali
+    return f"bookings/{day.year:04d}/{day.month:02d}.jsonl.gz"
+
+
+def to_record(booking):
+    record = {field.attname: getattr(booking, field.attname) for field in Booking._meta.concrete_fields}
+    record['seat_visual_id'] = booking.seat.visual_id
+    record['audit_logs'] = [
+        {name: getattr(log, name) for name in AUDIT_LOG_FIELDS}
+        for log in sorted(booking.audit_logs.all(), key=lambda log: log.timestamp)
+    ]
+    return record
+
+
+class ArchiveFileMissing(Exception):
+    """
+    The archive file an ArchivedBooking points to is not under ARCHIVE_ROOT.
+    """
+
+
+def write_member(relative_path, records):
+    """
+    Appends records as one gzip member to relative_path and returns the
+    member's byte offset. The data is on disk before this returns.
+    """
+    path = archive_root() / relative_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    member = gzip.compress(
+        b''.join(json.dumps(record, cls=ArchiveEncoder).encode() + b'\n' for record in records)
+    )
+    with open(path, 'ab') as archive_file:
+        # Exclusive until closed, so a concurrent run cannot append between
+        # reading the offset and writing the member
+        fcntl.flock(archive_file.fileno(), fcntl.LOCK_EX)
+        offset = archive_file.seek(0, os.SEEK_END)
+        archive_file.write(member)
+        archive_file.flush()
+        os.fsync(archive_file.fileno())
+    return offset
+
+
+def read_member(relative_path, offset):
+    """
+    The records of the gzip member starting at offset.
+    """
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    chunks = []
+    with open(archive_root() / relative_path, 'rb') as archive_file:
+        archive_file.seek(offset)
+        while not decompressor.eof:
+            data = archive_file.read(64 * 1024)
+            if not data:
+                break
+            chunks.append(decompressor.decompress(data))
+    return [json.loads(line) for line in b''.join(chunks).splitlines()]
+
+
+def read_record(entry):
+    """
+    The archived record (booking fields plus 'audit_logs') an ArchivedBooking
+    points to. Raises ArchiveFileMissing when its file is gone.
+    """
+    booking_id = str(entry.pk)
+    try:
+        records = read_member(entry.path, entry.offset)
+    except FileNotFoundError as e:
+        raise ArchiveFileMissing(f"Archive file {entry.path} is missing.") from e
+    for record in records:
+        if record['id'] == booking_id:
+            return record
+    return None
+
+
+def lookup(booking_id):
+    """
+    The archived record of a booking, or None when it was never archived.
+    """
+    entry = ArchivedBooking.objects.filter(pk=booking_id).first()
+    return read_record(entry) if entry is not None else None
+
+
+def _write_chunk(bookings):
+    """
+    Writes and indexes the bookings that are not archived yet. Returns how many.
+    """
+    # Checked here rather than in the streaming query, which must not read a
+    # table this loop writes to
+    indexed = set(ArchivedBooking.objects.filter(
+        pk__in=[booking.pk for booking in bookings]
+    ).values_list('pk', flat=True))
+    bookings = [booking for booking in bookings if booking.pk not in indexed]
+
+    by_partition = defaultdict(list)
+    for booking in bookings:
+        by_partition[partition(booking)].append(booking)
+
+    entries = []
+    for relative_path, group in by_partition.items():
+        offset = write_member(relative_path, [to_record(booking) for booking in group])
+        entries.extend(
+            ArchivedBooking(
+                booking_id=booking.pk, full_name=booking.full_name, national_id=booking.national_id,
+                status=booking.status, start_date_jalali=booking.start_date_jalali,
+                end_date_jalali=booking.end_date_jalali, path=relative_path, offset=offset,
+            )
+            for booking in group
+        )
+    ArchivedBooking.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(bookings)
+
+
+def archive_bookings(retention_days=None, chunk_size=ARCHIVE_CHUNK_SIZE, now=None):
+    """
+    Archives finished bookings that ended before the retention window and
+    removes them from the hot tables. Returns (archived, deleted).
+    """
+    if retention_days is None:
+        retention_days = settings.BOOKING_RETENTION_DAYS
+    cutoff = timezone.localdate(now).toordinal() - retention_days
+    finished = Booking.objects.filter(status__in=ARCHIVED_STATUSES, end_day__lt=cutoff)
+    indexed = Exists(ArchivedBooking.objects.filter(pk=OuterRef('pk')))
+
+    archived = 0
+    chunk = []
+    candidates = finished.select_related('seat').prefetch_related('audit_logs').order_by('end_day', 'id')
+    for booking in candidates.iterator(chunk_size=chunk_size):
+        chunk.append(booking)
+        if len(chunk) == chunk_size:
+            archived += _write_chunk(chunk)
+            chunk = []
+    if chunk:
+        archived += _write_chunk(chunk)
+
+    deleted = 0
+    while True:
+        ids = list(finished.filter(indexed).values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return archived, deleted
+        with transaction.atomic():
+            AuditLog.objects.filter(booking_id__in=ids).delete()
+            Booking.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
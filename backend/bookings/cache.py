@@ -0,0 +1,85 @@
+"""
+Availability cache: computed seat status per (space, Jalali date).
+
+Entries are written by AvailabilityService.seat_statuses_for_date and dropped
+by invalidate_spans() whenever a booking is written, including the bulk
+queryset.update() paths that skip model signals. Cache failures never break a
+request; callers fall back to the database.
+
+The cache is only used when settings.AVAILABILITY_CACHE_ENABLED is set, which
+it is when the default cache is Redis. Invalidation has to reach every worker,
+and a per-process LocMemCache cannot do that, so without Redis every read
+goes to the database.
+"""
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .occupancy import iter_days
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'availability'
+
+
+def availability_key(space_id, day):
+    return f"{KEY_PREFIX}:{space_id}:{day}"
+
+
+def enabled():
+    return settings.AVAILABILITY_CACHE_ENABLED
+
+
+def get_day_statuses(space_ids, day):
+    """
+    Returns {space_id: payload} for the spaces that are cached for day.
+    """
+    if not enabled():
+        return {}
+    keys = {availability_key(space_id, day): space_id for space_id in space_ids}
+    try:
+        found = cache.get_many(list(keys))
+    except Exception as e:
+        logger.warning("Availability cache read failed: %s", e)
+        return {}
+    return {keys[key]: payload for key, payload in found.items()}
+
+
+def set_day_statuses(payloads, day):
+    """
+    Stores {space_id: payload} for day.
+    """
+    if not payloads or not enabled():
+        return
+    try:
+        cache.set_many(
+            {availability_key(space_id, day): payload for space_id, payload in payloads.items()},
+            timeout=settings.AVAILABILITY_CACHE_TIMEOUT
+        )
+    except Exception as e:
+        logger.warning("Availability cache write failed: %s", e)
+
+
+def invalidate_spans(spans):
+    """
+    Drops the cached days touched by spans, an iterable of
+    (space_id, start_date, end_date) tuples. Runs after the surrounding
+    transaction commits so readers cannot re-cache the old state.
+    """
+    if not enabled():
+        return
+    keys = {
+        availability_key(space_id, day)
+        for space_id, start_date, end_date in spans
+        for day in iter_days(start_date, end_date)
+    }
+    if not keys:
+        return
+
+    def delete():
+        try:
+            cache.delete_many(list(keys))
+        except Exception as e:
+            logger.warning("Availability cache invalidation failed: %s", e)
+
+    transaction.on_commit(delete)
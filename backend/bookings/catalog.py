@@ -0,0 +1,114 @@
+"""
+Catalog version stamp for conditional GETs on spaces and seats.
+
+Spaces and seats rarely change, so list/retrieve responses carry an ETag and
+Last-Modified derived from one stamp instead of from the rows themselves. The
+stamp is the single CatalogVersion row, so every worker sees the same one.
+bump() replaces it whenever a Space or Seat is written: model signals cover
+saves and deletes (including admin inlines), and callers that skip signals,
+such as queryset.update() in the admin actions or bulk_create in
+populate_spaces, call it directly.
+
+bump() writes in the caller's transaction, so the stamp changes exactly when
+the catalog write commits. With settings.CATALOG_CACHE_ENABLED (a cache every
+worker shares) the stamp is also kept in the cache: bump() replaces the
+cached copy once its transaction commits, and a request whose validators
+match gets a 304 without a query. Otherwise, and on a cache miss, it costs a
+read of that one row.
+"""
+import functools
+import logging
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from .models import CatalogVersion
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'catalog:stamp'
+
+
+def _new_stamp():
+    # Whole seconds, since Last-Modified has no finer resolution
+    return {'tag': uuid.uuid4(), 'modified': timezone.now().replace(microsecond=0)}
+
+
+def _validators(stamp):
+    return quote_etag(f"catalog-{stamp['tag'].hex}"), int(stamp['modified'].timestamp())
+
+
+def current():
+    """
+    Returns (etag, last_modified_timestamp) of the catalog.
+    """
+    if settings.CATALOG_CACHE_ENABLED:
+        try:
+            validators = cache.get(CACHE_KEY)
+        except Exception as e:
+            logger.warning("Catalog cache read failed: %s", e)
+            validators = None
+        if validators is not None:
+            return validators
+
+    stamp = CatalogVersion.objects.filter(pk=CatalogVersion.SINGLETON_PK).values('tag', 'modified').first()
+    if stamp is None:
+        # First request after a fresh install
+        stamp, _ = CatalogVersion.objects.get_or_create(pk=CatalogVersion.SINGLETON_PK, defaults=_new_stamp())
+        stamp = {'tag': stamp.tag, 'modified': stamp.modified}
+    validators = _validators(stamp)
+
+    if settings.CATALOG_CACHE_ENABLED:
+        try:
+            # add(), not set(): a bump() committed since our read has already
+            # cached the newer stamp and must not be overwritten
+            cache.add(CACHE_KEY, validators, timeout=settings.CATALOG_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning("Catalog cache write failed: %s", e)
+    return validators
+
+
+def bump():
+    """
+    Issues a new stamp as part of the surrounding transaction, and caches it
+    once that transaction commits.
+    """
+    stamp = _new_stamp()
+    CatalogVersion.objects.update_or_create(pk=CatalogVersion.SINGLETON_PK, defaults=stamp)
+    if not settings.CATALOG_CACHE_ENABLED:
+        return
+
+    def publish():
+        try:
+            cache.set(CACHE_KEY, _validators(stamp), timeout=settings.CATALOG_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning("Catalog cache update failed: %s", e)
+
+    transaction.on_commit(publish)
+
+
+def conditional(view_method):
+    """
+    Wraps a viewset handler: 304 when the client's ETag/Last-Modified match the
+    catalog stamp, otherwise the normal response tagged with both headers.
+    Handlers can opt out per request through the view's
+    is_catalog_request(request).
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if not self.is_catalog_request(request):
+            return view_method(self, request, *args, **kwargs)
+
+        etag, last_modified = current()
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view_method(self, request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    return wrapper
@@ -0,0 +1,29 @@
+"""
+Database expressions shared by the reporting queries.
+"""
+from django.db.models import Func, IntegerField
+
+
+class DaySpan(Func):
+    """
+    DaySpan(start, end): number of calendar days from start to end, inclusive,
+    computed in SQL.
+    """
+    arity = 2
+    output_field = IntegerField()
+    template = '((%(end)s - %(start)s) + 1)'  # PostgreSQL: date - date is an integer
+
+    def as_sql(self, compiler, connection, template=None, **extra_context):
+        start_sql, start_params = compiler.compile(self.source_expressions[0])
+        end_sql, end_params = compiler.compile(self.source_expressions[1])
+        sql = (template or self.template) % {'start': start_sql, 'end': end_sql}
+        return sql, (*end_params, *start_params)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='(CAST(julianday(%(end)s) - julianday(%(start)s) AS INTEGER) + 1)'
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='(DATEDIFF(%(end)s, %(start)s) + 1)')
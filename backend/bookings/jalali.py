@@ -0,0 +1,143 @@
+"""
+Precomputed Jalali calendar for date math on hot paths.
+
+jdatetime converts through the Gregorian calendar in pure Python for every
+constructor call, comparison and subtraction. Here each day is identified by
+its proleptic Gregorian ordinal (datetime.date.toordinal()), so comparing and
+subtracting days is integer arithmetic, and the Jalali <-> ordinal mapping is a
+table lookup for FIRST_YEAR..LAST_YEAR. Dates outside that range still work
+through jdatetime, just without the speed-up.
+
+Like occupancy.py this module has no model imports.
+"""
+from array import array
+from functools import lru_cache
+import datetime
+import jdatetime
+
+FIRST_YEAR = 1390
+LAST_YEAR = 1450
+
+# Days before each month: months 1-6 have 31 days, 7-11 have 30, Esfand 29/30
+MONTH_OFFSETS = (0, 31, 62, 93, 124, 155, 186, 216, 246, 276, 306, 336)
+
+
+def _build_tables():
+    year_starts = array('l', (
+        jdatetime.date(year, 1, 1).togregorian().toordinal()
+        for year in range(FIRST_YEAR, LAST_YEAR + 2)
+    ))
+    # One packed (year << 9 | month << 5 | day) entry per day of the range
+    days = array('L')
+    for index, year in enumerate(range(FIRST_YEAR, LAST_YEAR + 1)):
+        esfand = year_starts[index + 1] - year_starts[index] - MONTH_OFFSETS[11]
+        for month in range(1, 13):
+            length = 31 if month <= 6 else 30 if month <= 11 else esfand
+            days.extend((year << 9) | (month << 5) | day for day in range(1, length + 1))
+    return year_starts, days
+
+
+_YEAR_STARTS, _DAYS = _build_tables()
+FIRST_ORDINAL = _YEAR_STARTS[0]
+LAST_ORDINAL = _YEAR_STARTS[-1] - 1
+
+
+def month_length(year, month):
+    if month <= 6:
+        return 31
+    if month <= 11:
+        return 30
+    if FIRST_YEAR <= year <= LAST_YEAR:
+        index = year - FIRST_YEAR
+        return _YEAR_STARTS[index + 1] - _YEAR_STARTS[index] - MONTH_OFFSETS[11]
+    return 30 if jdatetime.date(year, 1, 1).isleap() else 29
+
+
+def ordinal(year, month, day):
+    """
+    Ordinal of a Jalali date. Raises ValueError for dates that do not exist.
+    """
+    if not 1 <= month <= 12 or not 1 <= day <= month_length(year, month):
+        raise ValueError(f"Invalid Jalali date {year}-{month}-{day}.")
+    if FIRST_YEAR <= year <= LAST_YEAR:
+        return _YEAR_STARTS[year - FIRST_YEAR] + MONTH_OFFSETS[month - 1] + day - 1
+    return jdatetime.date(year, month, day).togregorian().toordinal()
+
+
+def to_ordinal(value):
+    """
+    Ordinal of a jdatetime.date, or of a Gregorian datetime.date.
+    """
+    if isinstance(value, jdatetime.date):
+        return ordinal(value.year, value.month, value.day)
+    return value.toordinal()
+
+
+def components(day_ordinal):
+    """
+    (year, month, day) of the Jalali date for an ordinal.
+    """
+    if FIRST_ORDINAL <= day_ordinal <= LAST_ORDINAL:
+        packed = _DAYS[day_ordinal - FIRST_ORDINAL]
+        return packed >> 9, (packed >> 5) & 0xF, packed & 0x1F
+    value = jdatetime.date.fromgregorian(date=datetime.date.fromordinal(day_ordinal))
+    return value.year, value.month, value.day
+
+
+@lru_cache(maxsize=4096)
+def to_date(day_ordinal):
+    """
+    jdatetime.date for an ordinal, for the ORM and other jdatetime consumers.
+    Cached, so treat the result as immutable.
+    """
+    return jdatetime.date(*components(day_ordinal))
+
+
+def to_gregorian(day_ordinal):
+    return datetime.date.fromordinal(day_ordinal)
+
+
+def today():
+    return datetime.date.today().toordinal()
+
+
+def parse(value):
+    """
+    Ordinal of a 'YYYY-MM-DD' Jalali string. Raises ValueError on bad input.
+    """
+    if len(value) == 10 and value[4] == '-' and value[7] == '-':
+        return ordinal(int(value[:4]), int(value[5:7]), int(value[8:]))
+    parts = value.split('-')
+    if len(parts) != 3:
+        raise ValueError(f"Invalid Jalali date {value!r}.")
+    return ordinal(*map(int, parts))
+
+
+def parse_date(value):
+    """
+    Like parse(), returning a jdatetime.date.
+    """
+    return to_date(parse(value))
+
+
+def format_date(day_ordinal):
+    """
+    'YYYY-MM-DD' for an ordinal.
+    """
+    year, month, day = components(day_ordinal)
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def iter_dates(start, end):
+    """
+    Yields jdatetime.date objects from start to end inclusive.
+    """
+    for day_ordinal in range(to_ordinal(start), to_ordinal(end) + 1):
+        yield to_date(day_ordinal)
+
+
+def days_between(start, end):
+    """
+    end - start in days, for jdatetime or datetime dates.
+    """
+    return to_ordinal(end) - to_ordinal(start)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from bookings.archive import ARCHIVE_CHUNK_SIZE, archive_bookings
+
+class Command(BaseCommand):
+    help = 'Moves finished bookings past the retention window and their audit logs to compressed archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, help='Default: settings.BOOKING_RETENTION_DAYS')
+        parser.add_argument('--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        archived, deleted = archive_bookings(options['retention_days'], options['chunk_size'])
+        self.stdout.write(f"Archived {archived} bookings, removed {deleted} from the database.")
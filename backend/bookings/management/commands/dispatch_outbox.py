@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from bookings.services import OutboxService
+
+class Command(BaseCommand):
+    help = 'Delivers pending outbox messages (confirmation emails etc.), once or in a loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=OutboxService.BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep polling until interrupted')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls when idle')
+
+    def handle(self, *args, **options):
+        while True:
+            handled = OutboxService.dispatch_all(options['batch_size'])
+            if handled or not options['loop']:
+                self.stdout.write(f"Handled {handled} outbox messages.")
+            if not options['loop']:
+                return
+            if not handled:
+                time.sleep(options['interval'])
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from bookings.models import Space, Seat
+from bookings import catalog
 
 class Command(BaseCommand):
     help = 'Populates the database with the specific office layout using Seat model'
@@ -81,4 +82,6 @@ class Command(BaseCommand):
         seats.append(Seat(space=lpr_space, visual_id="LPR-3", name="Large Suite Seat 3"))
 
         Seat.objects.bulk_create(seats)
+        # bulk_create skips the signals that bump the catalog version
+        catalog.bump()
         self.stdout.write(self.style.SUCCESS(f"Successfully created {Space.objects.count()} spaces and {len(seats)} seats."))
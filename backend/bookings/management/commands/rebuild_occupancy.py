@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Min, Max
+from bookings.models import Booking, SeatOccupancy
+from bookings.services import OccupancyService
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-seat day occupancy bitmaps from active bookings'
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write("Clearing existing occupancy bitmaps...")
+        SeatOccupancy.objects.all().delete()
+
+        spans = Booking.objects.filter(status__in=Booking.ACTIVE_STATUSES).values('seat_id').annotate(
+            first_day=Min('start_date_jalali'),
+            last_day=Max('end_date_jalali'),
+        )
+
+        count = 0
+        for span in spans:
+            OccupancyService.rebuild([(span['seat_id'], span['first_day'], span['last_day'])])
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt occupancy for {count} seats."))
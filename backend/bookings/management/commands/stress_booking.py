@@ -0,0 +1,143 @@
+import datetime
+import threading
+import time
+import jdatetime
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from bookings.models import Space, Seat, Booking
+from bookings.services import BookingService
+from bookings import occupancy
+
+STRESS_NAME = "Stress Test"
+
+class LockTimer:
+    """
+    connection.execute_wrapper that adds up time spent in SELECT ... FOR UPDATE.
+    """
+    def __init__(self):
+        self.wait = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if 'FOR UPDATE' not in sql:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.wait += time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Fires concurrent create_booking calls at one seat/interval and reports double bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--rounds', type=int, default=1, help='Attempts per thread')
+        parser.add_argument('--seat', help='visual_id of an existing seat (default: a temporary one)')
+        parser.add_argument('--date', help='Jalali date YYYY-MM-DD (default: tomorrow)')
+        parser.add_argument('--start', default='10:00')
+        parser.add_argument('--end', default='11:00')
+        parser.add_argument('--keep', action='store_true', help='Keep the bookings created by the run')
+
+    def handle(self, *args, **options):
+        temporary_space = None
+        if options['seat']:
+            try:
+                seat = Seat.objects.get(visual_id=options['seat'])
+            except Seat.DoesNotExist:
+                raise CommandError(f"Seat {options['seat']} not found.")
+        else:
+            temporary_space = Space.objects.create(name="Stress Test Space", capacity=1)
+            seat = Seat.objects.create(space=temporary_space, visual_id=f"STRESS-{time.time_ns()}")
+
+        if options['date']:
+            year, month, day = map(int, options['date'].split('-'))
+            day = jdatetime.date(year, month, day)
+        else:
+            day = jdatetime.date.today() + jdatetime.timedelta(days=1)
+
+        data = {
+            'seat': seat,
+            'full_name': STRESS_NAME,
+            'national_id': "0060495219",
+            'mobile': "09123456789",
+            'booking_type': 'hourly',
+            'start_date_jalali': day,
+            'end_date_jalali': day,
+            'start_time': datetime.time.fromisoformat(options['start']),
+            'end_time': datetime.time.fromisoformat(options['end']),
+            'duration_hours': 1,
+            'terms_accepted': True,
+        }
+
+        results = {'created': 0, 'unavailable': 0, 'failed': 0}
+        lock_wait = []
+        latencies = []
+        guard = threading.Lock()
+        barrier = threading.Barrier(options['threads'])
+
+        def worker():
+            timer = LockTimer()
+            try:
+                with connection.execute_wrapper(timer):
+                    barrier.wait()
+                    for _ in range(options['rounds']):
+                        started = time.perf_counter()
+                        try:
+                            BookingService.create_booking(dict(data))
+                            outcome = 'created'
+                        except ValidationError as e:
+                            outcome = 'unavailable' if e.code == 'seat_unavailable' else 'failed'
+                        with guard:
+                            results[outcome] += 1
+                            latencies.append(time.perf_counter() - started)
+                with guard:
+                    lock_wait.append(timer.wait)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        created = list(Booking.objects.filter(
+            seat=seat, full_name=STRESS_NAME, status__in=Booking.ACTIVE_STATUSES,
+            start_date_jalali=day
+        ).values_list(*Booking.SPAN_FIELDS))
+        double_bookings = sum(
+            1
+            for index, first in enumerate(created)
+            for second in created[index + 1:]
+            if occupancy.spans_overlap(first, second)
+        )
+
+        attempts = sum(results.values())
+        latencies.sort()
+        self.stdout.write(f"Seat: {seat.visual_id} on {str(day)} {options['start']}-{options['end']}")
+        self.stdout.write(f"Attempts: {attempts} from {options['threads']} threads in {elapsed:.3f}s "
+                          f"({attempts / elapsed:.1f} req/s)")
+        self.stdout.write(f"Created: {results['created']}, rejected (seat_unavailable): {results['unavailable']}, "
+                          f"failed: {results['failed']}")
+        if latencies:
+            self.stdout.write(f"Latency p50: {latencies[len(latencies) // 2] * 1000:.1f}ms, "
+                              f"max: {latencies[-1] * 1000:.1f}ms")
+        if connection.vendor == 'sqlite':
+            self.stdout.write("Lock wait: n/a (SQLite has no row locks)")
+        else:
+            self.stdout.write(f"Lock wait: total {sum(lock_wait) * 1000:.1f}ms, "
+                              f"max per thread {max(lock_wait, default=0) * 1000:.1f}ms")
+        self.stdout.write(f"Double bookings: {double_bookings}")
+
+        if not options['keep']:
+            Booking.objects.filter(seat=seat, full_name=STRESS_NAME).delete()
+        if temporary_space is not None:
+            temporary_space.delete()
+
+        if double_bookings:
+            raise CommandError(f"{double_bookings} double bookings detected.")
+        self.stdout.write(self.style.SUCCESS("No double bookings."))
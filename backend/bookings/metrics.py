@@ -0,0 +1,137 @@
+"""
+Prometheus metrics for the booking hot paths, served at /metrics.
+
+Under gunicorn every worker records into its own files in
+PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py) and the /metrics view merges
+them, so a scrape sees the whole deployment rather than whichever worker
+answered. Without that variable (runserver, tests) the default in-process
+registry is used.
+
+Delivery side effects (the outbox backlog and failures, failed confirmation
+and reminder deliveries) happen in Celery workers and management commands,
+whose counters no gunicorn worker can see. They are not stored metrics:
+OutboxCollector and NotificationCollector read them from the database at
+scrape time, which stays correct however many processes write.
+"""
+import hmac
+import os
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Case, Count, F, IntegerField, Sum, When
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+from prometheus_client.core import GaugeMetricFamily
+
+# Booking latencies are dominated by a handful of queries, so the buckets
+# start well below Prometheus' defaults
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by view (DRF viewset.action or URL name)',
+    ['view', 'method', 'status'],
+)
+BOOKING_CREATE_LATENCY = Histogram(
+    'booking_create_duration_seconds', 'BookingService.create_booking latency, retries included',
+    buckets=FAST_BUCKETS,
+)
+SEAT_AVAILABILITY_LATENCY = Histogram(
+    'seat_availability_check_duration_seconds', 'AvailabilityService.is_seat_available latency',
+    buckets=FAST_BUCKETS,
+)
+BOOKING_REJECTIONS = Counter(
+    'booking_rejections', 'Bookings refused by the booking service, by ValidationError code '
+    '(seat_unavailable, no_seat_available, booking_creation_failed, ...)',
+    ['code'],
+)
+
+
+@contextmanager
+def counting_rejections():
+    """
+    Counts ValidationErrors passing through in BOOKING_REJECTIONS. Works as a
+    decorator too.
+    """
+    try:
+        yield
+    except ValidationError as e:
+        BOOKING_REJECTIONS.labels(code=e.code or 'invalid').inc()
+        raise
+
+
+class OutboxCollector:
+    """
+    outbox_messages{status} and outbox_delivery_failures{topic}, one GROUP BY
+    each per scrape. Every attempt on a message failed except the last
+    attempt of a delivered one.
+    """
+    def collect(self):
+        from .models import OutboxMessage
+
+        gauge = GaugeMetricFamily('outbox_messages', 'Outbox messages by status', labels=['status'])
+        counts = dict(OutboxMessage.objects.values_list('status').annotate(count=Count('id')).order_by())
+        for status, _ in OutboxMessage.STATUS_CHOICES:
+            gauge.add_metric([status], counts.get(status, 0))
+        yield gauge
+
+        failures = GaugeMetricFamily(
+            'outbox_delivery_failures', 'Failed outbox delivery attempts, by topic', labels=['topic']
+        )
+        by_topic = OutboxMessage.objects.values_list('topic').annotate(failed=Sum(
+            Case(When(status='done', then=F('attempts') - 1), default=F('attempts'), output_field=IntegerField())
+        )).order_by()
+        for topic, failed in by_topic:
+            failures.add_metric([topic], failed or 0)
+        yield failures
+
+
+class NotificationCollector:
+    """
+    notification_delivery_failures{kind}: bookings still owed a confirmation
+    or reminder whose last delivery failed. Both queries stay on the partial
+    indexes of unsent notifications.
+    """
+    def collect(self):
+        from .models import Booking
+
+        gauge = GaugeMetricFamily(
+            'notification_delivery_failures',
+            'Bookings whose confirmation or reminder is unsent after a failed delivery, by kind',
+            labels=['kind'],
+        )
+        gauge.add_metric(['confirmation'], Booking.objects.filter(
+            confirmation_sent_at__isnull=True, confirmation_attempts__gt=0
+        ).count())
+        gauge.add_metric(['reminder'], Booking.objects.filter(
+            reminder_sent_at__isnull=True, reminder_attempts__gt=0
+        ).count())
+        yield gauge
+
+
+def registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        merged = CollectorRegistry()
+        multiprocess.MultiProcessCollector(merged)
+        return merged
+    return REGISTRY
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition. Scrapers must send settings.METRICS_TOKEN as a
+    bearer token; without a token configured the endpoint is closed.
+    """
+    if not settings.METRICS_TOKEN:
+        return HttpResponse(status=403)
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), expected):
+        return HttpResponse(status=401)
+
+    target = registry()
+    database = CollectorRegistry()
+    database.register(OutboxCollector())
+    database.register(NotificationCollector())
+    body = generate_latest(target) + generate_latest(database)
+    return HttpResponse(body, content_type=CONTENT_TYPE_LATEST)
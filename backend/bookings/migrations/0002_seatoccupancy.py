@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:26
+
+import django.db.models.deletion
+import django_jalali.db.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_jalali', django_jalali.db.models.jDateField()),
+                ('slots', models.BinaryField(max_length=12)),
+                ('seat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='bookings.seat')),
+            ],
+            options={
+                'verbose_name_plural': 'Seat occupancies',
+                'constraints': [models.UniqueConstraint(fields=('seat', 'date_jalali'), name='unique_seat_occupancy_day')],
+            },
+        ),
+    ]
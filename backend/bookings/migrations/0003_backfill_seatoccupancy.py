@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:26
+
+from collections import defaultdict
+from django.db import migrations
+from bookings import occupancy
+
+
+def backfill_occupancy(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    SeatOccupancy = apps.get_model('bookings', 'SeatOccupancy')
+
+    masks = defaultdict(int)
+    active = Booking.objects.filter(status__in=['pending', 'confirmed']).values_list(
+        'seat_id', 'booking_type', 'start_date_jalali', 'end_date_jalali', 'start_time', 'end_time'
+    )
+    for seat_id, booking_type, start_date, end_date, start_time, end_time in active.iterator():
+        mask = occupancy.booking_mask(booking_type, start_time, end_time)
+        for day in occupancy.iter_days(start_date, end_date):
+            masks[(seat_id, day)] |= mask
+
+    SeatOccupancy.objects.bulk_create(
+        [
+            SeatOccupancy(seat_id=seat_id, date_jalali=day, slots=occupancy.to_bytes(mask))
+            for (seat_id, day), mask in masks.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_seatoccupancy'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:28
+
+from django.db import migrations
+
+# PostgreSQL only: store each booking's occupied period as a generated tsrange
+# column and let a GiST exclusion constraint reject overlapping active bookings
+# on the same seat. Non-hourly bookings take whole days. Other backends keep
+# relying on the service-level availability check.
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """
+    ALTER TABLE bookings_booking ADD COLUMN period tsrange GENERATED ALWAYS AS (
+        CASE
+            WHEN booking_type = 'hourly' AND start_time IS NOT NULL AND end_time IS NOT NULL
+                THEN tsrange(start_date_jalali + start_time, end_date_jalali + end_time, '[)')
+            ELSE tsrange(start_date_jalali::timestamp, (end_date_jalali + 1)::timestamp, '[)')
+        END
+    ) STORED
+    """,
+    """
+    ALTER TABLE bookings_booking ADD CONSTRAINT booking_seat_no_overlap
+        EXCLUDE USING gist (seat_id WITH =, period WITH &&)
+        WHERE (status IN ('pending', 'confirmed'))
+    """,
+]
+
+REVERSE_SQL = [
+    "ALTER TABLE bookings_booking DROP CONSTRAINT IF EXISTS booking_seat_no_overlap",
+    "ALTER TABLE bookings_booking DROP COLUMN IF EXISTS period",
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_backfill_seatoccupancy'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_postgresql(FORWARD_SQL), run_on_postgresql(REVERSE_SQL)),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:38
+
+import bookings.validators
+import django.core.validators
+import django.db.models.deletion
+import django_jalali.db.models
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_dailystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingSeries',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('full_name', models.CharField(max_length=255)),
+                ('national_id', models.CharField(max_length=10, validators=[bookings.validators.validate_national_id])),
+                ('mobile', models.CharField(max_length=11, validators=[bookings.validators.validate_mobile_number])),
+                ('email', models.EmailField(blank=True, max_length=254, null=True)),
+                ('booking_type', models.CharField(choices=[('hourly', 'Hourly'), ('daily', 'Daily')], default='hourly', max_length=20)),
+                ('start_time', models.TimeField(blank=True, null=True)),
+                ('end_time', models.TimeField(blank=True, null=True)),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], default='weekly', max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)])),
+                ('start_date_jalali', django_jalali.db.models.jDateField()),
+                ('until_date_jalali', django_jalali.db.models.jDateField()),
+                ('materialized_until', django_jalali.db.models.jDateField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('cancelled', 'Cancelled')], default='active', max_length=20)),
+                ('terms_accepted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('seat', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series', to='bookings.seat')),
+            ],
+            options={
+                'verbose_name_plural': 'Booking series',
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='bookings.bookingseries'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingseries',
+            index=models.Index(fields=['status', 'materialized_until'], name='bookings_bo_status_248c2d_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['national_id', 'start_date_jalali', 'id'], include=('end_date_jalali', 'start_time', 'end_time', 'booking_type', 'status', 'seat'), name='booking_member_history_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:45
+
+from django.db import migrations, models
+from bookings import occupancy
+
+
+def backfill_spans(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+
+    batch = []
+    rows = Booking.objects.only(
+        'booking_type', 'start_date_jalali', 'end_date_jalali', 'start_time', 'end_time'
+    )
+    for booking in rows.iterator(chunk_size=2000):
+        booking.start_day, booking.end_day, booking.start_minute, booking.end_minute = occupancy.booking_span(
+            booking.booking_type, booking.start_date_jalali, booking.end_date_jalali,
+            booking.start_time, booking.end_time
+        )
+        batch.append(booking)
+        if len(batch) >= 2000:
+            Booking.objects.bulk_update(batch, ['start_day', 'end_day', 'start_minute', 'end_minute'])
+            batch = []
+    Booking.objects.bulk_update(batch, ['start_day', 'end_day', 'start_minute', 'end_minute'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_booking_member_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='end_day',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='end_minute',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='start_day',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='start_minute',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_spans, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['seat', 'status', 'start_day', 'end_day'], name='bookings_bo_seat_id_1390c2_idx'),
+        ),
+    ]
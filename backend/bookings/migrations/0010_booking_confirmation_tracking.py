@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:47
+
+from django.db import migrations, models
+
+
+def mark_existing_as_sent(apps, schema_editor):
+    # Bookings made before tracking existed were confirmed by the old per-booking
+    # task; keep the pending-confirmation drain from emailing them again.
+    Booking = apps.get_model('bookings', 'Booking')
+    Booking.objects.update(confirmation_sent_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_booking_overlap_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='confirmation_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='confirmation_error',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='confirmation_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_existing_as_sent, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('confirmation_sent_at__isnull', True)), fields=['created_at'], name='booking_unconfirmed_idx'),
+        ),
+    ]
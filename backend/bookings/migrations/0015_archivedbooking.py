@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:56
+
+import django_jalali.db.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0014_booking_pending_hold_expiry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('booking_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('full_name', models.CharField(max_length=255)),
+                ('national_id', models.CharField(db_index=True, max_length=10)),
+                ('status', models.CharField(max_length=20)),
+                ('start_date_jalali', django_jalali.db.models.jDateField()),
+                ('end_date_jalali', django_jalali.db.models.jDateField()),
+                ('path', models.CharField(max_length=255)),
+                ('offset', models.BigIntegerField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'end_day'], name='bookings_bo_status_59483b_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:15
+
+import django.utils.timezone
+import django_jalali.db.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0015_archivedbooking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStatsDirtyDay',
+            fields=[
+                ('date_jalali', django_jalali.db.models.jDateField(primary_key=True, serialize=False)),
+                ('marked_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
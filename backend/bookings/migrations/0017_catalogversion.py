@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:18
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0016_dailystatsdirtyday'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('tag', models.UUIDField(default=uuid.uuid4)),
+                ('modified', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+# The covering member history index is PostgreSQL only: SQLite cannot INCLUDE
+# non-key columns (models.W040), so the model declares the key columns and
+# this migration rebuilds the index with the rest of
+# BookingService.MEMBER_HISTORY_FIELDS on PostgreSQL.
+FORWARD_SQL = [
+    "DROP INDEX IF EXISTS booking_member_history_idx",
+    """
+    CREATE INDEX booking_member_history_idx ON bookings_booking (national_id, start_date_jalali, id)
+        INCLUDE (end_date_jalali, start_time, end_time, booking_type, status, seat_id)
+    """,
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS booking_member_history_idx",
+    "CREATE INDEX booking_member_history_idx ON bookings_booking (national_id, start_date_jalali, id)",
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0017_catalogversion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_member_history_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['national_id', 'start_date_jalali', 'id'], name='booking_member_history_idx'),
+        ),
+        migrations.RunPython(run_on_postgresql(FORWARD_SQL), run_on_postgresql(REVERSE_SQL)),
+    ]
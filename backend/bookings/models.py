@@ -1,7 +1,10 @@
+from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
 from django_jalali.db import models as jmodels
 import uuid
 from .validators import validate_national_id, validate_mobile_number
+from . import occupancy
 
 class Space(models.Model):
     SPACE_TYPES = [
@@ -72,6 +75,12 @@ class Booking(models.Model):
         ('cancelled', 'Cancelled'),
         ('completed', 'Completed'),
     ]
+
+    # Statuses that hold a seat
+    ACTIVE_STATUSES = ('pending', 'confirmed')
+
+    # PostgreSQL-only exclusion constraint over (seat, period), see migration 0004
+    OVERLAP_CONSTRAINT = 'booking_seat_no_overlap'
     
     GENDER_CHOICES = [
         ('male', 'Male'),
@@ -107,16 +116,40 @@ class Booking(models.Model):
     
     duration_hours = models.DecimalField(max_digits=6, decimal_places=1, null=True, blank=True) # Optional for non-hourly
 
+    # The dates/times above as integers (see bookings.occupancy.booking_span) so
+    # overlap checks are plain integer comparisons. Kept in sync by save() and
+    # by sync_span() in the bulk_create paths.
+    start_day = models.IntegerField(default=0, editable=False)
+    end_day = models.IntegerField(default=0, editable=False)
+    start_minute = models.PositiveSmallIntegerField(default=0, editable=False)
+    end_minute = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    # Set on occurrences materialized from a recurring series
+    series = models.ForeignKey(
+        'BookingSeries', on_delete=models.SET_NULL, null=True, blank=True, related_name='occurrences'
+    )
+
     # Metadata
     referral_source = models.CharField(max_length=100, blank=True)
     special_requests = models.TextField(blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # When an unconfirmed (pending) booking stops holding its seat; null never expires
+    expires_at = models.DateTimeField(null=True, blank=True)
     
     # Agreements
     terms_accepted = models.BooleanField(default=False)
     privacy_accepted = models.BooleanField(default=False)
     newsletter_opt_in = models.BooleanField(default=False)
 
+    # Confirmation email delivery (see bookings.tasks)
+    confirmation_sent_at = models.DateTimeField(null=True, blank=True)
+    confirmation_attempts = models.PositiveSmallIntegerField(default=0)
+    confirmation_error = models.CharField(max_length=255, blank=True)
+
+    # Reminder delivery (see bookings.reminders)
+    reminder_sent_at = models.DateTimeField(null=True, blank=True)
+    reminder_attempts = models.PositiveSmallIntegerField(default=0)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -129,11 +162,132 @@ class Booking(models.Model):
             models.Index(fields=['end_date_jalali']),
             models.Index(fields=['status']),
             models.Index(fields=['seat', 'start_date_jalali', 'status']),
+            # Overlap checks, see AvailabilityService.overlap_q
+            models.Index(fields=['seat', 'status', 'start_day', 'end_day']),
+            models.Index(fields=['updated_at']),
+            # Keyset pagination order, see bookings.pagination
+            models.Index(fields=['created_at', 'id']),
+            # Member history (see BookingService.member_history). On PostgreSQL
+            # migration 0018 rebuilds it with the remaining history columns
+            # INCLUDEd for index-only scans; SQLite has no INCLUDE (models.W040).
+            models.Index(
+                fields=['national_id', 'start_date_jalali', 'id'],
+                name='booking_member_history_idx',
+            ),
+            # Unsent confirmations, drained oldest first by send_pending_confirmations
+            models.Index(
+                fields=['created_at'],
+                name='booking_unconfirmed_idx',
+                condition=models.Q(confirmation_sent_at__isnull=True),
+            ),
+            # Finished bookings by end, for bookings.archive
+            models.Index(fields=['status', 'end_day']),
+            # Pending holds by expiry, for BookingService.expire_holds
+            models.Index(fields=['status', 'expires_at']),
+            # Active bookings by end, for BookingService.complete_ended
+            models.Index(
+                fields=['end_day', 'id'],
+                name='booking_active_end_idx',
+                condition=models.Q(status__in=['pending', 'confirmed']),
+            ),
+            # Upcoming bookings still owed a reminder, scanned by start
+            models.Index(
+                fields=['start_day', 'start_minute'],
+                name='booking_reminder_due_idx',
+                condition=models.Q(reminder_sent_at__isnull=True),
+            ),
         ]
 
+    SPAN_FIELDS = ('start_day', 'end_day', 'start_minute', 'end_minute')
+
     def __str__(self):
         return f"{self.full_name} - {self.seat.visual_id} ({self.start_date_jalali})"
 
+    def sync_span(self):
+        date_field = self._meta.get_field('start_date_jalali')
+        time_field = self._meta.get_field('start_time')
+        self.start_day, self.end_day, self.start_minute, self.end_minute = occupancy.booking_span(
+            self.booking_type,
+            date_field.to_python(self.start_date_jalali),
+            date_field.to_python(self.end_date_jalali),
+            time_field.to_python(self.start_time),
+            time_field.to_python(self.end_time)
+        )
+
+    def sync_hold(self):
+        # Only pending bookings are holds
+        if self.status != 'pending':
+            self.expires_at = None
+
+    def save(self, *args, **kwargs):
+        self.sync_span()
+        self.sync_hold()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | set(self.SPAN_FIELDS) | {'expires_at'}
+        super().save(*args, **kwargs)
+
+
+class BookingSeries(models.Model):
+    """
+    A standing booking, e.g. "every Sunday 10:00-12:00 for six months".
+
+    Occurrences follow a Jalali recurrence rule (see bookings.recurrence) and
+    are only stored as Booking rows up to materialized_until; SeriesService
+    extends that window as time moves on.
+    """
+    FREQUENCY_CHOICES = [
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+    ]
+
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    # Each occurrence is a single day
+    BOOKING_TYPE_CHOICES = [
+        ('hourly', 'Hourly'),
+        ('daily', 'Daily'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    full_name = models.CharField(max_length=255)
+    national_id = models.CharField(max_length=10, validators=[validate_national_id])
+    mobile = models.CharField(max_length=11, validators=[validate_mobile_number])
+    email = models.EmailField(blank=True, null=True)
+
+    seat = models.ForeignKey(Seat, on_delete=models.CASCADE, related_name='series')
+    booking_type = models.CharField(max_length=20, choices=BOOKING_TYPE_CHOICES, default='hourly')
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+
+    # Recurrence rule
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, default='weekly')
+    interval = models.PositiveSmallIntegerField(default=1, validators=[MinValueValidator(1)])
+    start_date_jalali = jmodels.jDateField()
+    until_date_jalali = jmodels.jDateField()
+
+    # Last day for which occurrences exist as Booking rows
+    materialized_until = jmodels.jDateField(null=True, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    terms_accepted = models.BooleanField(default=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Booking series"
+        indexes = [
+            models.Index(fields=['status', 'materialized_until']),
+        ]
+
+    def __str__(self):
+        return f"{self.full_name} - {self.seat.visual_id} ({self.frequency} from {self.start_date_jalali})"
+
 
 class Availability(models.Model):
     # Keeping Space here for now, or should it be Seat?
@@ -173,5 +327,140 @@ class AuditLog(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination order, see bookings.pagination
+            models.Index(fields=['timestamp', 'id']),
+        ]
+
     def __str__(self):
         return f"{self.booking.id} - {self.action} at {self.timestamp}"
+
+
+class SeatOccupancy(models.Model):
+    """
+    Compact per-seat, per-day occupancy bitmap (see bookings.occupancy).
+    Maintained by OccupancyService whenever bookings change.
+    """
+    seat = models.ForeignKey(Seat, on_delete=models.CASCADE, related_name='occupancy')
+    date_jalali = jmodels.jDateField()
+    slots = models.BinaryField(max_length=12)
+
+    class Meta:
+        verbose_name_plural = "Seat occupancies"
+        constraints = [
+            models.UniqueConstraint(fields=['seat', 'date_jalali'], name='unique_seat_occupancy_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.seat_id} - {self.date_jalali}"
+
+
+class DailyStats(models.Model):
+    """
+    Pre-aggregated KPIs per Jalali day and space, keyed by booking start day.
+    Maintained incrementally by the refresh_daily_stats task.
+    """
+    date_jalali = jmodels.jDateField()
+    space = models.ForeignKey(Space, on_delete=models.CASCADE, related_name='daily_stats')
+
+    pending_count = models.PositiveIntegerField(default=0)
+    confirmed_count = models.PositiveIntegerField(default=0)
+    cancelled_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    seat_hours = models.DecimalField(max_digits=12, decimal_places=1, default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = "Daily stats"
+        constraints = [
+            models.UniqueConstraint(fields=['date_jalali', 'space'], name='unique_daily_stats_space_day'),
+        ]
+        indexes = [
+            models.Index(fields=['refreshed_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.space_id} - {self.date_jalali}"
+
+
+class DailyStatsDirtyDay(models.Model):
+    """
+    A start day whose DailyStats rows went stale although no booking now on
+    it was written: a booking moved off it or was deleted. Recorded by the
+    booking signals and consumed by StatsService.refresh_daily_stats.
+    """
+    date_jalali = jmodels.jDateField(primary_key=True)
+    marked_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return str(self.date_jalali)
+
+
+class OutboxMessage(models.Model):
+    """
+    A side effect of a booking change (e.g. a confirmation email), written in
+    the same transaction as the change and delivered afterwards by
+    OutboxService.dispatch, so requests never wait on the message broker.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    topic = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk} ({self.status})"
+
+
+class ArchivedBooking(models.Model):
+    """
+    Where an archived booking lives in cold storage (see bookings.archive).
+    The booking and its audit log were removed from the hot tables; the few
+    columns here are kept for finding it again.
+    """
+    booking_id = models.UUIDField(primary_key=True)
+    full_name = models.CharField(max_length=255)
+    national_id = models.CharField(max_length=10, db_index=True)
+    status = models.CharField(max_length=20)
+    start_date_jalali = jmodels.jDateField()
+    end_date_jalali = jmodels.jDateField()
+    # File under settings.ARCHIVE_ROOT and the byte offset of the gzip member holding the record
+    path = models.CharField(max_length=255)
+    offset = models.BigIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.full_name} - {self.start_date_jalali} (archived)"
+
+
+class CatalogVersion(models.Model):
+    """
+    The single row stamping the last write to any Space or Seat, which the
+    spaces and seats endpoints use as their ETag and Last-Modified. See
+    bookings.catalog.
+    """
+    SINGLETON_PK = 1
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=SINGLETON_PK)
+    tag = models.UUIDField(default=uuid.uuid4)
+    modified = models.DateTimeField()
+
+    def __str__(self):
+        return str(self.tag)
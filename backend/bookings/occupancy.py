@@ -0,0 +1,102 @@
+"""
+Slot-bitmap helpers for seat occupancy.
+
+A seat's day is split into SLOTS_PER_DAY fixed slots of SLOT_MINUTES each and
+stored as a single integer (bit N set = slot N is taken). Checking a request
+against a stored day is then a single bitwise AND.
+
+Exact overlap checks use spans instead: (start_day, end_day, start_minute,
+end_minute) with day ordinals from bookings.jalali, stored on Booking as
+integer columns. A booking occupies [start_minute, end_minute) on each of its
+days; anything that is not hourly takes the whole day, 0-1440.
+
+This module is intentionally free of model imports so it can be shared by the
+service layer, management commands and data migrations.
+"""
+import zoneinfo
+from django.conf import settings
+from django.utils import timezone
+from . import jalali
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = (24 * 60) // SLOT_MINUTES  # 96
+MASK_BYTES = SLOTS_PER_DAY // 8  # 12
+FULL_DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+DAY_MINUTES = 24 * 60
+
+
+def slot_mask(start_time=None, end_time=None):
+    """
+    Returns the bitmap covering [start_time, end_time) for a single day.
+
+    Missing times mean the whole day. Times that do not fall on a slot boundary
+    are rounded outwards, so the mask is always a superset of the real interval.
+    """
+    if start_time is None or end_time is None:
+        return FULL_DAY_MASK
+
+    start_minute = start_time.hour * 60 + start_time.minute
+    end_minute = end_time.hour * 60 + end_time.minute
+    if end_minute <= start_minute:
+        return 0
+
+    first = start_minute // SLOT_MINUTES
+    last = -(-end_minute // SLOT_MINUTES)  # ceil division
+    return ((1 << (last - first)) - 1) << first
+
+
+def booking_mask(booking_type, start_time=None, end_time=None):
+    """
+    Per-day mask for a booking. Anything that is not hourly takes the full day.
+    """
+    if booking_type != 'hourly':
+        return FULL_DAY_MASK
+    return slot_mask(start_time, end_time)
+
+
+def local_now(now=None):
+    """
+    now (default: the current time) on the wall clock bookings are made in,
+    settings.BOOKING_TIME_ZONE, whatever TIME_ZONE the server runs with.
+    """
+    return timezone.localtime(now, zoneinfo.ZoneInfo(settings.BOOKING_TIME_ZONE))
+
+
+def minute_span(booking_type, start_time=None, end_time=None):
+    """
+    The (start_minute, end_minute) a booking occupies on each of its days.
+    """
+    if booking_type != 'hourly' or start_time is None or end_time is None:
+        return 0, DAY_MINUTES
+    return start_time.hour * 60 + start_time.minute, end_time.hour * 60 + end_time.minute
+
+
+def booking_span(booking_type, start_date, end_date, start_time=None, end_time=None):
+    """
+    (start_day, end_day, start_minute, end_minute) for a booking or request.
+    """
+    return (jalali.to_ordinal(start_date), jalali.to_ordinal(end_date)) + \
+        minute_span(booking_type, start_time, end_time)
+
+
+def spans_overlap(first, second):
+    """
+    True when the two spans share a day and, on it, a minute.
+    """
+    return (first[0] <= second[1] and first[1] >= second[0]
+            and first[2] < second[3] and first[3] > second[2])
+
+
+def iter_days(start_date, end_date):
+    """
+    Yields every Jalali date from start_date to end_date inclusive.
+    """
+    return jalali.iter_dates(start_date, end_date)
+
+
+def to_bytes(mask):
+    return mask.to_bytes(MASK_BYTES, 'big')
+
+
+def from_bytes(value):
+    return int.from_bytes(bytes(value), 'big')
@@ -0,0 +1,41 @@
+from rest_framework.pagination import CursorPagination
+
+
+class BookingCursorPagination(CursorPagination):
+    """
+    Newest bookings first. The cursor encodes a created_at position, so a deep
+    page is an index range scan on (created_at, id) rather than an OFFSET;
+    id keeps the order stable between bookings created in the same instant.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class AuditLogCursorPagination(CursorPagination):
+    """
+    Newest audit entries first, keyed on (timestamp, id).
+    """
+    ordering = ('-timestamp', '-id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class MemberUpcomingCursorPagination(CursorPagination):
+    """
+    A member's current and upcoming bookings, soonest first. Backed by
+    booking_member_history_idx.
+    """
+    ordering = ('start_date_jalali', 'id')
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+
+
+class MemberPastCursorPagination(MemberUpcomingCursorPagination):
+    """
+    A member's past bookings, most recent first.
+    """
+    ordering = ('-start_date_jalali', '-id')
@@ -0,0 +1,58 @@
+"""
+Jalali recurrence rules for booking series.
+
+A rule is (frequency, interval, start, until): every `interval` days, weeks or
+Jalali months from `start` up to and including `until`. Monthly rules keep the
+day of the month, so a series starting on the 31st skips the months that are
+shorter than that instead of drifting to another day.
+
+Occurrences are generated lazily for a window of dates, so a long series never
+has to be expanded in full. Like occupancy.py this module has no model imports.
+"""
+from . import jalali
+
+DAILY = 'daily'
+WEEKLY = 'weekly'
+MONTHLY = 'monthly'
+
+
+def add_months(day, months):
+    """
+    Returns the Jalali date `months` months after day, or None when that month
+    has no such day (e.g. the 31st in Mehr).
+    """
+    month_index = day.year * 12 + (day.month - 1) + months
+    year, month = divmod(month_index, 12)
+    try:
+        return jalali.to_date(jalali.ordinal(year, month + 1, day.day))
+    except ValueError:
+        return None
+
+
+def iter_occurrences(frequency, interval, start, until, window_start=None, window_end=None):
+    """
+    Yields the occurrence dates of a rule that fall in [window_start, window_end]
+    (both optional), in order.
+    """
+    first = max(start, window_start) if window_start else start
+    last = min(until, window_end) if window_end else until
+    if first > last:
+        return
+
+    if frequency == MONTHLY:
+        # Jump straight to the first month that can reach the window
+        months = ((first.year - start.year) * 12 + first.month - start.month) // interval * interval
+        month_start = jalali.to_date(jalali.ordinal(start.year, start.month, 1))
+        while add_months(month_start, months) <= last:
+            day = add_months(start, months)
+            months += interval
+            if day is not None and first <= day <= last:
+                yield day
+        return
+
+    step = interval * (7 if frequency == WEEKLY else 1)
+    start_ordinal = jalali.to_ordinal(start)
+    offset = jalali.to_ordinal(first) - start_ordinal
+    first_ordinal = start_ordinal + -(-offset // step) * step
+    for day_ordinal in range(first_ordinal, jalali.to_ordinal(last) + 1, step):
+        yield jalali.to_date(day_ordinal)
@@ -0,0 +1,145 @@
+"""
+Booking reminders.
+
+Hourly bookings are reminded settings.REMINDER_HOURS_BEFORE hours before they
+start; daily and longer bookings the evening before, from
+settings.REMINDER_EVENING_HOUR. The send_booking_reminders task scans the due
+window on the integer span columns (booking_reminder_due_idx only holds
+bookings still owed a reminder), so a run costs in proportion to the bookings
+that are due rather than to the whole table.
+
+Delivery goes through the channels in settings.REMINDER_CHANNELS. Each channel
+sends a whole batch at once and reports which bookings it reached; a booking is
+marked reminded once any channel reached it, or when no channel applied to it.
+"""
+import logging
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Q
+from django.utils import timezone
+from . import sms
+from .models import Booking
+from .occupancy import DAY_MINUTES, local_now
+
+logger = logging.getLogger(__name__)
+
+
+def due_q(now):
+    """
+    Q for bookings whose reminder is due at now, a datetime on the bookings'
+    wall clock (see occupancy.local_now).
+    """
+    today = now.date().toordinal()
+    minute = now.hour * 60 + now.minute
+    horizon_day, horizon_minute = divmod(
+        today * DAY_MINUTES + minute + settings.REMINDER_HOURS_BEFORE * 60, DAY_MINUTES
+    )
+
+    upcoming = Q(start_day__gt=today) | Q(start_day=today, start_minute__gt=minute)
+    within = Q(start_day__lt=horizon_day) | Q(start_day=horizon_day, start_minute__lte=horizon_minute)
+    due = Q(booking_type='hourly') & upcoming & within
+    if now.hour >= settings.REMINDER_EVENING_HOUR:
+        due |= ~Q(booking_type='hourly') & Q(start_day=today + 1)
+
+    # Explicit bounds keep the scan on a short range of booking_reminder_due_idx
+    return Q(start_day__gte=today, start_day__lte=max(horizon_day, today + 1)) & due
+
+
+def due_reminders(now=None):
+    return Booking.objects.filter(
+        due_q(local_now(now)),
+        reminder_sent_at__isnull=True,
+        status__in=Booking.ACTIVE_STATUSES,
+    )
+
+
+def reminder_text(booking):
+    when = str(booking.start_date_jalali)
+    if booking.booking_type == 'hourly' and booking.start_time:
+        when += f" at {booking.start_time.strftime('%H:%M')}"
+    return (f"Reminder: your {booking.booking_type} booking for {booking.seat.space.name} "
+            f"({booking.seat.visual_id}) starts on {when}.")
+
+
+class EmailChannel:
+    """
+    One SMTP session per batch.
+    """
+    def send(self, bookings):
+        recipients = [booking for booking in bookings if booking.email]
+        if not recipients:
+            return [], []
+
+        delivered = []
+        failed = []
+        with get_connection() as connection:
+            for booking in recipients:
+                message = EmailMessage(
+                    subject='Booking Reminder',
+                    body=f"Dear {booking.full_name}, {reminder_text(booking)}",
+                    from_email=settings.EMAIL_HOST_USER,
+                    to=[booking.email],
+                    connection=connection,
+                )
+                try:
+                    connection.send_messages([message])
+                    delivered.append(booking.pk)
+                except Exception as e:
+                    logger.warning("Reminder email for booking %s failed: %s", booking.pk, e)
+                    failed.append(booking.pk)
+        return delivered, failed
+
+
+class SmsChannel:
+    """
+    Hands the whole batch to settings.SMS_BACKEND in one call.
+    """
+    def send(self, bookings):
+        recipients = [booking for booking in bookings if booking.mobile]
+        if not recipients:
+            return [], []
+
+        try:
+            sms.get_backend().send_messages([
+                sms.SmsMessage(to=booking.mobile, body=reminder_text(booking)) for booking in recipients
+            ])
+        except Exception as e:
+            logger.warning("Reminder SMS batch of %d failed: %s", len(recipients), e)
+            return [], [booking.pk for booking in recipients]
+        return [booking.pk for booking in recipients], []
+
+
+CHANNELS = {
+    'email': EmailChannel,
+    'sms': SmsChannel,
+}
+
+
+def get_channels():
+    return [CHANNELS[name]() for name in settings.REMINDER_CHANNELS]
+
+
+def deliver_reminders(bookings, channels):
+    """
+    Sends reminders for bookings over every channel and marks the ones that
+    went out. Returns the (reminded, failed) booking ids.
+    """
+    if not bookings:
+        return [], []
+
+    delivered = set()
+    failed = set()
+    for channel in channels:
+        channel_delivered, channel_failed = channel.send(bookings)
+        delivered.update(channel_delivered)
+        failed.update(channel_failed)
+    failed -= delivered
+
+    reminded = [booking.pk for booking in bookings if booking.pk not in failed]
+    # The null filter makes a concurrent or repeated run a no-op
+    Booking.objects.filter(pk__in=reminded, reminder_sent_at__isnull=True).update(
+        reminder_sent_at=timezone.now()
+    )
+    if failed:
+        Booking.objects.filter(pk__in=failed).update(reminder_attempts=F('reminder_attempts') + 1)
+    return reminded, list(failed)
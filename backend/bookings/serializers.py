@@ -1,9 +1,18 @@
 from rest_framework import serializers
-from .models import Space, Booking, Availability, Seat
-from .services import BookingService
+from .models import Space, Booking, BookingSeries, Availability, AuditLog, Seat, ArchivedBooking
+from .services import BookingService, AvailabilityService, SeriesService
 import jdatetime
 import datetime
+import uuid
 from django.core.exceptions import ValidationError as DjangoValidationError
+from . import jalali
+from . import archive
+
+# Maximum number of bookings accepted by one bulk request
+BULK_BOOKING_LIMIT = 100
+
+# Longest span a recurring series may cover
+MAX_SERIES_DAYS = 366
 
 class SpaceSerializer(serializers.ModelSerializer):
     class Meta:
@@ -15,21 +24,63 @@ class SeatSerializer(serializers.ModelSerializer):
         model = Seat
         fields = '__all__'
 
+class SeatField(serializers.PrimaryKeyRelatedField):
+    """
+    Seat lookup that uses context['seats'] ({pk: Seat}) when the caller has
+    preloaded them, e.g. for a bulk request.
+    """
+    def to_internal_value(self, data):
+        seats = self.context.get('seats')
+        if seats is None:
+            return super().to_internal_value(data)
+        try:
+            pk = uuid.UUID(str(data))
+        except ValueError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        seat = seats.get(pk)
+        if seat is None:
+            self.fail('does_not_exist', pk_value=data)
+        return seat
+
+class JalaliDateField(serializers.Field):
+    """
+    'YYYY-MM-DD' Jalali date, parsed and formatted with the bookings.jalali
+    tables instead of a Gregorian DateField relabelled as Jalali.
+    """
+    default_error_messages = {
+        'invalid': "Enter a valid Jalali date in YYYY-MM-DD format.",
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, jdatetime.date):
+            return data
+        try:
+            return jalali.parse_date(str(data))
+        except ValueError:
+            self.fail('invalid')
+
+    def to_representation(self, value):
+        return jalali.format_date(jalali.to_ordinal(value))
+
 class BookingSerializer(serializers.ModelSerializer):
+    seat = SeatField(queryset=Seat.objects.select_related('space'))
+    start_date_jalali = JalaliDateField()
+    end_date_jalali = JalaliDateField()
+
     class Meta:
         model = Booking
-        fields = '__all__'
-        read_only_fields = ['id', 'status', 'created_at', 'updated_at']
+        exclude = Booking.SPAN_FIELDS + ('confirmation_sent_at', 'confirmation_attempts', 'confirmation_error',
+                                           'reminder_sent_at', 'reminder_attempts')
+        read_only_fields = ['id', 'status', 'expires_at', 'series', 'created_at', 'updated_at']
 
     def to_jdate(self, value):
         if isinstance(value, datetime.date) and not isinstance(value, jdatetime.date):
-            return jdatetime.date(value.year, value.month, value.day)
+            return jalali.to_date(jalali.ordinal(value.year, value.month, value.day))
         return value
 
     def validate_start_date_jalali(self, value):
         value = self.to_jdate(value)
-        today = jdatetime.date.today()
-        if value < today:
+        if jalali.to_ordinal(value) < jalali.today():
              raise serializers.ValidationError("Start date cannot be in the past.", code='past_date')
         return value
 
@@ -57,10 +108,11 @@ class BookingSerializer(serializers.ModelSerializer):
 
         # 2. Date Logic
         if start_date and end_date:
-            if start_date > end_date:
+            span = jalali.days_between(start_date, end_date)
+            if span < 0:
                 raise serializers.ValidationError("Start date must be before or equal to end date.")
             
-            if booking_type == 'hourly' and start_date != end_date:
+            if booking_type == 'hourly' and span != 0:
                  raise serializers.ValidationError("Hourly bookings must be on the same day.")
 
         # 3. Time Logic
@@ -90,6 +142,169 @@ class BookingSerializer(serializers.ModelSerializer):
             else:
                 raise serializers.ValidationError(e.message, code=e.code if hasattr(e, 'code') else 'invalid')
 
+class AutoAssignBookingSerializer(BookingSerializer):
+    """
+    A booking for "any free seat" in a space or in every space of a type.
+    """
+    seat = serializers.PrimaryKeyRelatedField(read_only=True)
+    space = serializers.UUIDField(required=False, write_only=True)
+    space_type = serializers.ChoiceField(choices=Space.SPACE_TYPES, required=False, write_only=True)
+
+    def validate(self, data):
+        if not data.get('space') and not data.get('space_type'):
+            raise serializers.ValidationError("Either space or space_type is required.")
+        return super().validate(data)
+
+    def create(self, validated_data):
+        seats = AvailabilityService.bookable_seats(
+            validated_data.get('booking_type', 'hourly'),
+            space_id=validated_data.pop('space', None),
+            space_type=validated_data.pop('space_type', None)
+        )
+        try:
+            return BookingService.create_booking_any_seat(validated_data, seats)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages, code=getattr(e, 'code', 'invalid'))
+
+class FreeSeatQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of GET /seats/free/. Times only apply to hourly
+    requests, which must be on a single day.
+    """
+    space = serializers.UUIDField(required=False)
+    type = serializers.ChoiceField(choices=Space.SPACE_TYPES, required=False)
+    booking_type = serializers.ChoiceField(choices=Booking.BOOKING_TYPE_CHOICES, default='hourly')
+    date = JalaliDateField()
+    end_date = JalaliDateField(required=False)
+    start_time = serializers.TimeField(required=False)
+    end_time = serializers.TimeField(required=False)
+
+    def validate(self, data):
+        if not data.get('space') and not data.get('type'):
+            raise serializers.ValidationError("Either space or type is required.")
+
+        data.setdefault('end_date', data['date'])
+        span = jalali.days_between(data['date'], data['end_date'])
+        if span < 0:
+            raise serializers.ValidationError("Date must be before or equal to end date.")
+
+        if data['booking_type'] == 'hourly':
+            if span != 0:
+                raise serializers.ValidationError("Hourly bookings must be on the same day.")
+            if not data.get('start_time') or not data.get('end_time'):
+                raise serializers.ValidationError("Start and End times are required for hourly bookings.")
+            if data['start_time'] >= data['end_time']:
+                raise serializers.ValidationError("End time must be after start time.")
+        else:
+            # Longer bookings take whole days
+            data['start_time'] = data['end_time'] = None
+
+        return data
+
+class BulkBookingSerializer(serializers.Serializer):
+    """
+    Envelope for POST /bookings/bulk/. Items are validated one by one with
+    BookingSerializer so partial mode can report per-item errors.
+    """
+    MODE_CHOICES = [
+        ('all_or_nothing', 'All or nothing'),
+        ('partial', 'Partial success'),
+    ]
+
+    bookings = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=BULK_BOOKING_LIMIT
+    )
+    mode = serializers.ChoiceField(choices=MODE_CHOICES, default='all_or_nothing')
+
+class BookingSeriesSerializer(serializers.ModelSerializer):
+    seat = SeatField(queryset=Seat.objects.select_related('space'))
+    start_date_jalali = JalaliDateField()
+    until_date_jalali = JalaliDateField()
+
+    class Meta:
+        model = BookingSeries
+        fields = '__all__'
+        read_only_fields = ['id', 'status', 'materialized_until', 'created_at', 'updated_at']
+
+    to_jdate = BookingSerializer.to_jdate
+
+    def validate_start_date_jalali(self, value):
+        value = self.to_jdate(value)
+        if jalali.to_ordinal(value) < jalali.today():
+            raise serializers.ValidationError("Start date cannot be in the past.", code='past_date')
+        return value
+
+    def validate_until_date_jalali(self, value):
+        return self.to_jdate(value)
+
+    def validate(self, data):
+        seat = data.get('seat')
+        booking_type = data.get('booking_type', 'hourly')
+        start_date = data.get('start_date_jalali')
+        until_date = data.get('until_date_jalali')
+        start_time = data.get('start_time')
+        end_time = data.get('end_time')
+
+        if seat:
+            if booking_type == 'hourly' and not seat.space.allow_hourly:
+                raise serializers.ValidationError("Hourly bookings are not allowed for this space.")
+            if booking_type == 'daily' and not seat.space.allow_daily:
+                raise serializers.ValidationError("Daily bookings are not allowed for this space.")
+
+        span = jalali.days_between(start_date, until_date)
+        if span < 0:
+            raise serializers.ValidationError("Start date must be before or equal to the until date.")
+        if span >= MAX_SERIES_DAYS:
+            raise serializers.ValidationError(f"A series cannot span more than {MAX_SERIES_DAYS} days.")
+
+        if booking_type == 'hourly':
+            if not start_time or not end_time:
+                raise serializers.ValidationError("Start and End times are required for hourly bookings.")
+            if start_time >= end_time:
+                raise serializers.ValidationError("End time must be after start time.")
+
+        return data
+
+    def create(self, validated_data):
+        try:
+            return SeriesService.create_series(validated_data)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages, code=getattr(e, 'code', 'invalid'))
+
+class MemberBookingSerializer(serializers.Serializer):
+    """
+    Slim read-only view of a booking row from BookingService.member_history.
+    """
+    id = serializers.UUIDField()
+    seat = serializers.CharField(source='seat__visual_id')
+    space = serializers.CharField(source='seat__space__name')
+    booking_type = serializers.CharField()
+    start_date_jalali = serializers.CharField()
+    end_date_jalali = serializers.CharField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    status = serializers.CharField()
+
+class ArchivedBookingSerializer(serializers.ModelSerializer):
+    """
+    An archived booking: the index row plus the full record from the archive file.
+    """
+    record = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedBooking
+        exclude = ['path', 'offset']
+
+    def get_record(self, obj):
+        return archive.read_record(obj)
+
+class AuditLogSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditLog
+        fields = '__all__'
+
 class AvailabilitySerializer(serializers.Serializer):
     """
     Serializer for checking availability status (simplified).
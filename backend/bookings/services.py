@@ -1,23 +1,137 @@
-from django.db import transaction
-from .models import Booking, AuditLog
+from collections import defaultdict
+from functools import reduce
+import operator
+from django.db import transaction, connection, IntegrityError, OperationalError
+from decimal import Decimal
+from django.db.models import Q, F, Exists, OuterRef, Case, When, Value, Sum, Count, Max, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from django.conf import settings
+from .models import (
+    Booking, BookingSeries, AuditLog, Seat, SeatOccupancy, DailyStats, DailyStatsDirtyDay, OutboxMessage
+)
 from django.core.exceptions import ValidationError
-from .tasks import send_booking_confirmation_email
+from .tasks import send_booking_confirmation_emails, send_hold_expiry_notices, send_series_conflict_notices
+from . import occupancy
+from . import recurrence
+from . import jalali
+from . import metrics
+from . import cache as availability_cache
+from .expressions import DaySpan
 import jdatetime
 import datetime
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+DAY_MINUTES = 24 * 60
+
+def format_minute(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
 
 class BookingService:
+    # Retry policy for serialization failures / lock timeouts
+    MAX_ATTEMPTS = 3
+    RETRY_BACKOFF = 0.05  # seconds, multiplied by the attempt number
+
+    # Bookings per bulk_update_status call in complete_ended() and expire_holds()
+    COMPLETION_CHUNK_SIZE = 500
+
     @staticmethod
-    def safe_send_email(booking_id):
-        try:
-            send_booking_confirmation_email.delay(booking_id)
-        except Exception as e:
-            print(f"Warning: Failed to queue email task for booking {booking_id}: {e}")
+    def hold_expires_at():
+        """
+        Expiry for a pending booking created now, or None when holds do not expire.
+        """
+        if not settings.PENDING_HOLD_TTL:
+            return None
+        return timezone.now() + datetime.timedelta(seconds=settings.PENDING_HOLD_TTL)
+
+    @staticmethod
+    def queue_confirmation(booking_ids):
+        """
+        Records the confirmation email(s) in the outbox, inside the caller's
+        transaction; OutboxService.dispatch sends them after commit.
+        """
+        if not booking_ids:
+            return
+        OutboxService.enqueue(
+            OutboxService.BOOKING_CONFIRMATION,
+            {'booking_ids': [str(booking_id) for booking_id in booking_ids]}
+        )
+
+    @staticmethod
+    def database_enforces_overlap():
+        """
+        On PostgreSQL the booking_seat_no_overlap exclusion constraint rejects
+        conflicting inserts, so no separate availability query is needed.
+        """
+        return connection.vendor == 'postgresql'
+
+    @staticmethod
+    def is_overlap_violation(error):
+        cause = getattr(error, '__cause__', None)
+        diag = getattr(cause, 'diag', None)
+        if diag is not None and getattr(diag, 'constraint_name', None):
+            return diag.constraint_name == Booking.OVERLAP_CONSTRAINT
+        return Booking.OVERLAP_CONSTRAINT in str(error)
+
+    @staticmethod
+    def is_retryable(error):
+        """
+        Serialization failures, deadlocks and SQLite write locks are worth retrying.
+        """
+        cause = getattr(error, '__cause__', None)
+        if getattr(cause, 'pgcode', None) in ('40001', '40P01'):
+            return True
+        sqlstate = getattr(getattr(cause, 'diag', None), 'sqlstate', None)
+        if sqlstate in ('40001', '40P01'):
+            return True
+        return 'database is locked' in str(error)
+
+    @staticmethod
+    def lock_seat(seat):
+        """
+        Serializes bookings per seat: row lock on the Seat for the rest of the
+        current transaction. (No-op on SQLite, which locks the whole database.)
+        """
+        Seat.objects.select_for_update().filter(pk=seat.pk).values_list('pk', flat=True).first()
+
+    @staticmethod
+    def with_retries(operation, failure_message):
+        """
+        Runs operation(), retrying serialization failures when not nested in
+        another transaction. An OperationalError that is not retried becomes a
+        booking_creation_failed ValidationError.
+        """
+        attempts = 1 if connection.in_atomic_block else BookingService.MAX_ATTEMPTS
+
+        for attempt in range(1, attempts + 1):
+            try:
+                return operation()
+            except OperationalError as e:
+                if attempt < attempts and BookingService.is_retryable(e):
+                    time.sleep(BookingService.RETRY_BACKOFF * attempt)
+                    continue
+                raise ValidationError(
+                    f"{failure_message}: {str(e)}",
+                    code='booking_creation_failed'
+                )
 
     @staticmethod
+    @metrics.BOOKING_CREATE_LATENCY.time()
+    @metrics.counting_rejections()
     def create_booking(data):
         """
         Creates a booking with validation, transaction, and audit logging.
+        Retries on serialization failures when not nested in another transaction.
         """
+        return BookingService.with_retries(
+            lambda: BookingService._create_booking_locked(data), "Failed to create booking"
+        )
+
+    @staticmethod
+    def _create_booking_locked(data):
         seat = data.get('seat')
         start_date = data.get('start_date_jalali')
         end_date = data.get('end_date_jalali')
@@ -25,16 +139,25 @@ class BookingService:
         end_time = data.get('end_time')
         booking_type = data.get('booking_type', 'hourly')
 
-        # Check availability
-        if not AvailabilityService.is_seat_available(seat, start_date, end_date, start_time, end_time):
-             raise ValidationError(
-                 "The selected seat is not available for the requested time.",
-                 code='seat_unavailable'
-             )
-
         try:
             with transaction.atomic():
-                booking = Booking.objects.create(**data)
+                BookingService.lock_seat(seat)
+
+                # Check availability under the seat lock (PostgreSQL enforces it on insert instead)
+                if BookingService.database_enforces_overlap():
+                    BookingService.release_expired_holds([seat.pk], *occupancy.booking_span(
+                        booking_type, start_date, end_date, start_time, end_time
+                    ))
+                else:
+                    if not AvailabilityService.is_seat_available(
+                        seat, start_date, end_date, start_time, end_time, booking_type=booking_type
+                    ):
+                         raise ValidationError(
+                             "The selected seat is not available for the requested time.",
+                             code='seat_unavailable'
+                         )
+
+                booking = Booking.objects.create(**{'expires_at': BookingService.hold_expires_at(), **data})
                 
                 # Create Audit Log
                 AuditLog.objects.create(
@@ -44,78 +167,1190 @@ class BookingService:
                     notes=f"Booking created ({booking_type})"
                 )
                 
-                transaction.on_commit(lambda: BookingService.safe_send_email(booking.id))
+                BookingService.queue_confirmation([booking.id])
                 
                 return booking
+        except IntegrityError as e:
+            if BookingService.is_overlap_violation(e):
+                raise ValidationError(
+                    "The selected seat is not available for the requested time.",
+                    code='seat_unavailable'
+                )
+            raise ValidationError(
+                f"Failed to create booking: {str(e)}",
+                code='booking_creation_failed'
+            )
+        except (ValidationError, OperationalError):
+            raise
         except Exception as e:
-            if isinstance(e, ValidationError):
-                raise e
             raise ValidationError(
                 f"Failed to create booking: {str(e)}",
                 code='booking_creation_failed'
             )
 
+    # Columns returned by member_history; all but the seat/space names come
+    # straight from booking_member_history_idx
+    MEMBER_HISTORY_FIELDS = (
+        'id', 'booking_type', 'start_date_jalali', 'end_date_jalali', 'start_time', 'end_time',
+        'status', 'seat__visual_id', 'seat__space__name',
+    )
+
+    @staticmethod
+    def member_history(user, when='upcoming'):
+        """
+        Bookings made under the user's national ID, as dicts of
+        MEMBER_HISTORY_FIELDS. 'upcoming' includes bookings still in
+        progress today; 'past' is everything that has ended. Ordering is left
+        to the caller (see bookings.pagination).
+        """
+        today = jdatetime.date.today()
+        queryset = Booking.objects.filter(national_id=user.national_id)
+        if when == 'past':
+            queryset = queryset.filter(end_date_jalali__lt=today)
+        else:
+            queryset = queryset.filter(end_date_jalali__gte=today)
+        return queryset.values(*BookingService.MEMBER_HISTORY_FIELDS)
+
+    @staticmethod
+    def create_booking_any_seat(data, seats):
+        """
+        Books the first free seat out of seats (see AvailabilityService.find_free_seat).
+        If another request takes that seat first, the next free one is tried.
+        """
+        start_time, end_time = data.get('start_time'), data.get('end_time')
+        if data.get('booking_type', 'hourly') != 'hourly':
+            start_time = end_time = None
+
+        taken = []
+        for attempt in range(BookingService.MAX_ATTEMPTS):
+            seat = AvailabilityService.find_free_seat(
+                seats.exclude(pk__in=taken),
+                data['start_date_jalali'], data['end_date_jalali'], start_time, end_time
+            )
+            if seat is None:
+                break
+            try:
+                return BookingService.create_booking({**data, 'seat': seat})
+            except ValidationError as e:
+                if e.code != 'seat_unavailable':
+                    raise
+                taken.append(seat.pk)
+
+        metrics.BOOKING_REJECTIONS.labels(code='no_seat_available').inc()
+        raise ValidationError(
+            "No seat is available for the requested time.",
+            code='no_seat_available'
+        )
+
+    @staticmethod
+    def create_bookings_bulk(items, all_or_nothing=True, notify=True):
+        """
+        Creates many bookings in one transaction.
+
+        items is a list of (key, data) pairs of validated booking data. All
+        affected seats are locked, candidate conflicts for every seat and date
+        in the batch are loaded with one query, and the batch is also checked
+        against itself. Accepted bookings and their audit logs are written with
+        bulk_create.
+
+        Returns (created_bookings, rejected) where rejected maps key to a
+        ValidationError. With all_or_nothing, any rejection means nothing is
+        written and created_bookings is empty. notify=False skips the
+        confirmation emails. Serialization failures are retried like
+        create_booking's.
+        """
+        if not items:
+            return [], {}
+        return BookingService.with_retries(
+            lambda: BookingService._create_bookings_bulk_locked(items, all_or_nothing, notify),
+            "Failed to create bookings"
+        )
+
+    @staticmethod
+    def _create_bookings_bulk_locked(items, all_or_nothing, notify):
+        seat_ids = sorted({data['seat'].pk for _, data in items})
+        first_day = min(data['start_date_jalali'] for _, data in items)
+        last_day = max(data['end_date_jalali'] for _, data in items)
+
+        try:
+            with transaction.atomic():
+                # Lock in a stable order so concurrent batches cannot deadlock
+                list(Seat.objects.select_for_update().filter(pk__in=seat_ids).order_by('pk').values_list('pk', flat=True))
+                if BookingService.database_enforces_overlap():
+                    BookingService.release_expired_holds(
+                        seat_ids, jalali.to_ordinal(first_day), jalali.to_ordinal(last_day)
+                    )
+
+                taken = defaultdict(list)
+                existing = Booking.objects.filter(
+                    AvailabilityService.active_q(),
+                    seat_id__in=seat_ids,
+                    start_day__lte=jalali.to_ordinal(last_day),
+                    end_day__gte=jalali.to_ordinal(first_day)
+                ).values_list('seat_id', *Booking.SPAN_FIELDS)
+                for seat_id, *span in existing:
+                    taken[seat_id].append(tuple(span))
+
+                accepted = []
+                rejected = {}
+                hold_expires_at = BookingService.hold_expires_at()
+                for key, data in items:
+                    booking = Booking(**{'expires_at': hold_expires_at, **data})
+                    booking.sync_span()
+                    booking.sync_hold()
+                    span = (booking.start_day, booking.end_day, booking.start_minute, booking.end_minute)
+                    seat_taken = taken[data['seat'].pk]
+
+                    if any(occupancy.spans_overlap(span, other) for other in seat_taken):
+                        rejected[key] = ValidationError(
+                            "The selected seat is not available for the requested time.",
+                            code='seat_unavailable'
+                        )
+                        continue
+
+                    # Later items in the batch must not overlap this one either
+                    seat_taken.append(span)
+                    accepted.append(booking)
+
+                if rejected:
+                    metrics.BOOKING_REJECTIONS.labels(code='seat_unavailable').inc(len(rejected))
+                if rejected and all_or_nothing:
+                    return [], rejected
+
+                bookings = Booking.objects.bulk_create(accepted)
+                AuditLog.objects.bulk_create([
+                    AuditLog(
+                        booking=booking,
+                        action='created',
+                        new_status=booking.status,
+                        notes=f"Booking created ({booking.booking_type}, bulk)"
+                    )
+                    for booking in bookings
+                ])
+
+                # bulk_create skips model signals
+                OccupancyService.rebuild([
+                    (booking.seat_id, booking.start_date_jalali, booking.end_date_jalali) for booking in bookings
+                ])
+                availability_cache.invalidate_spans([
+                    (booking.seat.space_id, booking.start_date_jalali, booking.end_date_jalali) for booking in bookings
+                ])
+
+                if notify:
+                    BookingService.queue_confirmation([booking.id for booking in bookings])
+
+                return bookings, rejected
+        except IntegrityError as e:
+            if BookingService.is_overlap_violation(e):
+                raise ValidationError(
+                    "Some bookings in the batch are not available.",
+                    code='seat_unavailable'
+                )
+            raise ValidationError(
+                f"Failed to create bookings: {str(e)}",
+                code='booking_creation_failed'
+            )
+
+    @staticmethod
+    def bulk_update_status(queryset, status, changed_by=None, notes=''):
+        """
+        Moves every booking in queryset to status in a fixed number of queries:
+        the seat locks, one locked read of the previous statuses, one UPDATE,
+        one AuditLog bulk_create, then a single occupancy rebuild and cache
+        invalidation for every affected span.
+
+        Moving cancelled, completed or expired bookings back to an active
+        status is refused with a seat_unavailable ValidationError when any of
+        them would overlap an active booking (see reactivation_conflicts).
+
+        Returns the number of bookings that changed.
+        """
+        try:
+            return BookingService._bulk_update_status(queryset, status, changed_by, notes)
+        except IntegrityError as e:
+            if BookingService.is_overlap_violation(e):
+                raise ValidationError(
+                    "Some of the selected bookings overlap an active booking on their seat.",
+                    code='seat_unavailable'
+                )
+            raise
+
+    @staticmethod
+    def _bulk_update_status(queryset, status, changed_by, notes):
+        action = 'cancelled' if status == 'cancelled' else 'updated'
+
+        with transaction.atomic():
+            changing = queryset.exclude(status=status)
+            # Seats before bookings, the order booking creation takes them in,
+            # so a booking made on one of these seats meanwhile cannot deadlock
+            seat_ids = sorted(set(changing.values_list('seat_id', flat=True)))
+            if not seat_ids:
+                return 0
+            list(Seat.objects.select_for_update().filter(pk__in=seat_ids).order_by('pk').values_list('pk', flat=True))
+
+            rows = list(changing.select_for_update(of=('self',)).values_list(
+                'id', 'status', 'seat_id', 'seat__space_id', 'start_date_jalali', 'end_date_jalali'
+            ))
+            if not rows:
+                return 0
+
+            ids = [row[0] for row in rows]
+            if status in Booking.ACTIVE_STATUSES:
+                conflicts = BookingService.reactivation_conflicts(ids)
+                if conflicts:
+                    metrics.BOOKING_REJECTIONS.labels(code='seat_unavailable').inc(len(conflicts))
+                    raise ValidationError(
+                        "%(count)d of the selected bookings overlap an active booking on their seat.",
+                        code='seat_unavailable',
+                        params={'count': len(conflicts)}
+                    )
+
+            # Only pending bookings are holds (see Booking.sync_hold)
+            Booking.objects.filter(pk__in=ids).update(status=status, expires_at=None, updated_at=timezone.now())
+
+            AuditLog.objects.bulk_create([
+                AuditLog(
+                    booking_id=booking_id,
+                    action=action,
+                    previous_status=previous,
+                    new_status=status,
+                    changed_by=changed_by,
+                    notes=notes
+                )
+                for booking_id, previous, *_ in rows
+            ])
+
+            OccupancyService.rebuild([(seat_id, start, end) for _, _, seat_id, _, start, end in rows])
+            availability_cache.invalidate_spans([(space_id, start, end) for _, _, _, space_id, start, end in rows])
+
+        return len(rows)
+
+    @staticmethod
+    def reactivation_conflicts(ids):
+        """
+        Ids among ids that do not hold their seat now (cancelled, completed or
+        expired) and would clash if they became active again, either with a
+        booking that is active or with another one in ids. One query, plus an
+        in-memory check within the batch.
+        """
+        dormant = Booking.objects.filter(pk__in=ids).exclude(AvailabilityService.active_q())
+        clashing = Booking.objects.filter(
+            AvailabilityService.active_q(),
+            seat_id=OuterRef('seat_id'),
+            start_day__lte=OuterRef('end_day'),
+            end_day__gte=OuterRef('start_day'),
+            start_minute__lt=OuterRef('end_minute'),
+            end_minute__gt=OuterRef('start_minute')
+        )
+        rows = dormant.annotate(clashes=Exists(clashing)).values_list(
+            'id', 'seat_id', 'clashes', *Booking.SPAN_FIELDS
+        )
+
+        conflicts = set()
+        by_seat = defaultdict(list)
+        for booking_id, seat_id, clashes, *span in rows:
+            if clashes or any(occupancy.spans_overlap(span, other) for _, other in by_seat[seat_id]):
+                conflicts.add(booking_id)
+            by_seat[seat_id].append((booking_id, span))
+        return conflicts
+
+    @staticmethod
+    def ended_q(now=None):
+        """
+        Q for bookings whose end has passed at now, judged on the bookings'
+        wall clock (see occupancy.local_now).
+        """
+        now = occupancy.local_now(now)
+        today = now.date().toordinal()
+        minute = now.hour * 60 + now.minute
+        return Q(end_day__lt=today) | Q(end_day=today, end_minute__lte=minute)
+
+    @staticmethod
+    def complete_ended(now=None, chunk_size=None):
+        """
+        Moves confirmed bookings that have ended to completed, chunk_size at a
+        time, each chunk through bulk_update_status (one UPDATE, one AuditLog
+        bulk_create). Keeps the active set to current and future bookings.
+        Pending bookings are left alone, since they were never confirmed.
+        Returns the number of bookings completed.
+        """
+        chunk_size = chunk_size or BookingService.COMPLETION_CHUNK_SIZE
+        ended = Booking.objects.filter(BookingService.ended_q(now), status='confirmed')
+
+        completed = 0
+        while True:
+            # booking_active_end_idx serves this in end order
+            ids = list(ended.order_by('end_day', 'id').values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                return completed
+            completed += BookingService.bulk_update_status(
+                Booking.objects.filter(pk__in=ids, status='confirmed'), 'completed',
+                changed_by='System', notes="Completed after end"
+            )
+            if len(ids) < chunk_size:
+                return completed
+
+    @staticmethod
+    def release_expired_holds(seat_ids, start_day, end_day, start_minute=0, end_minute=DAY_MINUTES):
+        """
+        Cancels the expired holds on seat_ids that overlap the given span
+        before an insert, so they cannot trip the PostgreSQL exclusion
+        constraint. Holds that do not overlap are left to expire_holds(). The
+        caller holds the seat locks.
+        """
+        return BookingService.cancel_expired_holds(Booking.objects.filter(
+            AvailabilityService.expired_q(),
+            seat_id__in=seat_ids, start_day__lte=end_day, end_day__gte=start_day,
+            start_minute__lt=end_minute, end_minute__gt=start_minute
+        ))
+
+    @staticmethod
+    def cancel_expired_holds(queryset):
+        """
+        Cancels the expired holds in queryset and queues the notice telling
+        their customers, in one transaction. Returns the number cancelled.
+        """
+        with transaction.atomic():
+            # Locked first, so the notice goes to exactly the holds cancelled
+            ids = list(queryset.select_for_update(of=('self',)).values_list('id', flat=True))
+            if not ids:
+                return 0
+            cancelled = BookingService.bulk_update_status(
+                Booking.objects.filter(pk__in=ids), 'cancelled', changed_by='System', notes="Hold expired"
+            )
+            OutboxService.enqueue(
+                OutboxService.BOOKING_HOLD_EXPIRED,
+                {'booking_ids': [str(booking_id) for booking_id in ids]}
+            )
+        return cancelled
+
+    @staticmethod
+    def expire_holds(now=None, chunk_size=None):
+        """
+        Cancels pending bookings whose hold has expired, chunk_size at a time
+        through cancel_expired_holds. Availability checks already ignore them;
+        this returns their seats to the occupancy bitmaps and caches and keeps
+        the active set small. Returns the number of holds cancelled.
+        """
+        chunk_size = chunk_size or BookingService.COMPLETION_CHUNK_SIZE
+        expired = Booking.objects.filter(AvailabilityService.expired_q(now))
+
+        cancelled = 0
+        while True:
+            ids = list(expired.order_by('expires_at', 'id').values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                return cancelled
+            cancelled += BookingService.cancel_expired_holds(
+                Booking.objects.filter(AvailabilityService.expired_q(now), pk__in=ids)
+            )
+            if len(ids) < chunk_size:
+                return cancelled
+
+class SeriesService:
+    """
+    Recurring bookings. A series is stored as a rule; only the occurrences up to
+    HORIZON_DAYS ahead exist as Booking rows, and materialize_due() moves that
+    window forward.
+    """
+    HORIZON_DAYS = 28
+
+    @staticmethod
+    def occurrences(series, window_start=None, window_end=None):
+        return recurrence.iter_occurrences(
+            series.frequency, series.interval,
+            series.start_date_jalali, series.until_date_jalali,
+            window_start, window_end
+        )
+
+    @staticmethod
+    def horizon():
+        return jdatetime.date.today() + jdatetime.timedelta(days=SeriesService.HORIZON_DAYS)
+
+    @staticmethod
+    def duration_hours(series):
+        if series.booking_type != 'hourly':
+            return None
+        minutes = (series.end_time.hour * 60 + series.end_time.minute) - \
+                  (series.start_time.hour * 60 + series.start_time.minute)
+        return (Decimal(minutes) / 60).quantize(Decimal('0.1'))
+
+    @staticmethod
+    def occurrence_data(series, day):
+        return {
+            'seat': series.seat,
+            'series': series,
+            'full_name': series.full_name,
+            'national_id': series.national_id,
+            'mobile': series.mobile,
+            'email': series.email,
+            'booking_type': series.booking_type,
+            'start_date_jalali': day,
+            'end_date_jalali': day,
+            'start_time': series.start_time,
+            'end_time': series.end_time,
+            'duration_hours': SeriesService.duration_hours(series),
+            'terms_accepted': series.terms_accepted,
+            # Occurrences come from the series, not a checkout, so they do not expire
+            'expires_at': None,
+        }
+
+    @staticmethod
+    def find_conflicts(series, window_start=None, window_end=None):
+        """
+        Returns the occurrence dates in the window that clash with an active
+        booking on the series' seat. Bookings for the whole window are loaded
+        with one query, however many occurrences the rule has.
+        """
+        days = list(SeriesService.occurrences(series, window_start, window_end))
+        if not days:
+            return []
+
+        occurrences = {jalali.to_ordinal(day): day for day in days}
+        first, last = min(occurrences), max(occurrences)
+        start_minute, end_minute = occupancy.minute_span(series.booking_type, series.start_time, series.end_time)
+        existing = Booking.objects.filter(
+            AvailabilityService.active_q(),
+            seat_id=series.seat_id,
+            start_day__lte=last,
+            end_day__gte=first,
+            start_minute__lt=end_minute,
+            end_minute__gt=start_minute
+        ).values_list('start_day', 'end_day')
+
+        clashing = set()
+        for start_day, end_day in existing:
+            clashing.update(
+                day for day in range(max(start_day, first), min(end_day, last) + 1) if day in occurrences
+            )
+        return [occurrences[day] for day in sorted(clashing)]
+
+    @staticmethod
+    def create_series(data):
+        """
+        Creates a series after checking every occurrence against existing
+        bookings, then materializes the first HORIZON_DAYS of it.
+        """
+        with transaction.atomic():
+            BookingService.lock_seat(data['seat'])
+            series = BookingSeries(**data)
+
+            conflicts = SeriesService.find_conflicts(series)
+            if conflicts:
+                raise ValidationError(
+                    "The selected seat is not available on %(dates)s.",
+                    code='seat_unavailable',
+                    params={'dates': ', '.join(str(day) for day in conflicts[:5])}
+                )
+
+            series.save()
+            bookings, _ = SeriesService.materialize(series)
+
+            # One confirmation for the series, not one per occurrence
+            if bookings:
+                BookingService.queue_confirmation([bookings[0].id])
+
+        return series
+
+    @staticmethod
+    def materialize(series, through=None):
+        """
+        Stores the occurrences after series.materialized_until up to through
+        (default: HORIZON_DAYS from today). Occurrences whose slot was taken in
+        the meantime are skipped, and the series owner is sent a notice of them
+        through the outbox.
+
+        Returns (created_bookings, skipped_dates).
+        """
+        through = min(through or SeriesService.horizon(), series.until_date_jalali)
+        if series.materialized_until is not None:
+            start = series.materialized_until + jdatetime.timedelta(days=1)
+        else:
+            start = series.start_date_jalali
+        if start > through:
+            return [], []
+
+        items = [
+            (day, SeriesService.occurrence_data(series, day))
+            for day in SeriesService.occurrences(series, start, through)
+        ]
+        with transaction.atomic():
+            bookings, rejected = BookingService.create_bookings_bulk(items, all_or_nothing=False, notify=False)
+            series.materialized_until = through
+            series.save(update_fields=['materialized_until', 'updated_at'])
+
+            skipped = sorted(rejected)
+            if skipped:
+                OutboxService.enqueue(
+                    OutboxService.SERIES_CONFLICT,
+                    {'series_id': str(series.pk), 'dates': [str(day) for day in skipped]}
+                )
+
+        if skipped:
+            logger.warning(
+                "Series %s: skipped %d occurrence(s) that are no longer available: %s",
+                series.pk, len(skipped), ', '.join(str(day) for day in skipped)
+            )
+        return bookings, skipped
+
+    @staticmethod
+    def materialize_due():
+        """
+        Extends every active series up to the horizon. Returns the number of
+        bookings created.
+        """
+        through = SeriesService.horizon()
+        due = BookingSeries.objects.filter(status='active').filter(
+            Q(materialized_until__isnull=True) | Q(materialized_until__lt=through)
+        ).exclude(
+            materialized_until__gte=F('until_date_jalali')
+        ).select_related('seat__space')
+
+        created = 0
+        for series in due.iterator():
+            bookings, _ = SeriesService.materialize(series, through)
+            created += len(bookings)
+        return created
+
+    @staticmethod
+    def cancel_series(series, changed_by=None):
+        """
+        Cancels the series and its upcoming occurrences. Returns the number of
+        bookings cancelled.
+        """
+        with transaction.atomic():
+            series.status = 'cancelled'
+            series.save(update_fields=['status', 'updated_at'])
+            upcoming = series.occurrences.filter(
+                status__in=Booking.ACTIVE_STATUSES,
+                start_date_jalali__gte=jdatetime.date.today()
+            )
+            return BookingService.bulk_update_status(
+                upcoming, 'cancelled', changed_by=changed_by, notes="Series cancelled"
+            )
+
+
 class AvailabilityService:
     @staticmethod
-    def is_seat_available(seat, start_date, end_date, start_time=None, end_time=None):
+    @metrics.SEAT_AVAILABILITY_LATENCY.time()
+    def is_seat_available(seat, start_date, end_date, start_time=None, end_time=None, booking_type='hourly'):
         """
         Checks if a specific seat is available for the given range.
         """
-        # 1. Query potential conflicting bookings
-        # We look for any booking on this seat that overlaps in DATE first.
-        qs = Booking.objects.filter(
+        # 1. Fast path: AND the request against the seat's day bitmaps.
+        # Cost depends on the number of days requested, not on how many bookings exist.
+        requested = occupancy.booking_mask(booking_type, start_time, end_time)
+        day_masks = SeatOccupancy.objects.filter(
             seat=seat,
-            status__in=['pending', 'confirmed'],
+            date_jalali__range=(start_date, end_date)
+        ).values_list('slots', flat=True)
+
+        if not any(occupancy.from_bytes(slots) & requested for slots in day_masks):
+            return True
+
+        # 2. Bitmaps are rounded to whole slots, so confirm a hit with an exact
+        # EXISTS over the integer span columns.
+        return not Booking.objects.filter(
+            AvailabilityService.overlap_q(start_date, end_date, start_time, end_time, booking_type),
+            seat=seat
+        ).exists()
+
+    @staticmethod
+    def expired_q(now=None):
+        """
+        Q for pending bookings whose hold has expired at now.
+        """
+        return Q(status='pending', expires_at__lte=now or timezone.now())
+
+    @staticmethod
+    def active_q(now=None):
+        """
+        Q for the bookings that hold their seat: confirmed ones, and pending
+        ones whose hold has not expired, whether or not expire_holds() has
+        cancelled it yet.
+        """
+        return Q(status__in=Booking.ACTIVE_STATUSES) & ~AvailabilityService.expired_q(now)
+
+    @staticmethod
+    def overlap_q(start_date, end_date, start_time=None, end_time=None, booking_type='hourly'):
+        """
+        Q over Booking matching the active bookings that clash with the
+        requested interval: integer comparisons on the span columns, indexed
+        together with seat and status. Without times the request takes whole
+        days.
+        """
+        start_day, end_day, start_minute, end_minute = occupancy.booking_span(
+            booking_type, start_date, end_date, start_time, end_time
+        )
+        return AvailabilityService.active_q() & Q(
+            start_day__lte=end_day,
+            end_day__gte=start_day,
+            start_minute__lt=end_minute,
+            end_minute__gt=start_minute
+        )
+
+    @staticmethod
+    def bookable_seats(booking_type, space_id=None, space_type=None):
+        """
+        Active seats in active spaces that accept booking_type, optionally
+        limited to one space or one space type.
+        """
+        seats = Seat.objects.filter(
+            is_active=True,
+            space__is_active=True,
+            **{f'space__allow_{booking_type}': True}
+        )
+        if space_id:
+            seats = seats.filter(space_id=space_id)
+        if space_type:
+            seats = seats.filter(space__type=space_type)
+        return seats
+
+    @staticmethod
+    def find_free_seat(seats, start_date, end_date, start_time=None, end_time=None):
+        """
+        First seat in seats with no clashing booking, or None. A single query
+        with an anti-join, whatever the number of seats; ties are broken by
+        visual_id then id so repeated calls pick the same seat.
+        """
+        busy = Booking.objects.filter(
+            AvailabilityService.overlap_q(start_date, end_date, start_time, end_time),
+            seat=OuterRef('pk')
+        )
+        return seats.filter(~Exists(busy)).select_related('space').order_by('visual_id', 'id').first()
+
+    # Day codes used by seat_day_matrix
+    DAY_AVAILABLE = 'A'
+    DAY_PARTIAL = 'P'
+    DAY_BOOKED = 'B'
+
+    @staticmethod
+    def seat_day_matrix(seat_ids, start_date, end_date):
+        """
+        Builds a seats x days status grid for [start_date, end_date].
+
+        Runs a single range query over Booking and sweeps the busy intervals in
+        memory. Returns {seat_id: 'AAPB...'} with one code per day.
+        """
+        first_ordinal = jalali.to_ordinal(start_date)
+        day_count = jalali.to_ordinal(end_date) - first_ordinal + 1
+
+        rows = Booking.objects.filter(
+            AvailabilityService.active_q(),
+            seat_id__in=seat_ids,
             start_date_jalali__lte=end_date,
             end_date_jalali__gte=start_date
+        ).values_list('seat_id', 'booking_type', 'start_date_jalali', 'end_date_jalali', 'start_time', 'end_time')
+
+        busy = defaultdict(list)
+        for seat_id, booking_type, b_start, b_end, b_start_time, b_end_time in rows:
+            interval = AvailabilityService.day_interval(booking_type, b_start_time, b_end_time)
+            first = max(jalali.to_ordinal(b_start) - first_ordinal, 0)
+            last = min(jalali.to_ordinal(b_end) - first_ordinal, day_count - 1)
+            for index in range(first, last + 1):
+                busy[(seat_id, index)].append(interval)
+
+        matrix = {}
+        for seat_id in seat_ids:
+            codes = []
+            for index in range(day_count):
+                intervals = busy.get((seat_id, index))
+                codes.append(AvailabilityService.day_code(intervals))
+            matrix[seat_id] = ''.join(codes)
+
+        return matrix
+
+    @staticmethod
+    def day_code(intervals):
+        """
+        Classifies a day from its busy (start_minute, end_minute) intervals.
+        """
+        if not intervals:
+            return AvailabilityService.DAY_AVAILABLE
+
+        # Sweep the sorted intervals and check whether they cover the whole day.
+        covered_until = 0
+        for interval_start, interval_end in sorted(intervals):
+            if interval_start > covered_until:
+                break
+            covered_until = max(covered_until, interval_end)
+
+        if covered_until >= DAY_MINUTES:
+            return AvailabilityService.DAY_BOOKED
+        return AvailabilityService.DAY_PARTIAL
+
+    @staticmethod
+    def seat_statuses_for_date(space_ids, day):
+        """
+        Status and busy intervals of every booked seat in the given spaces on day.
+
+        Served from the availability cache per (space, day); misses are computed
+        with one values() query over Booking and written back. Returns
+        {seat_id (str): {'status', 'busy', ['booked_until']}}; seats that are
+        absent are available.
+        """
+        payloads = availability_cache.get_day_statuses(space_ids, day)
+        missing = [space_id for space_id in space_ids if space_id not in payloads]
+
+        if missing:
+            computed = {space_id: {} for space_id in missing}
+            busy = AvailabilityService.busy_intervals_for_date(missing, day)
+            for (space_id, seat_id), intervals in busy.items():
+                computed[space_id][str(seat_id)] = AvailabilityService.describe_day(intervals)
+            availability_cache.set_day_statuses(computed, day)
+            payloads.update(computed)
+
+        statuses = {}
+        for payload in payloads.values():
+            statuses.update(payload)
+        return statuses
+
+    @staticmethod
+    def busy_intervals_for_date(space_ids, day):
+        """
+        Groups the active bookings touching a single day by seat.
+
+        Only the needed columns are fetched (no model instances). Returns
+        {(space_id, seat_id): [(start_minute, end_minute, end_date), ...]} sorted by start.
+        """
+        rows = Booking.objects.filter(
+            AvailabilityService.active_q(),
+            seat__space_id__in=space_ids,
+            start_date_jalali__lte=day,
+            end_date_jalali__gte=day
+        ).values_list('seat__space_id', 'seat_id', 'booking_type', 'end_date_jalali', 'start_time', 'end_time')
+
+        busy = defaultdict(list)
+        for space_id, seat_id, booking_type, end_date, start_time, end_time in rows:
+            start_minute, end_minute = AvailabilityService.day_interval(booking_type, start_time, end_time)
+            busy[(space_id, seat_id)].append((start_minute, end_minute, end_date))
+
+        for intervals in busy.values():
+            intervals.sort()
+        return busy
+
+    @staticmethod
+    def describe_day(intervals):
+        """
+        Serializable status of one seat-day from its (start, end, end_date) intervals.
+        """
+        code = AvailabilityService.day_code([(start, end) for start, end, _ in intervals])
+        description = {
+            'status': 'available',
+            'busy': [
+                {'start': format_minute(start), 'end': format_minute(end)}
+                for start, end, _ in intervals
+            ],
+        }
+        if code == AvailabilityService.DAY_BOOKED:
+            description['status'] = 'booked'
+            description['booked_until'] = str(max(until for _, _, until in intervals))
+        elif code == AvailabilityService.DAY_PARTIAL:
+            description['status'] = 'partial'
+        return description
+
+    @staticmethod
+    def day_interval(booking_type, start_time, end_time):
+        """
+        The (start_minute, end_minute) a booking occupies on each of its days.
+        """
+        return occupancy.minute_span(booking_type, start_time, end_time)
+
+
+class OccupancyService:
+    """
+    Maintains the SeatOccupancy bitmaps used by AvailabilityService.
+    """
+    @staticmethod
+    def add_booking(booking):
+        """
+        ORs a newly created booking into its seat's day bitmaps.
+        """
+        if booking.status not in Booking.ACTIVE_STATUSES:
+            return
+
+        mask = occupancy.booking_mask(booking.booking_type, booking.start_time, booking.end_time)
+        existing = {
+            row.date_jalali: row
+            for row in SeatOccupancy.objects.select_for_update().filter(
+                seat_id=booking.seat_id,
+                date_jalali__range=(booking.start_date_jalali, booking.end_date_jalali)
+            )
+        }
+
+        to_create = []
+        to_update = []
+        for day in occupancy.iter_days(booking.start_date_jalali, booking.end_date_jalali):
+            row = existing.get(day)
+            if row is None:
+                to_create.append(SeatOccupancy(
+                    seat_id=booking.seat_id,
+                    date_jalali=day,
+                    slots=occupancy.to_bytes(mask)
+                ))
+            else:
+                row.slots = occupancy.to_bytes(occupancy.from_bytes(row.slots) | mask)
+                to_update.append(row)
+
+        SeatOccupancy.objects.bulk_create(to_create)
+        SeatOccupancy.objects.bulk_update(to_update, ['slots'])
+
+    @staticmethod
+    def rebuild(spans):
+        """
+        Recomputes the bitmaps covered by spans from the active bookings.
+
+        spans is an iterable of (seat_id, start_date, end_date) tuples, e.g. the
+        previous and current placement of bookings whose status or dates changed.
+        """
+        windows = {}
+        for seat_id, start_date, end_date in spans:
+            if seat_id in windows:
+                low, high = windows[seat_id]
+                start_date, end_date = min(low, start_date), max(high, end_date)
+            windows[seat_id] = (start_date, end_date)
+
+        if not windows:
+            return
+
+        in_windows = reduce(operator.or_, (
+            Q(seat_id=seat_id, start_date_jalali__lte=high, end_date_jalali__gte=low)
+            for seat_id, (low, high) in windows.items()
+        ))
+        active = Booking.objects.filter(in_windows, status__in=Booking.ACTIVE_STATUSES).values_list(
+            'seat_id', 'booking_type', 'start_date_jalali', 'end_date_jalali', 'start_time', 'end_time'
+        )
+
+        masks = defaultdict(int)
+        for seat_id, booking_type, start_date, end_date, start_time, end_time in active:
+            low, high = windows[seat_id]
+            mask = occupancy.booking_mask(booking_type, start_time, end_time)
+            for day in occupancy.iter_days(max(start_date, low), min(end_date, high)):
+                masks[(seat_id, day)] |= mask
+
+        with transaction.atomic():
+            SeatOccupancy.objects.filter(reduce(operator.or_, (
+                Q(seat_id=seat_id, date_jalali__range=(low, high))
+                for seat_id, (low, high) in windows.items()
+            ))).delete()
+            SeatOccupancy.objects.bulk_create([
+                SeatOccupancy(seat_id=seat_id, date_jalali=day, slots=occupancy.to_bytes(mask))
+                for (seat_id, day), mask in masks.items()
+                if mask
+            ])
+
+
+class RevenueService:
+    """
+    Revenue computed in the database rather than by looping over bookings.
+
+    The effective rate falls back from the Seat override to the Space rate for
+    the booking type. Hourly bookings bill duration_hours; daily bookings bill
+    each day; weekly and monthly bookings bill whole periods (rounded to the
+    nearest, minimum one).
+    """
+    REVENUE_STATUSES = ('confirmed', 'completed')
+
+    @staticmethod
+    def revenue_expression():
+        days = DaySpan('start_date_jalali', 'end_date_jalali')
+        rate = Case(
+            *[
+                When(booking_type=booking_type, then=Coalesce(f'seat__{booking_type}_rate', f'seat__space__{booking_type}_rate'))
+                for booking_type, _ in Booking.BOOKING_TYPE_CHOICES
+            ],
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        )
+        units = Case(
+            When(booking_type='hourly', then=Coalesce('duration_hours', Value(Decimal('0')))),
+            When(booking_type='daily', then=days),
+            When(booking_type='weekly', then=Greatest((days + 3) / 7, 1)),
+            When(booking_type='monthly', then=Greatest((days + 15) / 30, 1)),
+            default=Value(Decimal('0')),
+            output_field=DecimalField(max_digits=10, decimal_places=1)
+        )
+        return ExpressionWrapper(
+            Coalesce(rate, Value(Decimal('0'))) * units,
+            output_field=DecimalField(max_digits=16, decimal_places=2)
         )
 
-        for booking in qs:
-            # Check for actual overlap
-            if AvailabilityService.check_overlap(
-                start_date, end_date, start_time, end_time,
-                booking.start_date_jalali, booking.end_date_jalali, booking.start_time, booking.end_time,
-                booking.booking_type
-            ):
-                return False
-        
-        return True
+    @staticmethod
+    def revenue_queryset(queryset=None):
+        if queryset is None:
+            queryset = Booking.objects.all()
+        return queryset.filter(status__in=RevenueService.REVENUE_STATUSES)
 
     @staticmethod
-    def check_overlap(req_start_date, req_end_date, req_start_time, req_end_time,
-                      exist_start_date, exist_end_date, exist_start_time, exist_end_time,
-                      exist_type):
+    def total(queryset=None):
         """
-        Determines if two intervals overlap.
+        Total revenue as a single aggregate query.
         """
-        # Date overlap is already guaranteed by the query filter (start <= end AND end >= start)
-        
-        # If existing booking is NOT hourly, it consumes the full dates.
-        # Since dates overlap, it's a conflict.
-        if exist_type != 'hourly':
-            return True
-        
-        # If requested booking is NOT hourly (and existing IS hourly), 
-        # the request consumes full dates. Conflict.
-        # (We don't strictly know request type here but if req_start_time is None, it's daily+)
-        if req_start_time is None or req_end_time is None:
-            return True
+        result = RevenueService.revenue_queryset(queryset).aggregate(
+            total=Coalesce(
+                Sum(RevenueService.revenue_expression()),
+                Value(Decimal('0')),
+                output_field=DecimalField(max_digits=16, decimal_places=2)
+            )
+        )
+        return result['total']
+
+    @staticmethod
+    def breakdown(queryset=None):
+        """
+        Revenue by space, booking type and Jalali month of the booking start.
+
+        SQL groups by start day (bounded by the calendar, not the booking count);
+        days are then folded into Jalali months here.
+        """
+        rows = RevenueService.revenue_queryset(queryset).values(
+            'seat__space_id', 'seat__space__name', 'booking_type', 'start_date_jalali'
+        ).annotate(revenue=Sum(RevenueService.revenue_expression())).order_by()
+
+        totals = defaultdict(Decimal)
+        for row in rows:
+            day = row['start_date_jalali']
+            key = (
+                f"{day.year}-{day.month:02d}",
+                row['seat__space_id'],
+                row['seat__space__name'],
+                row['booking_type'],
+            )
+            totals[key] += row['revenue'] or Decimal('0')
+
+        return [
+            {
+                'month': month,
+                'space_id': space_id,
+                'space_name': space_name,
+                'booking_type': booking_type,
+                'revenue': revenue,
+            }
+            for (month, space_id, space_name, booking_type), revenue in sorted(
+                totals.items(), key=lambda item: (item[0][0], item[0][2], item[0][3])
+            )
+        ]
+
+
+class StatsService:
+    """
+    Maintains the DailyStats rollup (per Jalali start day and space).
+    """
+    # Full-day bookings count as this many seat-hours per day
+    FULL_DAY_HOURS = 24
+    # Re-scan this far behind the last refresh to catch transactions that
+    # committed after it started
+    LOOKBACK = datetime.timedelta(minutes=5)
+    DAYS_PER_CHUNK = 200
+
+    @staticmethod
+    def seat_hours_expression():
+        return Case(
+            When(booking_type='hourly', then=Coalesce('duration_hours', Value(Decimal('0')))),
+            default=DaySpan('start_date_jalali', 'end_date_jalali') * StatsService.FULL_DAY_HOURS,
+            output_field=DecimalField(max_digits=12, decimal_places=1)
+        )
+
+    @staticmethod
+    def frozen_before():
+        """
+        Start days before this are past the archival cutoff: their bookings
+        leave the hot tables (see bookings.archive) and the rollup keeps the
+        counts they had.
+        """
+        today = timezone.localdate()
+        return jdatetime.date.fromgregorian(date=today - datetime.timedelta(days=settings.BOOKING_RETENTION_DAYS))
+
+    @staticmethod
+    def mark_dirty(days):
+        """
+        Records start days to recompute on the next refresh although no booking
+        on them was written: a booking moved off them or was deleted.
+        """
+        frozen_before = StatsService.frozen_before()
+        days = {day for day in days if day >= frozen_before}
+        if not days:
+            return
+        now = timezone.now()
+        DailyStatsDirtyDay.objects.bulk_create(
+            [DailyStatsDirtyDay(date_jalali=day, marked_at=now) for day in days],
+            update_conflicts=True, unique_fields=['date_jalali'], update_fields=['marked_at']
+        )
+
+    @staticmethod
+    def refresh_daily_stats(full=False):
+        """
+        Recomputes the rollup rows for every start day with bookings written
+        since the previous run (or all days when full=True), plus the days
+        marked dirty by mark_dirty().
+
+        Returns the number of days refreshed.
+        """
+        started = timezone.now()
+        last_refresh = None if full else DailyStats.objects.aggregate(last=Max('refreshed_at'))['last']
+
+        changed = Booking.objects.all()
+        if last_refresh is not None:
+            changed = changed.filter(updated_at__gte=last_refresh - StatsService.LOOKBACK)
+        dirty = dict(DailyStatsDirtyDay.objects.values_list('date_jalali', 'marked_at'))
+        days = sorted(set(changed.values_list('start_date_jalali', flat=True)) | set(dirty))
+
+        booked = Q(status__in=RevenueService.REVENUE_STATUSES)
+        for offset in range(0, len(days), StatsService.DAYS_PER_CHUNK):
+            chunk = days[offset:offset + StatsService.DAYS_PER_CHUNK]
+            rows = Booking.objects.filter(start_date_jalali__in=chunk).values(
+                'start_date_jalali', 'seat__space_id'
+            ).annotate(
+                pending=Count('id', filter=Q(status='pending')),
+                confirmed=Count('id', filter=Q(status='confirmed')),
+                cancelled=Count('id', filter=Q(status='cancelled')),
+                completed=Count('id', filter=Q(status='completed')),
+                hours=Sum(StatsService.seat_hours_expression(), filter=booked),
+                revenue=Sum(RevenueService.revenue_expression(), filter=booked),
+            ).order_by()
+
+            with transaction.atomic():
+                DailyStats.objects.filter(date_jalali__in=chunk).delete()
+                DailyStats.objects.bulk_create([
+                    DailyStats(
+                        date_jalali=row['start_date_jalali'],
+                        space_id=row['seat__space_id'],
+                        pending_count=row['pending'],
+                        confirmed_count=row['confirmed'],
+                        cancelled_count=row['cancelled'],
+                        completed_count=row['completed'],
+                        seat_hours=row['hours'] or 0,
+                        revenue=row['revenue'] or 0,
+                        refreshed_at=started
+                    )
+                    for row in rows
+                ])
+
+        # Marks inside the lookback stay for the next run, like the changed scan
+        DailyStatsDirtyDay.objects.filter(
+            date_jalali__in=list(dirty), marked_at__lt=started - StatsService.LOOKBACK
+        ).delete()
+        return len(days)
+
+    @staticmethod
+    def totals():
+        """
+        Dashboard totals read from the rollup.
+        """
+        return DailyStats.objects.aggregate(
+            pending=Coalesce(Sum('pending_count'), 0),
+            confirmed=Coalesce(Sum('confirmed_count'), 0),
+            cancelled=Coalesce(Sum('cancelled_count'), 0),
+            completed=Coalesce(Sum('completed_count'), 0),
+            seat_hours=Coalesce(Sum('seat_hours'), Value(Decimal('0'))),
+            revenue=Coalesce(Sum('revenue'), Value(Decimal('0'))),
+            refreshed_at=Max('refreshed_at'),
+        )
+
+
+class OutboxService:
+    """
+    Transactional outbox. Services enqueue() side effects next to the rows that
+    cause them; dispatch() delivers due messages in batches, outside any
+    request, and retries failures with exponential backoff.
+    """
+    BOOKING_CONFIRMATION = 'booking.confirmation'
+    BOOKING_HOLD_EXPIRED = 'booking.hold_expired'
+    SERIES_CONFLICT = 'series.conflict'
+
+    BATCH_SIZE = 100
+    MAX_ATTEMPTS = 10
+    RETRY_BASE = datetime.timedelta(seconds=30)
+    RETRY_MAX = datetime.timedelta(hours=1)
 
-        # If both are hourly:
-        # We need to check if they are on the SAME day(s).
-        # Assuming hourly bookings are single-day for simplicity (enforced in validation).
-        # If dates don't touch exactly, they might not overlap in time? 
-        # But the date filter says they overlap.
-        
-        # If the overlap involves the same date, we check time.
-        # Simplest logic: If valid time ranges are provided for both, check time intersection.
-        # If multiple days are involved in hourly booking (edge case), this logic might be too simple,
-        # but let's assume single-day hourly.
-        
-        if req_start_date == exist_start_date:
-             # Check time overlap
-             # (StartA < EndB) and (EndA > StartB)
-             if req_start_time < exist_end_time and req_end_time > exist_start_time:
-                 return True
-                 
-        return False
\ No newline at end of file
+    @staticmethod
+    def enqueue(topic, payload):
+        return OutboxMessage.objects.create(topic=topic, payload=payload)
+
+    @staticmethod
+    def send_confirmations(payloads):
+        # One SMTP session for every confirmation in the batch
+        booking_ids = [booking_id for payload in payloads for booking_id in payload['booking_ids']]
+        send_booking_confirmation_emails(booking_ids)
+
+    @staticmethod
+    def send_hold_expiry_notices(payloads):
+        booking_ids = [booking_id for payload in payloads for booking_id in payload['booking_ids']]
+        send_hold_expiry_notices(booking_ids)
+
+    @staticmethod
+    def send_series_conflict_notices(payloads):
+        send_series_conflict_notices(payloads)
+
+    @staticmethod
+    def handlers():
+        """
+        topic -> callable taking the payloads of one batch.
+        """
+        return {
+            OutboxService.BOOKING_CONFIRMATION: OutboxService.send_confirmations,
+            OutboxService.BOOKING_HOLD_EXPIRED: OutboxService.send_hold_expiry_notices,
+            OutboxService.SERIES_CONFLICT: OutboxService.send_series_conflict_notices,
+        }
+
+    @staticmethod
+    def retry_delay(attempts):
+        return min(OutboxService.RETRY_BASE * (2 ** (attempts - 1)), OutboxService.RETRY_MAX)
+
+    @staticmethod
+    def dispatch(batch_size=None):
+        """
+        Delivers one batch of due messages. Messages are claimed with SKIP
+        LOCKED where supported, so several dispatchers can run side by side.
+        Returns the number of messages handled (delivered or rescheduled).
+        """
+        batch_size = batch_size or OutboxService.BATCH_SIZE
+        handlers = OutboxService.handlers()
+
+        with transaction.atomic():
+            messages = list(
+                OutboxMessage.objects.filter(status='pending', available_at__lte=timezone.now())
+                .select_for_update(skip_locked=True)
+                .order_by('available_at', 'id')[:batch_size]
+            )
+            by_topic = defaultdict(list)
+            for message in messages:
+                by_topic[message.topic].append(message)
+
+            now = timezone.now()
+            for topic, group in by_topic.items():
+                try:
+                    handler = handlers[topic]
+                    with transaction.atomic():
+                        handler([message.payload for message in group])
+                except Exception as e:
+                    logger.warning("Outbox delivery of %d %s message(s) failed: %s", len(group), topic, e)
+                    for message in group:
+                        message.attempts += 1
+                        message.last_error = str(e)
+                        if message.attempts >= OutboxService.MAX_ATTEMPTS:
+                            message.status = 'failed'
+                        else:
+                            message.available_at = now + OutboxService.retry_delay(message.attempts)
+                else:
+                    for message in group:
+                        message.attempts += 1
+                        message.status = 'done'
+                        message.dispatched_at = now
+                        message.last_error = ''
+
+            OutboxMessage.objects.bulk_update(
+                messages, ['status', 'attempts', 'available_at', 'last_error', 'dispatched_at']
+            )
+        return len(messages)
+
+    @staticmethod
+    def dispatch_all(batch_size=None):
+        """
+        Runs dispatch() until no due messages are left. Returns the total handled.
+        """
+        batch_size = batch_size or OutboxService.BATCH_SIZE
+        total = 0
+        while True:
+            handled = OutboxService.dispatch(batch_size)
+            total += handled
+            if handled < batch_size:
+                return total
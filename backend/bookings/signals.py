@@ -0,0 +1,60 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Booking, Space, Seat
+from .services import OccupancyService, StatsService
+from . import cache as availability_cache
+from . import catalog
+
+@receiver(pre_save, sender=Booking)
+def remember_previous_span(sender, instance, **kwargs):
+    """
+    Keep the stored seat/dates of an edited booking so its old days can be freed.
+    """
+    instance._previous_span = None
+    if instance._state.adding:
+        return
+    instance._previous_span = Booking.objects.filter(pk=instance.pk).values_list(
+        'seat_id', 'seat__space_id', 'start_date_jalali', 'end_date_jalali'
+    ).first()
+
+
+def _current_span(instance):
+    return (instance.seat_id, instance.seat.space_id, instance.start_date_jalali, instance.end_date_jalali)
+
+
+@receiver(post_save, sender=Booking)
+def update_occupancy_on_save(sender, instance, created, **kwargs):
+    spans = [_current_span(instance)]
+    previous = getattr(instance, '_previous_span', None)
+    if previous:
+        spans.append(previous)
+
+    if created:
+        OccupancyService.add_booking(instance)
+    else:
+        OccupancyService.rebuild([(seat_id, start, end) for seat_id, _, start, end in spans])
+    availability_cache.invalidate_spans([(space_id, start, end) for _, space_id, start, end in spans])
+
+    # The rollup finds the new start day through updated_at, not the old one
+    if previous and previous[2] != instance.start_date_jalali:
+        StatsService.mark_dirty([previous[2]])
+
+
+@receiver(post_delete, sender=Booking)
+def update_occupancy_on_delete(sender, instance, **kwargs):
+    StatsService.mark_dirty([instance.start_date_jalali])
+
+    # Inactive bookings are in no bitmap or cached status (e.g. archival deletes)
+    if instance.status not in Booking.ACTIVE_STATUSES:
+        return
+    seat_id, space_id, start, end = _current_span(instance)
+    OccupancyService.rebuild([(seat_id, start, end)])
+    availability_cache.invalidate_spans([(space_id, start, end)])
+
+
+@receiver(post_save, sender=Space)
+@receiver(post_delete, sender=Space)
+@receiver(post_save, sender=Seat)
+@receiver(post_delete, sender=Seat)
+def bump_catalog_version(sender, **kwargs):
+    catalog.bump()
@@ -0,0 +1,57 @@
+"""
+SMS backends, modelled on django.core.mail's email backends.
+
+settings.SMS_BACKEND names the class to use. A provider integration subclasses
+BaseSmsBackend and implements send_messages(); the console and locmem backends
+stand in for one during development and tests.
+"""
+import sys
+import threading
+from dataclasses import dataclass
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Messages sent through LocmemSmsBackend, like django.core.mail.outbox
+outbox = []
+
+
+@dataclass(frozen=True)
+class SmsMessage:
+    to: str
+    body: str
+
+
+class BaseSmsBackend:
+    def __init__(self, fail_silently=False, **kwargs):
+        self.fail_silently = fail_silently
+
+    def send_messages(self, messages):
+        """
+        Sends a batch of SmsMessage objects and returns the number sent.
+        Raises on failure unless fail_silently is set.
+        """
+        raise NotImplementedError('subclasses of BaseSmsBackend must override send_messages()')
+
+
+class ConsoleSmsBackend(BaseSmsBackend):
+    def __init__(self, *args, stream=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stream = stream or sys.stdout
+        self._lock = threading.RLock()
+
+    def send_messages(self, messages):
+        with self._lock:
+            for message in messages:
+                self.stream.write(f"SMS to {message.to}: {message.body}\n")
+            self.stream.flush()
+        return len(messages)
+
+
+class LocmemSmsBackend(BaseSmsBackend):
+    def send_messages(self, messages):
+        outbox.extend(messages)
+        return len(messages)
+
+
+def get_backend(backend=None, **kwargs):
+    return import_string(backend or settings.SMS_BACKEND)(**kwargs)
@@ -1,19 +1,47 @@
+import datetime
+import logging
+from functools import lru_cache
 from celery import shared_task
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
 from django.conf import settings
-from .models import Booking
+from django.utils import timezone
+from .models import Booking, BookingSeries
+from . import sms
 
-@shared_task
-def send_booking_confirmation_email(booking_id):
+logger = logging.getLogger(__name__)
+
+CONFIRMATION_TEMPLATE = 'emails/booking_confirmation.html'
+
+# Bookings per SMTP session when draining pending confirmations
+CONFIRMATION_BATCH_SIZE = 100
+
+# Give up on an address after this many failed deliveries
+CONFIRMATION_MAX_ATTEMPTS = 5
+
+# New bookings are confirmed through the outbox; the drain only picks up
+# bookings older than this that are still unconfirmed
+CONFIRMATION_GRACE = datetime.timedelta(minutes=2)
+
+# Bookings per chunk when sending reminders
+REMINDER_BATCH_SIZE = 200
+
+
+@lru_cache(maxsize=None)
+def confirmation_template():
+    """
+    The compiled confirmation template, loaded once per worker process.
+    """
     try:
-        booking = Booking.objects.select_related('seat__space').get(id=booking_id)
-    except Booking.DoesNotExist:
-        return f"Booking {booking_id} not found."
+        return get_template(CONFIRMATION_TEMPLATE)
+    except TemplateDoesNotExist:
+        return None
 
-    if not booking.email:
-        return "No email provided for this booking."
 
+def build_confirmation_message(booking, connection=None):
     # Format time conditionally
     start_time_str = booking.start_time.strftime('%H:%M') if booking.start_time else "N/A"
     end_time_str = booking.end_time.strftime('%H:%M') if booking.end_time else "N/A"
@@ -33,25 +61,291 @@ def send_booking_confirmation_email(booking_id):
         'booking_type': booking.get_booking_type_display(),
     }
 
-    # Template might need updates too, but passing context is the first step.
-    # Assuming template is flexible or I might need to update it if strict.
-    # I'll update the plain message at least.
-    
     plain_message = f"Dear {booking.full_name}, your {booking.booking_type} booking for {booking.seat.space.name} ({booking.seat.visual_id}) on {date_str} is confirmed."
 
-    try:
-        html_message = render_to_string('emails/booking_confirmation.html', context)
-    except Exception:
-        # Fallback if template is missing or broken
-        html_message = None
-
-    send_mail(
+    message = EmailMultiAlternatives(
         subject='Booking Confirmation',
-        message=plain_message,
-        html_message=html_message,
+        body=plain_message,
         from_email=settings.EMAIL_HOST_USER,
-        recipient_list=[booking.email],
-        fail_silently=False,
+        to=[booking.email],
+        connection=connection,
+    )
+    template = confirmation_template()
+    if template is not None:
+        try:
+            message.attach_alternative(template.render(context), 'text/html')
+        except Exception:
+            # Fallback if the template is broken: plain text only
+            pass
+    return message
+
+
+def pending_confirmations():
+    """
+    Bookings with an email address whose confirmation has not gone out yet.
+    """
+    return Booking.objects.filter(
+        confirmation_sent_at__isnull=True,
+        confirmation_attempts__lt=CONFIRMATION_MAX_ATTEMPTS,
+        email__gt='',
+    )
+
+
+def deliver_confirmations(bookings):
+    """
+    Sends confirmations for bookings over one SMTP connection and records the
+    outcome on each booking. Returns the (sent, failed) booking ids.
+    """
+    if not bookings:
+        return [], []
+
+    sent = []
+    failed = []
+    with get_connection() as connection:
+        for booking in bookings:
+            try:
+                connection.send_messages([build_confirmation_message(booking, connection)])
+                sent.append(booking.pk)
+            except Exception as e:
+                logger.warning("Confirmation email for booking %s failed: %s", booking.pk, e)
+                failed.append((booking.pk, str(e)[:255]))
+
+    Booking.objects.filter(pk__in=sent).update(
+        confirmation_sent_at=timezone.now(), confirmation_error=''
     )
+    for booking_id, error in failed:
+        Booking.objects.filter(pk=booking_id).update(
+            confirmation_attempts=F('confirmation_attempts') + 1, confirmation_error=error
+        )
+    return sent, [booking_id for booking_id, _ in failed]
+
+
+def claim_confirmations(booking_ids):
+    """
+    Locks the bookings in booking_ids whose confirmation is still pending,
+    skipping rows another worker holds, so concurrent senders never send the
+    same confirmation twice. Call inside a transaction.
+    """
+    return list(
+        pending_confirmations().filter(pk__in=booking_ids)
+        .select_related('seat__space')
+        .select_for_update(skip_locked=True, of=('self',))
+    )
+
+
+@shared_task
+def send_booking_confirmation_email(booking_id):
+    """
+    Confirmation email for a single booking, claimed and recorded the same way
+    as a batch, so it is a no-op once the confirmation has gone out.
+    """
+    with transaction.atomic():
+        bookings = claim_confirmations([booking_id])
+        if not bookings:
+            return f"No pending confirmation for booking {booking_id}."
+        sent, _ = deliver_confirmations(bookings)
+
+    if not sent:
+        return f"Email to {bookings[0].email} failed."
+    return f"Email sent to {bookings[0].email}"
+
+
+@shared_task
+def send_booking_confirmation_emails(booking_ids):
+    """
+    Confirmation emails for a batch of bookings (e.g. a bulk create), sent over
+    one SMTP connection. Rows are claimed like send_pending_confirmations
+    claims them, so a drain running at the same time skips them instead of
+    sending them again.
+    """
+    with transaction.atomic():
+        sent, failed = deliver_confirmations(claim_confirmations(booking_ids))
+    return f"Processed {len(booking_ids)} bookings: {len(sent)} sent, {len(failed)} failed."
+
+
+def hold_expiry_text(booking):
+    when = str(booking.start_date_jalali)
+    if booking.booking_type == 'hourly' and booking.start_time:
+        when += f" at {booking.start_time.strftime('%H:%M')}"
+    return (f"Your {booking.booking_type} booking for {booking.seat.space.name} ({booking.seat.visual_id}) "
+            f"on {when} was not confirmed in time and its seat has been released.")
+
+
+@shared_task
+def send_hold_expiry_notices(booking_ids):
+    """
+    Tells customers their expired hold was cancelled: by email over one SMTP
+    connection, or by SMS for bookings without an email address. Errors
+    propagate so the outbox retries the batch.
+    """
+    bookings = list(
+        Booking.objects.filter(pk__in=booking_ids, status='cancelled').select_related('seat__space')
+    )
+    emailed = [booking for booking in bookings if booking.email]
+    texted = [booking for booking in bookings if not booking.email]
+
+    if emailed:
+        with get_connection() as connection:
+            connection.send_messages([
+                EmailMultiAlternatives(
+                    subject='Booking Released',
+                    body=f"Dear {booking.full_name}, {hold_expiry_text(booking)}",
+                    from_email=settings.EMAIL_HOST_USER,
+                    to=[booking.email],
+                    connection=connection,
+                )
+                for booking in emailed
+            ])
+    if texted:
+        sms.get_backend().send_messages([
+            sms.SmsMessage(to=booking.mobile, body=hold_expiry_text(booking)) for booking in texted
+        ])
+    return f"Notified {len(emailed)} by email and {len(texted)} by SMS."
+
+
+def series_conflict_text(series, dates):
+    return (f"Your recurring booking for {series.seat.space.name} ({series.seat.visual_id}) could not be "
+            f"held on {', '.join(dates)}: the seat was already taken. Your other dates are unaffected.")
+
+
+@shared_task
+def send_series_conflict_notices(payloads):
+    """
+    Tells series owners which occurrences were skipped because their slot was
+    taken: by email, or by SMS for series without an email address. Errors
+    propagate so the outbox retries the batch.
+    """
+    series_by_id = {
+        str(series.pk): series
+        for series in BookingSeries.objects.filter(
+            pk__in=[payload['series_id'] for payload in payloads]
+        ).select_related('seat__space')
+    }
+    notices = [
+        (series_by_id[payload['series_id']], payload['dates'])
+        for payload in payloads if payload['series_id'] in series_by_id
+    ]
+    emailed = [(series, dates) for series, dates in notices if series.email]
+    texted = [(series, dates) for series, dates in notices if not series.email]
+
+    if emailed:
+        with get_connection() as connection:
+            connection.send_messages([
+                EmailMultiAlternatives(
+                    subject='Recurring Booking Dates Skipped',
+                    body=f"Dear {series.full_name}, {series_conflict_text(series, dates)}",
+                    from_email=settings.EMAIL_HOST_USER,
+                    to=[series.email],
+                    connection=connection,
+                )
+                for series, dates in emailed
+            ])
+    if texted:
+        sms.get_backend().send_messages([
+            sms.SmsMessage(to=series.mobile, body=series_conflict_text(series, dates)) for series, dates in texted
+        ])
+    return f"Notified {len(emailed)} by email and {len(texted)} by SMS."
+
+
+@shared_task
+def send_pending_confirmations(batch_size=CONFIRMATION_BATCH_SIZE):
+    """
+    Drains pending confirmations in batches of batch_size, one SMTP session per
+    batch. Rows are claimed with SKIP LOCKED where the database supports it,
+    so concurrent workers do not send the same confirmation twice.
+    """
+    total_sent = 0
+    failed_ids = []
+    while True:
+        with transaction.atomic():
+            bookings = list(
+                pending_confirmations()
+                .filter(created_at__lte=timezone.now() - CONFIRMATION_GRACE)
+                .exclude(pk__in=failed_ids)  # retried on the next run, not in this one
+                .select_related('seat__space')
+                .select_for_update(skip_locked=True, of=('self',))
+                .order_by('created_at')[:batch_size]
+            )
+            sent, failed = deliver_confirmations(bookings)
+        total_sent += len(sent)
+        failed_ids.extend(failed)
+        if len(bookings) < batch_size:
+            break
+    return f"Sent {total_sent} confirmations, {len(failed_ids)} failed."
+
+
+@shared_task
+def send_booking_reminders(batch_size=REMINDER_BATCH_SIZE):
+    """
+    Sends the reminders that are due, batch_size bookings per chunk. Rows are
+    claimed with SKIP LOCKED where supported, like send_pending_confirmations.
+    """
+    from . import reminders
+
+    now = timezone.now()
+    channels = reminders.get_channels()
+    total_reminded = 0
+    failed_ids = []
+    while True:
+        with transaction.atomic():
+            bookings = list(
+                reminders.due_reminders(now)
+                .exclude(pk__in=failed_ids)  # retried on the next run, not in this one
+                .select_related('seat__space')
+                .select_for_update(skip_locked=True, of=('self',))
+                .order_by('start_day', 'start_minute', 'id')[:batch_size]
+            )
+            reminded, failed = reminders.deliver_reminders(bookings, channels)
+        total_reminded += len(reminded)
+        failed_ids.extend(failed)
+        if len(bookings) < batch_size:
+            break
+    return f"Sent {total_reminded} reminders, {len(failed_ids)} failed."
+
+
+@shared_task
+def dispatch_outbox():
+    from .services import OutboxService
+
+    handled = OutboxService.dispatch_all()
+    return f"Handled {handled} outbox messages."
+
+
+@shared_task
+def complete_ended_bookings():
+    from .services import BookingService
+
+    completed = BookingService.complete_ended()
+    return f"Completed {completed} bookings."
+
+
+@shared_task
+def expire_pending_holds():
+    from .services import BookingService
+
+    cancelled = BookingService.expire_holds()
+    return f"Cancelled {cancelled} expired holds."
+
+
+@shared_task
+def archive_finished_bookings():
+    from .archive import archive_bookings
+
+    archived, deleted = archive_bookings()
+    return f"Archived {archived} bookings, removed {deleted} from the database."
+
+
+@shared_task
+def refresh_daily_stats():
+    from .services import StatsService
+
+    days = StatsService.refresh_daily_stats()
+    return f"Refreshed stats for {days} days."
+
+
+@shared_task
+def materialize_booking_series():
+    from .services import SeriesService
 
-    return f"Email sent to {booking.email}"
\ No newline at end of file
+    created = SeriesService.materialize_due()
+    return f"Materialized {created} series occurrences."
@@ -1,6 +1,11 @@
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from bookings.models import Space, Seat, Booking, AuditLog, SeatOccupancy
+from bookings.services import BookingService
+from bookings import catalog
+from unittest import mock
+import jdatetime
 
 class AdminPanelTests(TestCase):
     def setUp(self):
@@ -32,3 +37,98 @@ class AdminPanelTests(TestCase):
         url = reverse('admin:bookings_auditlog_changelist')
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
+
+    def test_admin_archived_booking_list_and_search(self):
+        url = reverse('admin:bookings_archivedbooking_changelist')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url, {'q': '0060495219'}).status_code, 200)
+
+    def test_admin_bulk_status_action_writes_audit_logs(self):
+        space = Space.objects.create(name="Admin Space", capacity=2)
+        seat = Seat.objects.create(space=space, visual_id="AD-1")
+        today = jdatetime.date.today()
+        bookings = [
+            Booking.objects.create(
+                seat=seat, full_name=f"User {index}", national_id="0060495219", mobile="09123456789",
+                booking_type='daily', start_date_jalali=today + jdatetime.timedelta(days=index),
+                end_date_jalali=today + jdatetime.timedelta(days=index)
+            )
+            for index in range(3)
+        ]
+        url = reverse('admin:bookings_booking_changelist')
+        with mock.patch('bookings.cache.invalidate_spans') as invalidate_spans:
+            response = self.client.post(url, {
+                'action': 'mark_cancelled',
+                '_selected_action': [str(booking.pk) for booking in bookings],
+            })
+        self.assertEqual(response.status_code, 302)
+
+        self.assertFalse(Booking.objects.exclude(status='cancelled').exists())
+        self.assertFalse(SeatOccupancy.objects.filter(seat=seat).exists())
+        logs = AuditLog.objects.filter(action='cancelled')
+        self.assertEqual(logs.count(), 3)
+        self.assertEqual(set(logs.values_list('previous_status', flat=True)), {'pending'})
+        self.assertEqual(logs.first().changed_by, '09120000000')
+        # One invalidation covering the whole batch
+        invalidate_spans.assert_called_once()
+        self.assertEqual(len(invalidate_spans.call_args.args[0]), 3)
+
+    def test_admin_confirm_action_refuses_overlapping_reactivation(self):
+        space = Space.objects.create(name="Overlap Space", capacity=1)
+        seat = Seat.objects.create(space=space, visual_id="OV-1")
+        today = jdatetime.date.today()
+        fields = dict(seat=seat, full_name="Overlap User", national_id="0060495219", mobile="09123456789",
+                      booking_type='daily', start_date_jalali=today, end_date_jalali=today)
+        cancelled = Booking.objects.create(status='cancelled', **fields)
+        Booking.objects.create(**fields)
+
+        url = reverse('admin:bookings_booking_changelist')
+        response = self.client.post(url, {
+            'action': 'mark_confirmed', '_selected_action': [str(cancelled.pk)],
+        }, follow=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Nothing was changed', [str(message) for message in response.context['messages']][0])
+        cancelled.refresh_from_db()
+        self.assertEqual(cancelled.status, 'cancelled')
+
+    def test_space_activation_actions_bump_catalog_version(self):
+        space = Space.objects.create(name="Catalog Space", capacity=2)
+        etag, _ = catalog.current()
+
+        url = reverse('admin:bookings_space_changelist')
+        self.client.post(url, {'action': 'make_inactive', '_selected_action': [str(space.pk)]})
+        self.assertNotEqual(catalog.current()[0], etag)
+
+    def test_bulk_status_update_query_count_is_constant(self):
+        space = Space.objects.create(name="Bulk Space", capacity=50)
+        seats = Seat.objects.bulk_create([Seat(space=space, visual_id=f"BK-{index}") for index in range(20)])
+        today = jdatetime.date.today()
+        for seat in seats:
+            Booking.objects.create(
+                seat=seat, full_name="Bulk User", national_id="0060495219", mobile="09123456789",
+                booking_type='daily', start_date_jalali=today, end_date_jalali=today
+            )
+
+        # Seat ids, seat locks, locked read, reactivation check, UPDATE, audit
+        # insert, occupancy read/delete/insert and their savepoints
+        with self.assertNumQueries(13):
+            changed = BookingService.bulk_update_status(Booking.objects.all(), 'confirmed', changed_by='tester')
+        self.assertEqual(changed, 20)
+
+    def test_admin_dashboard_with_revenue(self):
+        space = Space.objects.create(name="Dashboard Space", capacity=1, hourly_rate=100)
+        seat = Seat.objects.create(space=space, visual_id="DB-1")
+        Booking.objects.create(
+            seat=seat, full_name="Dashboard User", national_id="0060495219", mobile="09123456789",
+            start_date_jalali=jdatetime.date.today(), end_date_jalali=jdatetime.date.today(),
+            duration_hours=2, status='confirmed'
+        )
+        response = self.client.get(reverse('admin:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['kpi'][1]['metric'], "$200.00")
+
+        today = jdatetime.date.today()
+        self.assertEqual(response.context['revenue_breakdown']['rows'], [
+            [f"{today.year}-{today.month:02d}", "Dashboard Space", "hourly", "$200.00"]
+        ])
+        self.assertContains(response, "Dashboard Space")
@@ -1,8 +1,22 @@
 from rest_framework.test import APITestCase
 from rest_framework import status
-from bookings.models import Space, Booking, Seat
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.db import OperationalError, connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from bookings.models import Space, Booking, Seat, AuditLog, SeatOccupancy, ArchivedBooking
+from bookings import archive
+from bookings import cache as availability_cache
+from bookings.services import BookingService, AvailabilityService
+from unittest import mock
 import jdatetime
 import datetime
+import io
+import shutil
+import tempfile
 
 class ApiTests(APITestCase):
     def setUp(self):
@@ -82,4 +96,575 @@ class ApiTests(APITestCase):
         response = self.client.get('/api/v1/spaces/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertTrue(len(response.data) >= 1)
-        self.assertEqual(response.data[0]['name'], "API Test Space")
\ No newline at end of file
+        self.assertEqual(response.data[0]['name'], "API Test Space")
+
+    def test_create_booking_on_day_missing_from_gregorian_calendar(self):
+        # Shahrivar 31 has no Gregorian month/day twin (June 31)
+        day = f"{jdatetime.date.today().year + 1}-06-31"
+        data = dict(self.valid_payload, start_date_jalali=day, end_date_jalali=day)
+        response = self.client.post('/api/v1/bookings/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['start_date_jalali'], day)
+
+    def test_create_booking_invalid_jalali_date(self):
+        data = dict(self.valid_payload, start_date_jalali="1404-07-31", end_date_jalali="1404-07-31")
+        response = self.client.post('/api/v1/bookings/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('start_date_jalali', response.data)
+
+class SeatAvailabilityApiTests(APITestCase):
+    def setUp(self):
+        self.space = Space.objects.create(name="Grid Space", capacity=2, hourly_rate=100.00)
+        self.seat_a = Seat.objects.create(space=self.space, visual_id="G-1")
+        self.seat_b = Seat.objects.create(space=self.space, visual_id="G-2")
+        self.start = jdatetime.date.today()
+        self.url = '/api/v1/seats/availability/'
+
+    def _book(self, seat, start, end, booking_type='daily', start_time=None, end_time=None):
+        return Booking.objects.create(
+            seat=seat, full_name="Grid User", national_id="0060495219", mobile="09123456789",
+            booking_type=booking_type, start_date_jalali=start, end_date_jalali=end,
+            start_time=start_time, end_time=end_time
+        )
+
+    def test_grid_codes(self):
+        day = jdatetime.timedelta(days=1)
+        self._book(self.seat_a, self.start + day, self.start + 2 * day)
+        self._book(self.seat_b, self.start, self.start, 'hourly', datetime.time(9, 0), datetime.time(10, 0))
+        cancelled = self._book(self.seat_b, self.start + day, self.start + day)
+        Booking.objects.filter(pk=cancelled.pk).update(status='cancelled')
+
+        params = {'space': self.space.id, 'from': str(self.start), 'to': str(self.start + 3 * day)}
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        grid = {row['visual_id']: row['days'] for row in response.data['seats']}
+        self.assertEqual(grid, {'G-1': 'ABBA', 'G-2': 'PAAA'})
+
+    def test_invalid_range(self):
+        response = self.client.get(self.url, {'from': '1403-01-10', 'to': '1403-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {'from': 'bad', 'to': '1403-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_seat_list_returns_every_busy_interval(self):
+        self._book(self.seat_a, self.start, self.start, 'hourly', datetime.time(9, 0), datetime.time(10, 0))
+        self._book(self.seat_a, self.start, self.start, 'hourly', datetime.time(14, 0), datetime.time(15, 30))
+        self._book(self.seat_b, self.start, self.start + jdatetime.timedelta(days=2))
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/seats/', {'date': str(self.start)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        seats = {row['visual_id']: row for row in response.data}
+        self.assertEqual(seats['G-1']['status'], 'partial')
+        self.assertEqual(seats['G-1']['busy'], [
+            {'start': '09:00', 'end': '10:00'},
+            {'start': '14:00', 'end': '15:30'},
+        ])
+        self.assertEqual(seats['G-2']['status'], 'booked')
+        self.assertEqual(seats['G-2']['booked_until'], str(self.start + jdatetime.timedelta(days=2)))
+
+    @override_settings(AVAILABILITY_CACHE_ENABLED=True)
+    def test_seat_list_is_cached_until_a_booking_changes(self):
+        cache.clear()
+        booking = self._book(self.seat_a, self.start, self.start, 'hourly', datetime.time(9, 0), datetime.time(10, 0))
+        params = {'date': str(self.start)}
+
+        self.client.get('/api/v1/seats/', params)
+        with self.assertNumQueries(1):  # seats only; statuses come from the cache
+            response = self.client.get('/api/v1/seats/', params)
+        self.assertEqual({row['visual_id']: row['status'] for row in response.data}['G-1'], 'partial')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.status = 'cancelled'
+            booking.save()
+
+        response = self.client.get('/api/v1/seats/', params)
+        self.assertEqual({row['visual_id']: row['status'] for row in response.data}['G-1'], 'available')
+
+    @override_settings(AVAILABILITY_CACHE_ENABLED=True)
+    def test_bulk_status_change_invalidates_cache(self):
+        cache.clear()
+        self._book(self.seat_a, self.start, self.start)
+        params = {'date': str(self.start)}
+        self.client.get('/api/v1/seats/', params)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingService.bulk_update_status(Booking.objects.all(), 'cancelled')
+
+        response = self.client.get('/api/v1/seats/', params)
+        self.assertEqual({row['visual_id']: row['status'] for row in response.data}['G-1'], 'available')
+
+    def test_seat_list_reads_the_database_without_a_shared_cache(self):
+        # The default test settings have no Redis, like a single gunicorn
+        # worker among several with their own LocMemCache
+        cache.clear()
+        booking = self._book(self.seat_a, self.start, self.start)
+        params = {'date': str(self.start)}
+        self.client.get('/api/v1/seats/', params)
+        self.assertEqual(cache.get_many([availability_cache.availability_key(self.space.pk, self.start)]), {})
+
+        # A write this process never hears about, as from another worker
+        Booking.objects.filter(pk=booking.pk).update(status='cancelled')
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/seats/', params)
+        self.assertEqual({row['visual_id']: row['status'] for row in response.data}['G-1'], 'available')
+
+
+class BulkBookingApiTests(APITestCase):
+    def setUp(self):
+        self.space = Space.objects.create(name="Bulk Space", capacity=10, hourly_rate=100.00)
+        self.seats = [Seat.objects.create(space=self.space, visual_id=f"BL-{index}") for index in range(5)]
+        self.today = jdatetime.date.today().strftime("%Y-%m-%d")
+        self.url = '/api/v1/bookings/bulk/'
+
+    def _item(self, seat, start="10:00", end="12:00"):
+        return {
+            "seat": str(seat.id),
+            "full_name": "Corporate User",
+            "national_id": "0060495219",
+            "mobile": "09123456789",
+            "start_date_jalali": self.today,
+            "end_date_jalali": self.today,
+            "start_time": start,
+            "end_time": end,
+            "duration_hours": 2.0,
+            "terms_accepted": True,
+            "booking_type": "hourly",
+        }
+
+    def test_bulk_create_all(self):
+        payload = {"bookings": [self._item(seat) for seat in self.seats]}
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['created']), 5)
+        self.assertEqual(Booking.objects.count(), 5)
+        self.assertEqual(AuditLog.objects.count(), 5)
+        self.assertEqual(SeatOccupancy.objects.count(), 5)
+
+    def test_in_batch_conflict_rejects_whole_batch(self):
+        payload = {"bookings": [
+            self._item(self.seats[0]),
+            self._item(self.seats[1]),
+            self._item(self.seats[0], "11:00", "13:00"),
+        ]}
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['rejected'], [
+            {'index': 2, 'code': 'seat_unavailable', 'detail': "The selected seat is not available for the requested time."}
+        ])
+        self.assertFalse(Booking.objects.exists())
+
+    def test_partial_mode_keeps_valid_items(self):
+        self.client.post('/api/v1/bookings/', self._item(self.seats[2]), format='json')
+        invalid = self._item(self.seats[3])
+        invalid['national_id'] = '123'
+        payload = {"mode": "partial", "bookings": [
+            self._item(self.seats[0]),
+            self._item(self.seats[2]),  # conflicts with the existing booking
+            invalid,
+        ]}
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['created']), 1)
+        self.assertEqual([(entry['index'], entry['code']) for entry in response.data['rejected']],
+                         [(1, 'seat_unavailable'), (2, 'invalid')])
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_database_errors_are_reported_not_raised(self):
+        payload = {"mode": "partial", "bookings": [self._item(seat) for seat in self.seats[:2]]}
+        with mock.patch.object(BookingService, '_create_bookings_bulk_locked',
+                               side_effect=OperationalError("canceling statement due to lock timeout")):
+            response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['code'], 'booking_creation_failed')
+        self.assertFalse(Booking.objects.exists())
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def run(seats):
+            payload = {"bookings": [self._item(seat) for seat in seats]}
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, payload, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            Booking.objects.all().delete()
+            return len(queries)
+
+        self.assertEqual(run(self.seats[:1]), run(self.seats))
+
+
+class BookingSeriesApiTests(APITestCase):
+    def setUp(self):
+        self.space = Space.objects.create(name="Meeting Room", capacity=8, hourly_rate=100.00)
+        self.seat = Seat.objects.create(space=self.space, visual_id="MR-1")
+        self.today = jdatetime.date.today()
+        self.payload = {
+            "seat": str(self.seat.id),
+            "full_name": "Team Lead",
+            "national_id": "0060495219",
+            "mobile": "09123456789",
+            "booking_type": "hourly",
+            "start_time": "10:00",
+            "end_time": "12:00",
+            "frequency": "weekly",
+            "start_date_jalali": self.today.strftime("%Y-%m-%d"),
+            "until_date_jalali": (self.today + jdatetime.timedelta(days=180)).strftime("%Y-%m-%d"),
+            "terms_accepted": True,
+        }
+
+    def test_create_series(self):
+        response = self.client.post('/api/v1/series/', self.payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], 'active')
+
+        response = self.client.get(f"/api/v1/series/{response.data['id']}/occurrences/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 5)
+
+    def test_bookings_cannot_be_attached_to_a_series(self):
+        series_id = self.client.post('/api/v1/series/', self.payload, format='json').data['id']
+        day = (self.today + jdatetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        response = self.client.post('/api/v1/bookings/', {
+            "seat": str(self.seat.id), "series": series_id,
+            "full_name": "Intruder", "national_id": "0060495219", "mobile": "09123456789",
+            "start_date_jalali": day, "end_date_jalali": day, "start_time": "14:00", "end_time": "16:00",
+            "duration_hours": 2.0, "terms_accepted": True, "booking_type": "hourly",
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(response.data['series'])
+        self.assertEqual(Booking.objects.filter(series_id=series_id).count(), 5)
+
+    def test_conflicting_series(self):
+        day = self.today + jdatetime.timedelta(days=70)
+        Booking.objects.create(
+            seat=self.seat, full_name="Other", national_id="0060495219", mobile="09123456789",
+            start_date_jalali=day, end_date_jalali=day, booking_type='daily', status='confirmed'
+        )
+        response = self.client.post('/api/v1/series/', self.payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(day), response.data[0])
+
+
+class FreeSeatApiTests(APITestCase):
+    def setUp(self):
+        self.space = Space.objects.create(name="Hot Desks", type='hot_desk', capacity=48, hourly_rate=100.00)
+        self.seats = [Seat.objects.create(space=self.space, visual_id=f"HD-{index:02d}") for index in range(48)]
+        self.today = jdatetime.date.today()
+        self.date = self.today.strftime("%Y-%m-%d")
+
+    def _book(self, seat, booking_type='hourly', start=datetime.time(9, 0), end=datetime.time(11, 0)):
+        hourly = booking_type == 'hourly'
+        return Booking.objects.create(
+            seat=seat, full_name="Taken", national_id="0060495219", mobile="09123456789",
+            start_date_jalali=self.today, end_date_jalali=self.today, booking_type=booking_type,
+            start_time=start if hourly else None, end_time=end if hourly else None, status='confirmed'
+        )
+
+    def test_free_seat_is_one_query(self):
+        self._book(self.seats[0])
+        self._book(self.seats[1], booking_type='daily')
+        self._book(self.seats[2], start=datetime.time(11, 0), end=datetime.time(12, 0))  # touches, no overlap
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/seats/free/', {
+                'space': str(self.space.id), 'date': self.date, 'start_time': '10:00', 'end_time': '11:00'
+            })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['visual_id'], 'HD-02')
+
+    def test_daily_request_skips_partially_booked_seats(self):
+        self._book(self.seats[0], start=datetime.time(20, 0), end=datetime.time(21, 0))
+        response = self.client.get('/api/v1/seats/free/', {
+            'type': 'hot_desk', 'booking_type': 'daily', 'date': self.date
+        })
+        self.assertEqual(response.data['visual_id'], 'HD-01')
+
+    def test_no_free_seat(self):
+        Space.objects.filter(pk=self.space.pk).update(allow_hourly=False)
+        response = self.client.get('/api/v1/seats/free/', {
+            'space': str(self.space.id), 'date': self.date, 'start_time': '10:00', 'end_time': '11:00'
+        })
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_query_is_rejected(self):
+        tomorrow = (self.today + jdatetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        for params in [
+            {'space': str(self.space.id), 'date': self.date, 'start_time': '11:00', 'end_time': '10:00'},
+            {'space': str(self.space.id), 'date': self.date, 'start_time': '10:00', 'end_time': '10:00'},
+            {'space': str(self.space.id), 'date': self.date},
+            {'type': 'hot_desk', 'booking_type': 'daily', 'date': tomorrow, 'end_date': self.date},
+            {'type': 'hot_desk', 'date': self.date, 'end_date': tomorrow, 'start_time': '10:00', 'end_time': '11:00'},
+            {'date': self.date, 'start_time': '10:00', 'end_time': '11:00'},
+            {'space': 'not-a-uuid', 'date': self.date, 'start_time': '10:00', 'end_time': '11:00'},
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get('/api/v1/seats/free/', params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_auto_assign_books_first_free_seat(self):
+        self._book(self.seats[0])
+        payload = {
+            "space_type": "hot_desk",
+            "full_name": "Walk In",
+            "national_id": "0060495219",
+            "mobile": "09123456789",
+            "start_date_jalali": self.date,
+            "end_date_jalali": self.date,
+            "start_time": "10:00",
+            "end_time": "12:00",
+            "duration_hours": 2.0,
+            "terms_accepted": True,
+            "booking_type": "hourly",
+        }
+        response = self.client.post('/api/v1/bookings/auto-assign/', payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['seat'], self.seats[1].id)
+
+        response = self.client.post('/api/v1/bookings/auto-assign/', dict(payload, space_type=None), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_auto_assign_moves_on_when_seat_is_taken_meanwhile(self):
+        real_find = AvailabilityService.find_free_seat
+        calls = []
+
+        def racing_find(seats, *args):
+            seat = real_find(seats, *args)
+            if not calls:
+                # Another request books the chosen seat before we lock it
+                self._book(seat, start=datetime.time(10, 0), end=datetime.time(12, 0))
+            calls.append(seat)
+            return seat
+
+        data = {
+            'full_name': "Walk In", 'national_id': "0060495219", 'mobile': "09123456789",
+            'start_date_jalali': self.today, 'end_date_jalali': self.today,
+            'start_time': datetime.time(10, 0), 'end_time': datetime.time(12, 0),
+            'booking_type': 'hourly', 'terms_accepted': True,
+        }
+        with mock.patch.object(AvailabilityService, 'find_free_seat', side_effect=racing_find):
+            booking = BookingService.create_booking_any_seat(data, AvailabilityService.bookable_seats('hourly'))
+        self.assertEqual([seat.visual_id for seat in calls], ['HD-00', 'HD-01'])
+        self.assertEqual(booking.seat, self.seats[1])
+
+
+class CatalogConditionalApiTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.space = Space.objects.create(name="Catalog Space", capacity=4)
+        self.seat = Seat.objects.create(space=self.space, visual_id="CT-1")
+
+    def test_revalidation_returns_304_from_the_version_row(self):
+        response = self.client.get('/api/v1/spaces/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        # Only the version row is read
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/spaces/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/v1/seats/{self.seat.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(CATALOG_CACHE_ENABLED=True)
+    def test_revalidation_from_the_cache_costs_no_query(self):
+        etag = self.client.get('/api/v1/spaces/')['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/spaces/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # The new stamp is cached once the write commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seat.name = "Window seat"
+            self.seat.save()
+        with self.assertNumQueries(1):  # the seat itself; the stamp comes from the cache
+            response = self.client.get(f'/api/v1/seats/{self.seat.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_seat_change_invalidates_etag(self):
+        etag = self.client.get('/api/v1/seats/')['ETag']
+
+        # Same path as an admin inline edit
+        self.seat.name = "Window seat"
+        self.seat.save()
+
+        response = self.client.get('/api/v1/seats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_stamp_is_shared_through_the_database(self):
+        etag = self.client.get('/api/v1/seats/')['ETag']
+        # Another worker's cache knows nothing of this process's stamp
+        cache.clear()
+        response = self.client.get('/api/v1/seats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_populate_spaces_bumps_version(self):
+        etag = self.client.get('/api/v1/seats/')['ETag']
+        call_command('populate_spaces', stdout=io.StringIO())
+        response = self.client.get('/api/v1/seats/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_seat_status_for_date_is_not_conditional(self):
+        response = self.client.get('/api/v1/seats/', {'date': jdatetime.date.today().strftime("%Y-%m-%d")})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class BackOfficePaginationApiTests(APITestCase):
+    def setUp(self):
+        self.staff = get_user_model().objects.create_user(
+            mobile='09120000001', national_id='0000000001', password='password123',
+            full_name='Staff User', is_staff=True
+        )
+        space = Space.objects.create(name="Office", capacity=20)
+        seat = Seat.objects.create(space=space, visual_id="BO-1")
+        today = jdatetime.date.today()
+        self.bookings = [
+            BookingService.create_booking({
+                'seat': seat, 'full_name': f"User {index}", 'national_id': "0060495219",
+                'mobile': "09123456789", 'booking_type': 'daily',
+                'start_date_jalali': today + jdatetime.timedelta(days=index),
+                'end_date_jalali': today + jdatetime.timedelta(days=index),
+            })
+            for index in range(12)
+        ]
+        # Several bookings created in the same instant must still page cleanly
+        same_instant = timezone.now()
+        Booking.objects.filter(pk__in=[booking.pk for booking in self.bookings[3:8]]).update(created_at=same_instant)
+
+    def _walk(self, url):
+        seen = []
+        query_counts = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            query_counts.append(len(queries))
+            seen.extend(entry['id'] for entry in response.data['results'])
+            url = response.data['next']
+        return seen, query_counts
+
+    def test_requires_staff(self):
+        response = self.client.get('/api/v1/backoffice/bookings/')
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_bookings_cursor_walk(self):
+        self.client.force_authenticate(self.staff)
+        seen, query_counts = self._walk('/api/v1/backoffice/bookings/?page_size=5')
+
+        self.assertEqual(len(seen), 12)
+        self.assertEqual(set(seen), {str(booking.pk) for booking in self.bookings})
+        # The last page costs the same as the first one
+        self.assertEqual(query_counts[0], query_counts[-1])
+
+    def test_audit_log_cursor_walk(self):
+        self.client.force_authenticate(self.staff)
+        seen, _ = self._walk('/api/v1/backoffice/audit-logs/?page_size=5')
+        self.assertEqual(sorted(seen), sorted(AuditLog.objects.values_list('id', flat=True)))
+
+
+class MemberBookingHistoryApiTests(APITestCase):
+    def setUp(self):
+        self.member = get_user_model().objects.create_user(
+            mobile='09123456789', national_id='0060495219', password='password123', full_name='Member'
+        )
+        space = Space.objects.create(name="Member Space", capacity=4)
+        self.seat = Seat.objects.create(space=space, visual_id="MB-1")
+        self.today = jdatetime.date.today()
+
+    def _book(self, offset, national_id='0060495219'):
+        day = self.today + jdatetime.timedelta(days=offset)
+        return Booking.objects.create(
+            seat=self.seat, full_name="Member", national_id=national_id, mobile='09123456789',
+            booking_type='daily', start_date_jalali=day, end_date_jalali=day
+        )
+
+    def test_requires_authentication(self):
+        response = self.client.get('/api/v1/bookings/mine/')
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_upcoming_and_past(self):
+        upcoming = [self._book(offset) for offset in (9, 0, 3)]
+        past = [self._book(-offset) for offset in (2, 40)]
+        self._book(1, national_id='1111111111')  # someone else
+        self.client.force_authenticate(self.member)
+
+        response = self.client.get('/api/v1/bookings/mine/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([entry['id'] for entry in response.data['results']],
+                         [str(booking.id) for booking in (upcoming[1], upcoming[2], upcoming[0])])
+        self.assertEqual(response.data['results'][0]['seat'], 'MB-1')
+        self.assertEqual(response.data['results'][0]['space'], 'Member Space')
+
+        response = self.client.get('/api/v1/bookings/mine/', {'when': 'past'})
+        self.assertEqual([entry['id'] for entry in response.data['results']], [str(booking.id) for booking in past])
+
+    def test_fixed_query_budget_across_pages(self):
+        for offset in range(-30, 30):
+            self._book(offset)
+        self.client.force_authenticate(self.member)
+
+        url = '/api/v1/bookings/mine/?when=past&page_size=7'
+        seen = []
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            seen.extend(entry['start_date_jalali'] for entry in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+
+class ArchivedBookingApiTests(APITestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.enterContext(self.settings(ARCHIVE_ROOT=root))
+
+        space = Space.objects.create(name="Archive Office", capacity=5)
+        seat = Seat.objects.create(space=space, visual_id="AA-1")
+        day = jdatetime.date.today() - jdatetime.timedelta(days=800)
+        self.booking = Booking.objects.create(
+            seat=seat, full_name="Archived Member", national_id="0060495219", mobile="09123456789",
+            booking_type='daily', start_date_jalali=day, end_date_jalali=day, status='completed'
+        )
+        archive.archive_bookings()
+        self.url = f'/api/v1/backoffice/archived-bookings/{self.booking.pk}/'
+
+    def test_staff_can_look_up_archived_booking(self):
+        staff = get_user_model().objects.create_user(
+            mobile='09120000001', national_id='0000000001', password='password123',
+            full_name='Staff User', is_staff=True
+        )
+        self.client.force_authenticate(staff)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['full_name'], "Archived Member")
+        self.assertEqual(response.data['record']['id'], str(self.booking.pk))
+        self.assertNotIn('path', response.data)
+
+    def test_missing_archive_file_is_a_404(self):
+        staff = get_user_model().objects.create_user(
+            mobile='09120000001', national_id='0000000001', password='password123',
+            full_name='Staff User', is_staff=True
+        )
+        self.client.force_authenticate(staff)
+        entry = ArchivedBooking.objects.get(pk=self.booking.pk)
+        (archive.archive_root() / entry.path).unlink()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIn(entry.path, response.data['detail'])
+
+    def test_lookup_requires_staff(self):
+        response = self.client.get(self.url)
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
@@ -0,0 +1,95 @@
+from django.test import TestCase
+from django.utils import timezone
+from bookings.models import Space, Seat, Booking, AuditLog, ArchivedBooking
+from bookings import archive
+from unittest import mock
+import jdatetime
+import datetime
+import fcntl
+import gzip
+import shutil
+import tempfile
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.enterContext(self.settings(ARCHIVE_ROOT=root, BOOKING_RETENTION_DAYS=365))
+
+        space = Space.objects.create(name="Archive Space", capacity=5)
+        self.seat = Seat.objects.create(space=space, visual_id="AR-1")
+        self.today = jdatetime.date.today()
+
+    def book(self, days_ago, status):
+        day = self.today - jdatetime.timedelta(days=days_ago)
+        booking = Booking.objects.create(
+            seat=self.seat, full_name="Archive User", national_id="0060495219", mobile="09123456789",
+            booking_type='daily', start_date_jalali=day, end_date_jalali=day, status=status
+        )
+        AuditLog.objects.create(booking=booking, action='created', new_status='pending', changed_by='System')
+        return booking
+
+    def test_old_finished_bookings_move_to_archive_files(self):
+        old = [self.book(400, 'completed'), self.book(430, 'cancelled'), self.book(500, 'completed')]
+        recent = self.book(30, 'completed')
+        still_active = self.book(400, 'confirmed')
+
+        self.assertEqual(archive.archive_bookings(chunk_size=2), (3, 3))
+
+        self.assertFalse(Booking.objects.filter(pk__in=[b.pk for b in old]).exists())
+        self.assertFalse(AuditLog.objects.filter(booking_id__in=[b.pk for b in old]).exists())
+        self.assertEqual(Booking.objects.filter(pk__in=[recent.pk, still_active.pk]).count(), 2)
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+        record = archive.lookup(old[1].pk)
+        self.assertEqual(record['status'], 'cancelled')
+        self.assertEqual(record['start_date_jalali'], str(old[1].start_date_jalali))
+        self.assertEqual(record['seat_visual_id'], "AR-1")
+        self.assertEqual([log['action'] for log in record['audit_logs']], ['created'])
+        self.assertIsNone(archive.lookup(recent.pk))
+
+        # Partitions are plain gzip JSONL, however many members a run appended
+        entry = ArchivedBooking.objects.get(pk=old[0].pk)
+        day = old[0].end_date_jalali
+        self.assertEqual(entry.path, f"bookings/{day.year:04d}/{day.month:02d}.jsonl.gz")
+        lines = []
+        for entry_path in set(ArchivedBooking.objects.values_list('path', flat=True)):
+            with gzip.open(archive.archive_root() / entry_path) as archive_file:
+                lines.extend(archive_file.read().splitlines())
+        self.assertEqual(len(lines), 3)
+
+        self.assertEqual(archive.archive_bookings(), (0, 0))
+
+    def test_interrupted_run_is_finished_by_the_next(self):
+        first, second = self.book(400, 'completed'), self.book(401, 'completed')
+        # A run that wrote and indexed one booking but died before deleting it
+        archive._write_chunk(list(Booking.objects.filter(pk=first.pk).prefetch_related('audit_logs')))
+
+        self.assertEqual(archive.archive_bookings(), (1, 2))
+        self.assertEqual(Booking.objects.count(), 0)
+        self.assertEqual(archive.lookup(first.pk)['id'], str(first.pk))
+        self.assertEqual(archive.lookup(second.pk)['id'], str(second.pk))
+
+    def test_members_are_appended_under_an_exclusive_lock(self):
+        with mock.patch('bookings.archive.fcntl.flock', wraps=fcntl.flock) as flock:
+            first = archive.write_member('bookings/test.jsonl.gz', [{'id': 'a'}])
+            second = archive.write_member('bookings/test.jsonl.gz', [{'id': 'b'}])
+        self.assertEqual([call.args[1] for call in flock.call_args_list], [fcntl.LOCK_EX, fcntl.LOCK_EX])
+        self.assertEqual(first, 0)
+        self.assertEqual(archive.read_member('bookings/test.jsonl.gz', second), [{'id': 'b'}])
+
+    def test_lookup_of_a_missing_file_raises_a_clear_error(self):
+        booking = self.book(400, 'completed')
+        archive.archive_bookings()
+        entry = ArchivedBooking.objects.get(pk=booking.pk)
+        (archive.archive_root() / entry.path).unlink()
+
+        with self.assertRaisesMessage(archive.ArchiveFileMissing, entry.path):
+            archive.lookup(booking.pk)
+
+    def test_retention_window_is_measured_from_now(self):
+        booking = self.book(10, 'completed')
+        later = timezone.now() + datetime.timedelta(days=400)
+        self.assertEqual(archive.archive_bookings(now=later), (1, 1))
+        self.assertEqual(ArchivedBooking.objects.get().pk, booking.pk)
@@ -0,0 +1,16 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from bookings.models import Booking, Space
+
+class StressBookingCommandTests(TransactionTestCase):
+    def test_concurrent_attempts_create_one_booking(self):
+        out = StringIO()
+        call_command('stress_booking', threads=4, rounds=2, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("Double bookings: 0", output)
+        self.assertIn("Created: 1,", output)
+        # Temporary seat and bookings are cleaned up
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(Space.objects.exists())
@@ -0,0 +1,35 @@
+from django.test import SimpleTestCase
+from bookings import jalali
+import datetime
+import jdatetime
+
+class JalaliTableTests(SimpleTestCase):
+    def test_table_matches_jdatetime(self):
+        for day_ordinal in range(jalali.FIRST_ORDINAL, jalali.LAST_ORDINAL + 1, 7):
+            expected = jdatetime.date.fromgregorian(date=datetime.date.fromordinal(day_ordinal))
+            self.assertEqual(jalali.components(day_ordinal), (expected.year, expected.month, expected.day))
+            self.assertEqual(jalali.to_ordinal(expected), day_ordinal)
+
+    def test_parse_and_format(self):
+        day_ordinal = jalali.parse('1403-12-30')  # 1403 is a leap year
+        self.assertEqual(jalali.to_gregorian(day_ordinal), datetime.date(2025, 3, 20))
+        self.assertEqual(jalali.format_date(day_ordinal), '1403-12-30')
+        self.assertEqual(jalali.parse('1403-1-5'), jalali.parse('1403-01-05'))
+        self.assertEqual(jalali.parse_date('1403-06-31'), jdatetime.date(1403, 6, 31))
+
+    def test_invalid_dates(self):
+        for value in ('1402-12-30', '1403-07-31', '1403-13-01', '1403-00-10', 'not-a-date', '1403/01/01'):
+            with self.assertRaises(ValueError):
+                jalali.parse(value)
+
+    def test_outside_table_falls_back_to_jdatetime(self):
+        value = jdatetime.date(1460, 3, 15)
+        day_ordinal = jalali.to_ordinal(value)
+        self.assertEqual(day_ordinal, value.togregorian().toordinal())
+        self.assertEqual(jalali.to_date(day_ordinal), value)
+
+    def test_iteration_and_difference(self):
+        days = list(jalali.iter_dates(jdatetime.date(1402, 12, 28), jdatetime.date(1403, 1, 2)))
+        self.assertEqual([str(day) for day in days],
+                         ['1402-12-28', '1402-12-29', '1403-01-01', '1403-01-02'])
+        self.assertEqual(jalali.days_between(days[0], days[-1]), 3)
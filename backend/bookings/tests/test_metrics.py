@@ -0,0 +1,121 @@
+from django.test import TestCase, override_settings
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from prometheus_client import REGISTRY, CollectorRegistry
+from unittest import mock
+from bookings.models import Space, Seat, Booking, OutboxMessage
+from bookings.services import AvailabilityService, BookingService, OutboxService
+from bookings import metrics
+import jdatetime
+import datetime
+
+
+@override_settings(METRICS_TOKEN='scrape-secret')
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.space = Space.objects.create(name="Metrics Space", capacity=5)
+        self.seat = Seat.objects.create(space=self.space, visual_id="MT-1")
+        day = jdatetime.date.today() + jdatetime.timedelta(days=1)
+        self.data = {
+            'seat': self.seat,
+            'full_name': "Metrics User",
+            'national_id': "0060495219",
+            'mobile': "09123456789",
+            'booking_type': 'hourly',
+            'start_date_jalali': day,
+            'end_date_jalali': day,
+            'start_time': datetime.time(9, 0),
+            'end_time': datetime.time(10, 0),
+            'duration_hours': 1,
+            'terms_accepted': True,
+        }
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def scrape(self):
+        return self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+
+    def test_endpoint_exposes_request_latency_per_view(self):
+        self.client.get('/api/v1/seats/')
+        response = self.scrape()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{', body)
+        self.assertIn('view="SeatViewSet.list"', body)
+        self.assertIn('booking_create_duration_seconds_count', body)
+
+    def test_booking_timers_and_rejection_counters(self):
+        created = self.sample('booking_create_duration_seconds_count')
+        checks = self.sample('seat_availability_check_duration_seconds_count')
+        rejected = self.sample('booking_rejections_total', code='seat_unavailable')
+
+        BookingService.create_booking(dict(self.data))
+        with self.assertRaises(ValidationError):
+            BookingService.create_booking(dict(self.data))
+        # create_booking skips this check where PostgreSQL enforces overlap
+        AvailabilityService.is_seat_available(
+            self.seat, self.data['start_date_jalali'], self.data['end_date_jalali'],
+            self.data['start_time'], self.data['end_time']
+        )
+
+        self.assertEqual(self.sample('booking_create_duration_seconds_count'), created + 2)
+        self.assertGreater(self.sample('seat_availability_check_duration_seconds_count'), checks)
+        self.assertEqual(self.sample('booking_rejections_total', code='seat_unavailable'), rejected + 1)
+
+    def test_outbox_backlog_gauge_and_failures(self):
+        BookingService.create_booking(dict(self.data))
+        OutboxMessage.objects.create(topic='booking.confirmation', payload={}, status='failed')
+
+        body = self.scrape().content.decode()
+        self.assertIn('outbox_messages{status="pending"} 1.0', body)
+        self.assertIn('outbox_messages{status="failed"} 1.0', body)
+
+        # Failures are read from the outbox rows, so a scrape served by one
+        # process sees the attempts a Celery worker made
+        failing = {OutboxService.BOOKING_CONFIRMATION: mock.Mock(side_effect=RuntimeError("down"))}
+        with mock.patch.object(OutboxService, 'handlers', return_value=failing), \
+                self.assertLogs('bookings.services', level='WARNING'):
+            OutboxService.dispatch()
+        OutboxMessage.objects.update(available_at=timezone.now())
+        with mock.patch.object(OutboxService, 'handlers', return_value={OutboxService.BOOKING_CONFIRMATION: mock.Mock()}):
+            OutboxService.dispatch()
+
+        body = self.scrape().content.decode()
+        self.assertIn('outbox_delivery_failures{topic="booking.confirmation"} 1.0', body)
+        self.assertIn('outbox_messages{status="done"} 1.0', body)
+
+    def test_notification_failures_come_from_the_database(self):
+        booking = BookingService.create_booking(dict(self.data, email="metrics@example.com"))
+        body = self.scrape().content.decode()
+        self.assertIn('notification_delivery_failures{kind="confirmation"} 0.0', body)
+
+        Booking.objects.filter(pk=booking.pk).update(confirmation_attempts=2, reminder_attempts=1)
+        body = self.scrape().content.decode()
+        self.assertIn('notification_delivery_failures{kind="confirmation"} 1.0', body)
+        self.assertIn('notification_delivery_failures{kind="reminder"} 1.0', body)
+
+        Booking.objects.filter(pk=booking.pk).update(confirmation_sent_at=timezone.now())
+        body = self.scrape().content.decode()
+        self.assertIn('notification_delivery_failures{kind="confirmation"} 0.0', body)
+
+    def test_token_protects_endpoint(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        self.assertEqual(self.scrape().status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_endpoint_is_closed_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+    def test_multiprocess_registry_when_configured(self):
+        self.assertIs(metrics.registry(), REGISTRY)
+        with mock.patch.dict('os.environ', {'PROMETHEUS_MULTIPROC_DIR': '/tmp'}), \
+                mock.patch('prometheus_client.multiprocess.MultiProcessCollector') as collector:
+            merged = metrics.registry()
+        self.assertIsInstance(merged, CollectorRegistry)
+        self.assertIsNot(merged, REGISTRY)
+        collector.assert_called_once_with(merged)
@@ -0,0 +1,54 @@
+from django.test import TestCase, modify_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from bookings.models import Space, Seat, Booking
+import jdatetime
+import re
+
+INSTRUMENTATION = 'config.middleware.QueryInstrumentationMiddleware'
+
+
+@modify_settings(MIDDLEWARE={'prepend': INSTRUMENTATION})
+class QueryInstrumentationTests(TestCase):
+    def setUp(self):
+        self.space = Space.objects.create(name="Timing Space", capacity=20)
+        self.seat = Seat.objects.create(space=self.space, visual_id="TM-1")
+
+    def queries(self, response):
+        return int(re.search(r'db;desc="(\d+) queries";dur=[\d.]+', response['Server-Timing']).group(1))
+
+    def test_api_request_reports_queries_and_view(self):
+        with self.assertLogs('config.middleware', level='INFO') as logs:
+            response = self.client.get('/api/v1/seats/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(self.queries(response), 1)
+        self.assertIn('db-slowest;dur=', response['Server-Timing'])
+        self.assertIn('view=SeatViewSet.list method=GET path=/api/v1/seats/ status=200', logs.output[0])
+        self.assertEqual(logs.records[0].view, 'SeatViewSet.list')
+
+    def test_admin_booking_list_does_not_grow_with_rows(self):
+        admin_user = get_user_model().objects.create_superuser(
+            mobile='09120000000', national_id='0000000000', password='password123', full_name='Admin User'
+        )
+        self.client.force_login(admin_user)
+        url = reverse('admin:bookings_booking_changelist')
+
+        def book(index):
+            other = Seat.objects.create(space=Space.objects.create(name=f"Space {index}", capacity=1),
+                                        visual_id=f"TM-{index + 2}")
+            Booking.objects.create(
+                seat=other, full_name=f"User {index}", national_id="0060495219", mobile="09123456789",
+                booking_type='daily', start_date_jalali=jdatetime.date.today(), end_date_jalali=jdatetime.date.today()
+            )
+
+        book(0)
+        with self.assertLogs('config.middleware', level='INFO') as logs:
+            few = self.queries(self.client.get(url))
+        self.assertIn('view=admin:bookings_booking_changelist', logs.output[0])
+
+        for index in range(1, 6):
+            book(index)
+        with self.assertLogs('config.middleware', level='INFO'):
+            many = self.queries(self.client.get(url))
+        self.assertEqual(few, many)
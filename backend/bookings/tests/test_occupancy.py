@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase
+from bookings import occupancy
+import datetime
+
+class OccupancyBitmapTests(SimpleTestCase):
+    def test_full_day_without_times(self):
+        self.assertEqual(occupancy.slot_mask(), occupancy.FULL_DAY_MASK)
+        self.assertEqual(occupancy.booking_mask('daily', datetime.time(9, 0), datetime.time(10, 0)), occupancy.FULL_DAY_MASK)
+
+    def test_aligned_interval(self):
+        # 09:00-10:00 -> slots 36..39
+        mask = occupancy.slot_mask(datetime.time(9, 0), datetime.time(10, 0))
+        self.assertEqual(mask, 0b1111 << 36)
+
+    def test_unaligned_interval_rounds_outwards(self):
+        mask = occupancy.slot_mask(datetime.time(9, 5), datetime.time(9, 20))
+        self.assertEqual(mask, 0b11 << 36)
+
+    def test_touching_intervals_do_not_overlap(self):
+        first = occupancy.slot_mask(datetime.time(9, 0), datetime.time(11, 0))
+        second = occupancy.slot_mask(datetime.time(11, 0), datetime.time(13, 0))
+        self.assertEqual(first & second, 0)
+
+    def test_bytes_round_trip(self):
+        mask = occupancy.slot_mask(datetime.time(23, 0), datetime.time(23, 59))
+        self.assertEqual(occupancy.from_bytes(occupancy.to_bytes(mask)), mask)
+        self.assertEqual(len(occupancy.to_bytes(occupancy.FULL_DAY_MASK)), occupancy.MASK_BYTES)
@@ -0,0 +1,38 @@
+from django.test import SimpleTestCase
+from bookings import recurrence
+import jdatetime
+
+class RecurrenceTests(SimpleTestCase):
+    def test_weekly_window(self):
+        days = list(recurrence.iter_occurrences(
+            recurrence.WEEKLY, 1, jdatetime.date(1403, 1, 5), jdatetime.date(1403, 3, 1),
+            jdatetime.date(1403, 2, 1), jdatetime.date(1403, 2, 20)
+        ))
+        self.assertEqual(days, [jdatetime.date(1403, 2, 2), jdatetime.date(1403, 2, 9), jdatetime.date(1403, 2, 16)])
+
+    def test_daily_interval(self):
+        days = list(recurrence.iter_occurrences(
+            recurrence.DAILY, 3, jdatetime.date(1403, 1, 5), jdatetime.date(1403, 1, 14)
+        ))
+        self.assertEqual(days, [jdatetime.date(1403, 1, 5), jdatetime.date(1403, 1, 8),
+                                jdatetime.date(1403, 1, 11), jdatetime.date(1403, 1, 14)])
+
+    def test_monthly_skips_short_jalali_months(self):
+        # Months 7-12 have fewer than 31 days
+        days = list(recurrence.iter_occurrences(
+            recurrence.MONTHLY, 1, jdatetime.date(1403, 5, 31), jdatetime.date(1404, 2, 1)
+        ))
+        self.assertEqual(days, [jdatetime.date(1403, 5, 31), jdatetime.date(1403, 6, 31), jdatetime.date(1404, 1, 31)])
+
+    def test_monthly_window_keeps_interval_phase(self):
+        days = list(recurrence.iter_occurrences(
+            recurrence.MONTHLY, 2, jdatetime.date(1403, 1, 10), jdatetime.date(1403, 12, 29),
+            jdatetime.date(1403, 4, 1)
+        ))
+        self.assertEqual([day.month for day in days], [5, 7, 9, 11])
+
+    def test_is_lazy(self):
+        occurrences = recurrence.iter_occurrences(
+            recurrence.DAILY, 1, jdatetime.date(1403, 1, 1), jdatetime.date(1500, 1, 1)
+        )
+        self.assertEqual(next(occurrences), jdatetime.date(1403, 1, 1))
@@ -1,9 +1,22 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.core import mail
 from django.core.exceptions import ValidationError
-from bookings.models import Space, Booking, AuditLog, Seat
-from bookings.services import BookingService
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from unittest import mock, skipUnless
+from bookings.models import (
+    Space, Booking, BookingSeries, AuditLog, Seat, SeatOccupancy, DailyStats, DailyStatsDirtyDay, OutboxMessage
+)
+from bookings.services import (
+    BookingService, AvailabilityService, OccupancyService, RevenueService, StatsService, SeriesService,
+    OutboxService
+)
+from bookings import occupancy, sms
 import jdatetime
 import datetime
+import zoneinfo
+from decimal import Decimal
 
 class BookingServiceTests(TestCase):
     def setUp(self):
@@ -85,4 +98,735 @@ class BookingServiceTests(TestCase):
             
         # Ensure only 1 booking exists (the first one)
         self.assertEqual(Booking.objects.count(), 1)
-        self.assertEqual(AuditLog.objects.count(), 1)
\ No newline at end of file
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+class BulkCreateRetryTests(TransactionTestCase):
+    def setUp(self):
+        self.space = Space.objects.create(name="Retry Space", capacity=1, hourly_rate=100.00)
+        self.seat = Seat.objects.create(space=self.space, visual_id="RT-1")
+        day = jdatetime.date.today()
+        self.items = [(0, {
+            'seat': self.seat, 'full_name': "Retry User", 'national_id': "0060495219", 'mobile': "09123456789",
+            'start_date_jalali': day, 'end_date_jalali': day,
+            'start_time': datetime.time(9, 0), 'end_time': datetime.time(11, 0),
+            'duration_hours': 2.0, 'terms_accepted': True, 'booking_type': 'hourly',
+        })]
+
+    def test_serialization_failure_is_retried(self):
+        create = BookingService._create_bookings_bulk_locked
+        calls = []
+
+        def flaky(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            return create(*args)
+
+        with mock.patch.object(BookingService, '_create_bookings_bulk_locked', side_effect=flaky):
+            bookings, rejected = BookingService.create_bookings_bulk(self.items, all_or_nothing=False)
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((len(bookings), rejected), (1, {}))
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_persistent_failure_becomes_a_validation_error(self):
+        with mock.patch.object(BookingService, '_create_bookings_bulk_locked',
+                               side_effect=OperationalError("canceling statement due to lock timeout")) as locked:
+            with self.assertRaises(ValidationError) as cm:
+                BookingService.create_bookings_bulk(self.items, all_or_nothing=False)
+
+        self.assertEqual(cm.exception.code, 'booking_creation_failed')
+        self.assertEqual(locked.call_count, 1)  # not a serialization failure, so not retried
+
+
+class OccupancyServiceTests(TestCase):
+    def setUp(self):
+        self.space = Space.objects.create(
+            name="Occupancy Space",
+            capacity=1,
+            hourly_rate=100.00
+        )
+        self.seat = Seat.objects.create(
+            space=self.space,
+            visual_id="O-1",
+            name="Occupancy Seat"
+        )
+        self.today = jdatetime.date.today()
+        self.valid_data = {
+            'seat': self.seat,
+            'full_name': "Occupancy User",
+            'national_id': "0060495219",
+            'mobile': "09123456789",
+            'start_date_jalali': self.today,
+            'end_date_jalali': self.today,
+            'start_time': datetime.time(9, 0),
+            'end_time': datetime.time(11, 0),
+            'duration_hours': 2.0,
+            'terms_accepted': True,
+            'booking_type': 'hourly'
+        }
+
+    def test_create_sets_bitmap(self):
+        BookingService.create_booking(self.valid_data)
+        row = SeatOccupancy.objects.get(seat=self.seat, date_jalali=self.today)
+        expected = occupancy.slot_mask(datetime.time(9, 0), datetime.time(11, 0))
+        self.assertEqual(occupancy.from_bytes(row.slots), expected)
+
+    def test_multi_day_booking_marks_every_day(self):
+        data = self.valid_data.copy()
+        data.update({
+            'booking_type': 'weekly',
+            'end_date_jalali': self.today + jdatetime.timedelta(days=6),
+            'start_time': None,
+            'end_time': None,
+        })
+        BookingService.create_booking(data)
+        self.assertEqual(SeatOccupancy.objects.filter(seat=self.seat).count(), 7)
+        self.assertFalse(AvailabilityService.is_seat_available(
+            self.seat, self.today + jdatetime.timedelta(days=3), self.today + jdatetime.timedelta(days=3),
+            datetime.time(14, 0), datetime.time(15, 0)
+        ))
+
+    def test_cancel_frees_bitmap(self):
+        booking = BookingService.create_booking(self.valid_data)
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertFalse(SeatOccupancy.objects.filter(seat=self.seat).exists())
+        self.assertTrue(AvailabilityService.is_seat_available(
+            self.seat, self.today, self.today, datetime.time(9, 0), datetime.time(11, 0)
+        ))
+
+    def test_rebuild_after_queryset_update(self):
+        BookingService.create_booking(self.valid_data)
+        spans = list(Booking.objects.values_list('seat_id', 'start_date_jalali', 'end_date_jalali'))
+        Booking.objects.update(status='completed')
+        OccupancyService.rebuild(spans)
+        self.assertFalse(SeatOccupancy.objects.filter(seat=self.seat).exists())
+
+    def test_unaligned_bitmap_hit_is_confirmed_against_bookings(self):
+        data = self.valid_data.copy()
+        data['start_time'] = datetime.time(9, 0)
+        data['end_time'] = datetime.time(9, 50)
+        BookingService.create_booking(data)
+        # 09:50 shares the 09:45 slot but does not overlap the booking itself.
+        self.assertTrue(AvailabilityService.is_seat_available(
+            self.seat, self.today, self.today, datetime.time(9, 50), datetime.time(10, 30)
+        ))
+
+    def test_span_columns_follow_dates_and_times(self):
+        booking = BookingService.create_booking(self.valid_data)
+        self.assertEqual(
+            (booking.start_day, booking.end_day, booking.start_minute, booking.end_minute),
+            (self.today.togregorian().toordinal(), self.today.togregorian().toordinal(), 9 * 60, 11 * 60)
+        )
+
+        booking.booking_type = 'daily'
+        booking.save(update_fields=['booking_type'])
+        booking.refresh_from_db()
+        self.assertEqual((booking.start_minute, booking.end_minute), (0, 24 * 60))
+
+    def test_exact_check_is_a_single_exists_query(self):
+        BookingService.create_booking(dict(self.valid_data, end_time=datetime.time(11, 5)))
+        # 11:05-11:20 shares the 11:00 slot with the booking but not a minute
+        with self.assertNumQueries(2):
+            self.assertTrue(AvailabilityService.is_seat_available(
+                self.seat, self.today, self.today, datetime.time(11, 5), datetime.time(11, 20)
+            ))
+
+    def test_multi_day_hourly_request_checks_every_day(self):
+        tomorrow = self.today + jdatetime.timedelta(days=1)
+        BookingService.create_booking(dict(self.valid_data, start_date_jalali=tomorrow, end_date_jalali=tomorrow))
+        # 10:00-12:00 on each of two days clashes with tomorrow's 09:00-11:00
+        self.assertFalse(AvailabilityService.is_seat_available(
+            self.seat, self.today, tomorrow, datetime.time(10, 0), datetime.time(12, 0)
+        ))
+        self.assertTrue(AvailabilityService.is_seat_available(
+            self.seat, self.today, tomorrow, datetime.time(11, 0), datetime.time(12, 0)
+        ))
+
+
+class OverlapConstraintTests(TestCase):
+    def test_constraint_violation_maps_to_seat_unavailable(self):
+        space = Space.objects.create(name="Constraint Space", capacity=1, hourly_rate=100.00)
+        seat = Seat.objects.create(space=space, visual_id="C-1")
+        data = {
+            'seat': seat,
+            'full_name': "Constraint User",
+            'national_id': "0060495219",
+            'mobile': "09123456789",
+            'start_date_jalali': jdatetime.date.today(),
+            'end_date_jalali': jdatetime.date.today(),
+            'start_time': datetime.time(9, 0),
+            'end_time': datetime.time(11, 0),
+            'booking_type': 'hourly'
+        }
+        error = IntegrityError(
+            'conflicting key value violates exclusion constraint "booking_seat_no_overlap"'
+        )
+        with mock.patch.object(Booking.objects, 'create', side_effect=error):
+            with self.assertRaises(ValidationError) as cm:
+                BookingService.create_booking(data)
+        self.assertEqual(cm.exception.code, 'seat_unavailable')
+
+
+class ReactivationTests(TestCase):
+    def setUp(self):
+        self.space = Space.objects.create(name="Reactivation Space", capacity=1, hourly_rate=100.00)
+        self.seat = Seat.objects.create(space=self.space, visual_id="RA-1")
+        self.today = jdatetime.date.today()
+
+    def book(self, start, end, status='pending'):
+        return Booking.objects.create(
+            seat=self.seat, full_name="Reactivation User", national_id="0060495219", mobile="09123456789",
+            start_date_jalali=self.today, end_date_jalali=self.today,
+            start_time=datetime.time(start), end_time=datetime.time(end), status=status
+        )
+
+    @skipUnless(connection.features.has_select_for_update, "needs row locks")
+    def test_seats_are_locked_before_bookings(self):
+        booking = self.book(9, 10)
+        with CaptureQueriesContext(connection) as queries:
+            BookingService.bulk_update_status(Booking.objects.filter(pk=booking.pk), 'cancelled')
+        locks = [query['sql'] for query in queries.captured_queries if 'FOR UPDATE' in query['sql']]
+        self.assertIn('FROM "bookings_seat"', locks[0])
+        self.assertIn('FROM "bookings_booking"', locks[1])
+
+    def test_reactivating_over_an_active_booking_is_refused(self):
+        cancelled = self.book(9, 11, status='cancelled')
+        self.book(10, 12)
+
+        with self.assertRaises(ValidationError) as cm:
+            BookingService.bulk_update_status(Booking.objects.filter(pk=cancelled.pk), 'confirmed')
+        self.assertEqual(cm.exception.code, 'seat_unavailable')
+        cancelled.refresh_from_db()
+        self.assertEqual(cancelled.status, 'cancelled')
+        self.assertFalse(AuditLog.objects.filter(booking=cancelled).exists())
+
+    def test_reactivated_bookings_are_checked_against_each_other(self):
+        first = self.book(9, 11, status='cancelled')
+        second = self.book(10, 12, status='cancelled')
+
+        with self.assertRaises(ValidationError):
+            BookingService.bulk_update_status(Booking.objects.filter(pk__in=[first.pk, second.pk]), 'confirmed')
+        self.assertEqual(Booking.objects.filter(status='cancelled').count(), 2)
+
+    def test_reactivating_a_free_slot_and_confirming_a_hold_succeed(self):
+        cancelled = self.book(9, 11, status='cancelled')
+        pending = self.book(11, 12)
+
+        changed = BookingService.bulk_update_status(Booking.objects.all(), 'confirmed')
+        self.assertEqual(changed, 2)
+        self.assertEqual(set(Booking.objects.values_list('status', flat=True)), {'confirmed'})
+        self.assertEqual(cancelled.audit_logs.get().previous_status, 'cancelled')
+        self.assertEqual(pending.audit_logs.get().previous_status, 'pending')
+
+    def test_constraint_violation_maps_to_seat_unavailable(self):
+        cancelled = self.book(9, 11, status='cancelled')
+        error = IntegrityError(
+            'conflicting key value violates exclusion constraint "booking_seat_no_overlap"'
+        )
+        with mock.patch.object(BookingService, 'reactivation_conflicts', return_value=set()), \
+                mock.patch('bookings.services.AuditLog.objects.bulk_create', side_effect=error):
+            with self.assertRaises(ValidationError) as cm:
+                BookingService.bulk_update_status(Booking.objects.filter(pk=cancelled.pk), 'confirmed')
+        self.assertEqual(cm.exception.code, 'seat_unavailable')
+
+
+@skipUnless(connection.vendor == 'postgresql', "booking_seat_no_overlap only exists on PostgreSQL")
+class PostgresOverlapConstraintTests(TestCase):
+    """
+    Runs against the migrated schema when POSTGRES_DB is set (see
+    .github/workflows/backend.yml), so migration 0004 is exercised for real.
+    """
+    def setUp(self):
+        self.space = Space.objects.create(name="Postgres Space", capacity=1, hourly_rate=100.00)
+        self.seat = Seat.objects.create(space=self.space, visual_id="PG-1")
+        self.today = jdatetime.date.today()
+
+    def book(self, start=None, end=None, booking_type='hourly', status='pending', days=0):
+        return Booking.objects.create(
+            seat=self.seat, full_name="Postgres User", national_id="0060495219", mobile="09123456789",
+            booking_type=booking_type, status=status,
+            start_date_jalali=self.today, end_date_jalali=self.today + jdatetime.timedelta(days=days),
+            start_time=datetime.time(start) if start is not None else None,
+            end_time=datetime.time(end) if end is not None else None,
+        )
+
+    def test_overlapping_insert_violates_the_constraint(self):
+        self.book(9, 11)
+        with self.assertRaises(IntegrityError) as cm, transaction.atomic():
+            self.book(10, 12)
+        self.assertTrue(BookingService.is_overlap_violation(cm.exception))
+
+    def test_daily_booking_takes_the_whole_day(self):
+        self.book(booking_type='daily')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.book(22, 23)
+
+    def test_adjacent_and_inactive_bookings_are_allowed(self):
+        self.book(9, 11)
+        self.book(11, 12)
+        self.book(9, 12, status='cancelled')
+        self.book(9, 12, status='completed')
+        self.assertEqual(Booking.objects.count(), 4)
+
+    def test_reactivation_past_the_precheck_maps_to_seat_unavailable(self):
+        cancelled = self.book(9, 11, status='cancelled')
+        self.book(10, 12)
+        with mock.patch.object(BookingService, 'reactivation_conflicts', return_value=set()):
+            with self.assertRaises(ValidationError) as cm:
+                BookingService.bulk_update_status(Booking.objects.filter(pk=cancelled.pk), 'confirmed')
+        self.assertEqual(cm.exception.code, 'seat_unavailable')
+
+
+@skipUnless(connection.vendor == 'postgresql', "INCLUDE columns only exist on PostgreSQL")
+class PostgresMemberHistoryIndexTests(TestCase):
+    def test_index_includes_the_history_columns(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indexdef FROM pg_indexes WHERE indexname = 'booking_member_history_idx'")
+            (definition,) = cursor.fetchone()
+        self.assertIn('(national_id, start_date_jalali, id)', definition)
+        self.assertIn('INCLUDE (end_date_jalali, start_time, end_time, booking_type, status, seat_id)', definition)
+
+
+class RevenueServiceTests(TestCase):
+    def setUp(self):
+        self.space = Space.objects.create(
+            name="Revenue Space", capacity=5,
+            hourly_rate=100, daily_rate=500, weekly_rate=3000, monthly_rate=10000
+        )
+        self.seat = Seat.objects.create(space=self.space, visual_id="R-1")
+        self.premium = Seat.objects.create(space=self.space, visual_id="R-2", hourly_rate=150)
+        self.start = jdatetime.date(1403, 1, 10)
+
+    def _book(self, seat, booking_type, days=1, duration=None, status='confirmed', offset=0):
+        # offset keeps active bookings on one seat apart, as PostgreSQL requires
+        start = self.start + jdatetime.timedelta(days=offset)
+        return Booking.objects.create(
+            seat=seat, full_name="Revenue User", national_id="0060495219", mobile="09123456789",
+            booking_type=booking_type, start_date_jalali=start,
+            end_date_jalali=start + jdatetime.timedelta(days=days - 1),
+            duration_hours=duration, status=status
+        )
+
+    def test_total_uses_effective_rates(self):
+        self._book(self.seat, 'hourly', duration=2)          # 2 * 100
+        self._book(self.premium, 'hourly', duration=2)       # 2 * 150 (seat override)
+        self._book(self.seat, 'daily', days=3, offset=1)     # 3 * 500
+        self._book(self.seat, 'weekly', days=7, offset=4)    # 1 * 3000
+        self._book(self.seat, 'monthly', days=31, offset=11) # 1 * 10000
+        self._book(self.seat, 'daily', days=3, status='cancelled')
+        self.assertEqual(RevenueService.total(), Decimal('15000'))
+
+    def test_breakdown_groups_by_jalali_month(self):
+        self._book(self.seat, 'hourly', duration=1)
+        self._book(self.seat, 'daily', offset=1)
+        rows = RevenueService.breakdown()
+        self.assertEqual(
+            [(row['month'], row['booking_type'], row['revenue']) for row in rows],
+            [('1403-01', 'daily', Decimal('500')), ('1403-01', 'hourly', Decimal('100'))]
+        )
+
+
+class StatsServiceTests(TestCase):
+    def setUp(self):
+        self.space = Space.objects.create(name="Stats Space", capacity=5, hourly_rate=100, daily_rate=500)
+        self.seat = Seat.objects.create(space=self.space, visual_id="ST-1")
+        self.other_seat = Seat.objects.create(space=self.space, visual_id="ST-2")
+        self.day = jdatetime.date(1403, 2, 1)
+
+    def _book(self, booking_type='hourly', status='confirmed', day=None, duration=2, seat=None):
+        day = day or self.day
+        return Booking.objects.create(
+            seat=seat or self.seat, full_name="Stats User", national_id="0060495219", mobile="09123456789",
+            booking_type=booking_type, start_date_jalali=day, end_date_jalali=day,
+            duration_hours=duration, status=status
+        )
+
+    def test_refresh_builds_rollup(self):
+        self._book()
+        self._book(booking_type='daily', duration=None, seat=self.other_seat)
+        self._book(status='cancelled')
+
+        self.assertEqual(StatsService.refresh_daily_stats(), 1)
+        stats = DailyStats.objects.get(space=self.space, date_jalali=self.day)
+        self.assertEqual((stats.confirmed_count, stats.cancelled_count), (2, 1))
+        self.assertEqual(stats.seat_hours, Decimal('26'))
+        self.assertEqual(stats.revenue, Decimal('700'))
+
+    def test_refresh_only_touches_changed_days(self):
+        other_day = self.day + jdatetime.timedelta(days=5)
+        self._book()
+        self._book(day=other_day)
+        StatsService.refresh_daily_stats()
+
+        # Move the history well into the past, then change one day only
+        Booking.objects.update(updated_at=timezone.now() - datetime.timedelta(hours=2))
+        DailyStats.objects.update(refreshed_at=timezone.now() - datetime.timedelta(hours=1))
+        self._book(day=other_day, seat=self.other_seat)
+
+        self.assertEqual(StatsService.refresh_daily_stats(), 1)
+        self.assertEqual(DailyStats.objects.get(date_jalali=other_day).confirmed_count, 2)
+        self.assertEqual(StatsService.totals()['confirmed'], 3)
+
+    def age_history(self):
+        Booking.objects.update(updated_at=timezone.now() - datetime.timedelta(hours=2))
+        DailyStats.objects.update(refreshed_at=timezone.now() - datetime.timedelta(hours=1))
+
+    def test_moved_booking_is_removed_from_its_old_day(self):
+        old_day = jdatetime.date.today() + jdatetime.timedelta(days=1)
+        new_day = old_day + jdatetime.timedelta(days=6)
+        booking = self._book(day=old_day)
+        StatsService.refresh_daily_stats()
+        self.age_history()
+
+        booking.start_date_jalali = booking.end_date_jalali = new_day
+        booking.save()
+        self.assertEqual(StatsService.refresh_daily_stats(), 2)
+        self.assertEqual(list(DailyStats.objects.values_list('date_jalali', 'confirmed_count')), [(new_day, 1)])
+
+        # The mark is kept through the lookback, then dropped
+        DailyStatsDirtyDay.objects.update(marked_at=timezone.now() - datetime.timedelta(hours=1))
+        StatsService.refresh_daily_stats()
+        self.assertFalse(DailyStatsDirtyDay.objects.exists())
+
+    def test_deleted_booking_is_removed_from_its_day(self):
+        day = jdatetime.date.today()
+        kept = self._book(day=day)
+        deleted = self._book(day=day, seat=self.other_seat)
+        StatsService.refresh_daily_stats()
+        self.age_history()
+
+        deleted.delete()
+        self.assertEqual(StatsService.refresh_daily_stats(), 1)
+        self.assertEqual(DailyStats.objects.get(date_jalali=kept.start_date_jalali).confirmed_count, 1)
+
+    def test_days_past_the_archival_cutoff_keep_their_counts(self):
+        booking = self._book(booking_type='daily', duration=None)
+        StatsService.refresh_daily_stats()
+        self.age_history()
+
+        booking.delete()
+        self.assertFalse(DailyStatsDirtyDay.objects.exists())
+        self.assertEqual(StatsService.refresh_daily_stats(), 0)
+        self.assertEqual(DailyStats.objects.get(date_jalali=self.day).confirmed_count, 1)
+
+
+class SeriesServiceTests(TestCase):
+    def setUp(self):
+        self.space = Space.objects.create(name="Series Space", capacity=1, hourly_rate=100.00)
+        self.seat = Seat.objects.create(space=self.space, visual_id="SR-1")
+        self.today = jdatetime.date.today()
+        self.data = {
+            'seat': self.seat,
+            'full_name': "Series User",
+            'national_id': "0060495219",
+            'mobile': "09123456789",
+            'booking_type': 'hourly',
+            'start_time': datetime.time(10, 0),
+            'end_time': datetime.time(12, 0),
+            'frequency': 'weekly',
+            'interval': 1,
+            'start_date_jalali': self.today,
+            'until_date_jalali': self.today + jdatetime.timedelta(days=180),
+            'terms_accepted': True,
+        }
+
+    def _book(self, day, start=datetime.time(11, 0), end=datetime.time(13, 0)):
+        return Booking.objects.create(
+            seat=self.seat, full_name="Other", national_id="0060495219", mobile="09123456789",
+            start_date_jalali=day, end_date_jalali=day, start_time=start, end_time=end,
+            booking_type='hourly', status='confirmed'
+        )
+
+    def test_only_horizon_is_materialized(self):
+        series = SeriesService.create_series(dict(self.data))
+
+        bookings = list(series.occurrences.order_by('start_date_jalali'))
+        horizon = self.today + jdatetime.timedelta(days=SeriesService.HORIZON_DAYS)
+        self.assertEqual(len(bookings), 5)  # days 0, 7, 14, 21, 28
+        self.assertEqual(bookings[-1].start_date_jalali, horizon)
+        self.assertEqual(bookings[0].duration_hours, Decimal('2.0'))
+        self.assertIsNone(bookings[0].expires_at)  # occurrences are not checkout holds
+        self.assertEqual(series.materialized_until, horizon)
+        self.assertEqual(SeatOccupancy.objects.filter(seat=self.seat).count(), 5)
+
+    def test_conflict_anywhere_in_series_rejects_it(self):
+        # Far beyond the horizon, but still part of the rule
+        self._book(self.today + jdatetime.timedelta(days=140))
+
+        with self.assertNumQueries(1):
+            conflicts = SeriesService.find_conflicts(BookingSeries(**self.data))
+        self.assertEqual(conflicts, [self.today + jdatetime.timedelta(days=140)])
+
+        with self.assertRaises(ValidationError) as cm:
+            SeriesService.create_series(dict(self.data))
+        self.assertEqual(cm.exception.code, 'seat_unavailable')
+        self.assertFalse(BookingSeries.objects.exists())
+
+    def test_non_overlapping_times_do_not_conflict(self):
+        self._book(self.today + jdatetime.timedelta(days=7), datetime.time(12, 0), datetime.time(14, 0))
+        self.assertEqual(SeriesService.find_conflicts(BookingSeries(**self.data)), [])
+
+    def test_materialize_due_extends_window_and_skips_taken_days(self):
+        series = SeriesService.create_series(dict(self.data))
+        taken = self.today + jdatetime.timedelta(days=35)
+        self._book(taken)
+
+        with mock.patch.object(SeriesService, 'HORIZON_DAYS', 42), self.assertLogs('bookings.services', 'WARNING'):
+            created = SeriesService.materialize_due()
+
+        self.assertEqual(created, 1)  # day 42; day 35 was taken meanwhile
+        series.refresh_from_db()
+        self.assertEqual(series.materialized_until, self.today + jdatetime.timedelta(days=42))
+        self.assertFalse(series.occurrences.filter(start_date_jalali=taken).exists())
+
+        notice = OutboxMessage.objects.get(topic=OutboxService.SERIES_CONFLICT)
+        self.assertEqual(notice.payload, {'series_id': str(series.pk), 'dates': [str(taken)]})
+
+        # Nothing left to do until the horizon moves again
+        with mock.patch.object(SeriesService, 'HORIZON_DAYS', 42):
+            self.assertEqual(SeriesService.materialize_due(), 0)
+
+    @override_settings(SMS_BACKEND='bookings.sms.LocmemSmsBackend')
+    def test_owners_are_told_about_skipped_occurrences(self):
+        sms.outbox.clear()
+        emailed = SeriesService.create_series(dict(self.data, email="owner@example.com"))
+        texted = SeriesService.create_series(dict(
+            self.data, start_time=datetime.time(14, 0), end_time=datetime.time(15, 0)
+        ))
+        taken = self.today + jdatetime.timedelta(days=35)
+        self._book(taken, datetime.time(9, 0), datetime.time(16, 0))
+
+        with mock.patch.object(SeriesService, 'HORIZON_DAYS', 42), self.assertLogs('bookings.services', 'WARNING'):
+            SeriesService.materialize_due()
+        self.assertEqual(OutboxMessage.objects.filter(topic=OutboxService.SERIES_CONFLICT).count(), 2)
+
+        mail.outbox.clear()
+        OutboxService.dispatch_all()
+        skipped = [message for message in mail.outbox if message.subject == 'Recurring Booking Dates Skipped']
+        self.assertEqual([message.to for message in skipped], [["owner@example.com"]])
+        self.assertIn(str(taken), skipped[0].body)
+        self.assertEqual([message.to for message in sms.outbox], [texted.mobile])
+        self.assertIn(str(taken), sms.outbox[0].body)
+        self.assertFalse(OutboxMessage.objects.exclude(status='done').exists())
+        self.assertEqual(emailed.occurrences.count(), 6)
+
+    def test_cancel_series(self):
+        series = SeriesService.create_series(dict(self.data))
+        cancelled = SeriesService.cancel_series(series, changed_by="admin")
+
+        self.assertEqual(cancelled, 5)
+        self.assertEqual(series.status, 'cancelled')
+        self.assertFalse(series.occurrences.filter(status__in=Booking.ACTIVE_STATUSES).exists())
+
+
+@override_settings(TIME_ZONE='UTC', BOOKING_TIME_ZONE='Asia/Tehran')
+class CompleteEndedTests(TestCase):
+    def setUp(self):
+        space = Space.objects.create(name="Completion Space", capacity=5)
+        self.seat = Seat.objects.create(space=space, visual_id="CP-1")
+        self.other_seat = Seat.objects.create(space=space, visual_id="CP-2")
+        self.pending_seat = Seat.objects.create(space=space, visual_id="CP-3")
+        self.now = datetime.datetime(2026, 10, 16, 12, 0, tzinfo=zoneinfo.ZoneInfo('Asia/Tehran'))
+        self.today = jdatetime.date.fromgregorian(date=self.now.date())
+
+    def book(self, start_date, end_date, start=None, end=None, booking_type='daily', status='confirmed', seat=None):
+        return Booking.objects.create(
+            seat=seat or self.seat, full_name="Completion User", national_id="0060495219", mobile="09123456789",
+            booking_type=booking_type, start_date_jalali=start_date, end_date_jalali=end_date,
+            start_time=start, end_time=end, status=status
+        )
+
+    def test_completes_only_ended_confirmed_bookings(self):
+        yesterday = self.today - jdatetime.timedelta(days=1)
+        ended = [
+            self.book(yesterday, yesterday),
+            self.book(self.today, self.today, datetime.time(9, 0), datetime.time(12, 0), 'hourly'),
+        ]
+        running = [
+            self.book(self.today, self.today, datetime.time(12, 0), datetime.time(13, 0), 'hourly'),
+            self.book(yesterday, self.today, seat=self.other_seat),
+        ]
+        pending = self.book(yesterday, yesterday, status='pending', seat=self.pending_seat)
+
+        self.assertEqual(BookingService.complete_ended(self.now), 2)
+
+        statuses = dict(Booking.objects.values_list('id', 'status'))
+        self.assertEqual({statuses[b.pk] for b in ended}, {'completed'})
+        self.assertEqual({statuses[b.pk] for b in running}, {'confirmed'})
+        self.assertEqual(statuses[pending.pk], 'pending')
+
+        log = AuditLog.objects.get(booking=ended[0])
+        self.assertEqual((log.previous_status, log.new_status, log.changed_by), ('confirmed', 'completed', 'System'))
+
+        # Nothing left to do on the next run
+        self.assertEqual(BookingService.complete_ended(self.now), 0)
+
+    def test_chunks_issue_one_update_and_one_audit_insert_each(self):
+        for offset in range(1, 6):
+            day = self.today - jdatetime.timedelta(days=offset)
+            self.book(day, day)
+
+        with mock.patch.object(AuditLog.objects, 'bulk_create', wraps=AuditLog.objects.bulk_create) as bulk_create:
+            self.assertEqual(BookingService.complete_ended(self.now, chunk_size=2), 5)
+        self.assertEqual(bulk_create.call_count, 3)
+        self.assertEqual(Booking.objects.filter(status='completed').count(), 5)
+
+    def test_end_is_judged_in_the_booking_time_zone(self):
+        # 09:00 UTC is 12:30 in Tehran
+        now = datetime.datetime(2026, 10, 16, 9, 0, tzinfo=datetime.timezone.utc)
+        ended = self.book(self.today, self.today, datetime.time(11, 0), datetime.time(12, 0), 'hourly')
+        running = self.book(self.today, self.today, datetime.time(12, 0), datetime.time(13, 0), 'hourly')
+
+        self.assertEqual(BookingService.complete_ended(now), 1)
+        self.assertEqual(Booking.objects.get(pk=ended.pk).status, 'completed')
+        self.assertEqual(Booking.objects.get(pk=running.pk).status, 'confirmed')
+
+        # 21:00 UTC is already tomorrow in Tehran, so today's daily booking is over
+        daily = self.book(self.today, self.today, seat=self.other_seat)
+        self.assertEqual(
+            BookingService.complete_ended(datetime.datetime(2026, 10, 16, 21, 0, tzinfo=datetime.timezone.utc)), 2
+        )
+        self.assertEqual(Booking.objects.get(pk=daily.pk).status, 'completed')
+
+
+@override_settings(PENDING_HOLD_TTL=1800)
+class PendingHoldTests(TestCase):
+    def setUp(self):
+        space = Space.objects.create(name="Hold Space", capacity=5)
+        self.seat = Seat.objects.create(space=space, visual_id="HD-1")
+        self.day = jdatetime.date.today() + jdatetime.timedelta(days=1)
+        self.data = {
+            'seat': self.seat,
+            'full_name': "Hold User",
+            'national_id': "0060495219",
+            'mobile': "09123456789",
+            'booking_type': 'hourly',
+            'start_date_jalali': self.day,
+            'end_date_jalali': self.day,
+            'start_time': datetime.time(9, 0),
+            'end_time': datetime.time(10, 0),
+            'duration_hours': 1,
+            'terms_accepted': True,
+        }
+
+    def expire(self, booking):
+        Booking.objects.filter(pk=booking.pk).update(expires_at=timezone.now() - datetime.timedelta(minutes=1))
+
+    def test_pending_booking_carries_expiry_until_confirmed(self):
+        booking = BookingService.create_booking(dict(self.data))
+        remaining = booking.expires_at - timezone.now()
+        self.assertTrue(datetime.timedelta(minutes=29) < remaining <= datetime.timedelta(minutes=30))
+
+        BookingService.bulk_update_status(Booking.objects.filter(pk=booking.pk), 'confirmed')
+        self.assertIsNone(Booking.objects.get(pk=booking.pk).expires_at)
+
+    def test_expired_hold_is_ignored_before_the_sweep(self):
+        hold = BookingService.create_booking(dict(self.data))
+        self.assertFalse(AvailabilityService.is_seat_available(
+            self.seat, self.day, self.day, datetime.time(9, 30), datetime.time(10, 0)
+        ))
+
+        self.expire(hold)
+        self.assertTrue(AvailabilityService.is_seat_available(
+            self.seat, self.day, self.day, datetime.time(9, 30), datetime.time(10, 0)
+        ))
+        self.assertEqual(
+            AvailabilityService.find_free_seat(Seat.objects.all(), self.day, self.day,
+                                               datetime.time(9, 0), datetime.time(10, 0)),
+            self.seat
+        )
+        BookingService.create_booking(dict(self.data))
+
+    def test_insert_releases_overlapping_expired_holds_where_the_database_enforces_overlap(self):
+        hold = BookingService.create_booking(dict(self.data))
+        self.expire(hold)
+        with mock.patch.object(BookingService, 'database_enforces_overlap', return_value=True):
+            BookingService.create_booking(dict(self.data))
+
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, 'cancelled')
+        self.assertEqual(AuditLog.objects.filter(booking=hold, new_status='cancelled').get().notes, "Hold expired")
+
+    def test_insert_leaves_expired_holds_it_does_not_overlap(self):
+        hold = BookingService.create_booking(dict(self.data))
+        self.expire(hold)
+        with mock.patch.object(BookingService, 'database_enforces_overlap', return_value=True):
+            BookingService.create_booking(dict(self.data, start_time=datetime.time(10, 0), end_time=datetime.time(11, 0)))
+
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, 'pending')
+
+    def test_expire_holds_cancels_only_expired_pending_bookings(self):
+        expired = []
+        for hour in range(9, 14):
+            booking = BookingService.create_booking(dict(
+                self.data, start_time=datetime.time(hour, 0), end_time=datetime.time(hour, 30)
+            ))
+            self.expire(booking)
+            expired.append(booking)
+        live = BookingService.create_booking(dict(
+            self.data, start_time=datetime.time(15, 0), end_time=datetime.time(16, 0)
+        ))
+        untimed = BookingService.create_booking(dict(
+            self.data, start_time=datetime.time(17, 0), end_time=datetime.time(18, 0), expires_at=None
+        ))
+
+        self.assertEqual(BookingService.expire_holds(chunk_size=2), 5)
+
+        statuses = dict(Booking.objects.values_list('id', 'status'))
+        self.assertEqual({statuses[b.pk] for b in expired}, {'cancelled'})
+        self.assertEqual(statuses[live.pk], 'pending')
+        self.assertEqual(statuses[untimed.pk], 'pending')
+        self.assertEqual(AuditLog.objects.filter(notes="Hold expired").count(), 5)
+        self.assertEqual(BookingService.expire_holds(), 0)
+
+    @override_settings(SMS_BACKEND='bookings.sms.LocmemSmsBackend')
+    def test_customers_are_told_when_their_hold_expires(self):
+        sms.outbox.clear()
+        emailed = BookingService.create_booking(dict(self.data, email="hold@example.com"))
+        texted = BookingService.create_booking(dict(
+            self.data, start_time=datetime.time(11, 0), end_time=datetime.time(12, 0)
+        ))
+        live = BookingService.create_booking(dict(
+            self.data, start_time=datetime.time(13, 0), end_time=datetime.time(14, 0), email="live@example.com"
+        ))
+        self.expire(emailed)
+        self.expire(texted)
+
+        self.assertEqual(BookingService.expire_holds(), 2)
+        notice = OutboxMessage.objects.get(topic=OutboxService.BOOKING_HOLD_EXPIRED)
+        self.assertEqual(set(notice.payload['booking_ids']), {str(emailed.pk), str(texted.pk)})
+
+        mail.outbox.clear()
+        OutboxService.dispatch_all()
+        released = [message for message in mail.outbox if message.subject == 'Booking Released']
+        self.assertEqual([message.to for message in released], [["hold@example.com"]])
+        self.assertIn("09:00", released[0].body)
+        self.assertEqual([message.to for message in sms.outbox], ["09123456789"])
+        self.assertIn("11:00", sms.outbox[0].body)
+        self.assertEqual(Booking.objects.get(pk=live.pk).status, 'pending')
+
+
+class DefaultHoldTests(TestCase):
+    """
+    Hold expiry is opt-in: without PENDING_HOLD_TTL pending bookings keep
+    their seat until staff act on them.
+    """
+    def test_pending_bookings_never_expire_by_default(self):
+        space = Space.objects.create(name="Default Hold Space", capacity=1)
+        seat = Seat.objects.create(space=space, visual_id="DH-1")
+        day = jdatetime.date.today() + jdatetime.timedelta(days=1)
+        booking = BookingService.create_booking({
+            'seat': seat, 'full_name': "Hold User", 'national_id': "0060495219", 'mobile': "09123456789",
+            'booking_type': 'daily', 'start_date_jalali': day, 'end_date_jalali': day, 'terms_accepted': True,
+        })
+        self.assertEqual(booking.status, 'pending')
+        self.assertIsNone(booking.expires_at)
+
+        self.assertEqual(BookingService.expire_holds(timezone.now() + datetime.timedelta(days=365)), 0)
+        self.assertEqual(Booking.objects.get(pk=booking.pk).status, 'pending')
+        self.assertFalse(AvailabilityService.is_seat_available(seat, day, day))
+        self.assertFalse(OutboxMessage.objects.filter(topic=OutboxService.BOOKING_HOLD_EXPIRED).exists())
+
@@ -1,9 +1,22 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.core import mail
-from bookings.models import Space, Booking
-from bookings.tasks import send_booking_confirmation_email
+from django.core.exceptions import ValidationError
+from django.core.mail.backends import locmem
+from django.utils import timezone
+from unittest import mock, skipUnless
+from bookings.models import Space, Seat, Booking, OutboxMessage
+from bookings.services import BookingService, OutboxService
+from bookings import sms
+from bookings.tasks import (
+    send_booking_confirmation_email, send_booking_confirmation_emails, send_pending_confirmations,
+    send_booking_reminders
+)
 import jdatetime
 import datetime
+import smtplib
+import zoneinfo
 
 class TaskTests(TestCase):
     def setUp(self):
@@ -12,13 +25,15 @@ class TaskTests(TestCase):
             capacity=5,
             hourly_rate=100.00
         )
+        self.seat = Seat.objects.create(space=self.space, visual_id="TS-1")
         self.booking = Booking.objects.create(
-            space=self.space,
+            seat=self.seat,
             full_name="Email User",
             national_id="0060495219",
             mobile="09123456789",
             email="user@example.com",
-            booking_date_jalali=jdatetime.date.today(),
+            start_date_jalali=jdatetime.date.today(),
+            end_date_jalali=jdatetime.date.today(),
             start_time=datetime.time(10, 0),
             end_time=datetime.time(11, 0),
             duration_hours=1,
@@ -38,3 +53,272 @@ class TaskTests(TestCase):
         self.assertEqual(mail.outbox[0].to, ['user@example.com'])
         self.assertIn("is confirmed", mail.outbox[0].body)
         # Note: send_mail puts message in body. html_message in alternatives.
+
+    def test_send_email_task_does_not_send_twice(self):
+        send_booking_confirmation_email(self.booking.id)
+        self.booking.refresh_from_db()
+        self.assertIsNotNone(self.booking.confirmation_sent_at)
+
+        result = send_booking_confirmation_email(self.booking.id)
+        self.assertEqual(result, f"No pending confirmation for booking {self.booking.id}.")
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class FlakyEmailBackend(locmem.EmailBackend):
+    """
+    locmem backend that counts opened sessions and rejects @invalid.test addresses.
+    """
+    opened = 0
+
+    def open(self):
+        FlakyEmailBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        if any(address.endswith('@invalid.test') for message in messages for address in message.to):
+            raise smtplib.SMTPRecipientsRefused({})
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='bookings.tests.test_tasks.FlakyEmailBackend')
+class ConfirmationBatchTests(TestCase):
+    def setUp(self):
+        FlakyEmailBackend.opened = 0
+        space = Space.objects.create(name="Mail Space", capacity=50)
+        self.seat = Seat.objects.create(space=space, visual_id="ML-1")
+        today = jdatetime.date.today()
+        self.bookings = [
+            Booking.objects.create(
+                seat=self.seat, full_name=f"User {index}", national_id="0060495219", mobile="09123456789",
+                email="bounce@invalid.test" if index == 3 else f"user{index}@example.com",
+                booking_type='daily',
+                start_date_jalali=today + jdatetime.timedelta(days=index),
+                end_date_jalali=today + jdatetime.timedelta(days=index),
+            )
+            for index in range(6)
+        ]
+        Booking.objects.update(created_at=timezone.now() - datetime.timedelta(hours=1))
+
+    def test_drain_uses_one_session_per_batch_and_records_outcomes(self):
+        result = send_pending_confirmations(batch_size=10)
+
+        self.assertEqual(result, "Sent 5 confirmations, 1 failed.")
+        self.assertEqual(FlakyEmailBackend.opened, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+
+        bounced = Booking.objects.get(email="bounce@invalid.test")
+        self.assertIsNone(bounced.confirmation_sent_at)
+        self.assertEqual(bounced.confirmation_attempts, 1)
+        self.assertTrue(bounced.confirmation_error)
+        self.assertEqual(Booking.objects.filter(confirmation_sent_at__isnull=False).count(), 5)
+
+        # Already sent confirmations are not sent again
+        send_pending_confirmations(batch_size=10)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(Booking.objects.get(pk=bounced.pk).confirmation_attempts, 2)
+
+    def test_drain_in_several_batches(self):
+        send_pending_confirmations(batch_size=2)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(FlakyEmailBackend.opened, 3)
+
+    def test_recent_bookings_are_left_to_the_outbox(self):
+        Booking.objects.filter(pk=self.bookings[0].pk).update(created_at=timezone.now())
+        send_pending_confirmations(batch_size=10)
+        self.assertIsNone(Booking.objects.get(pk=self.bookings[0].pk).confirmation_sent_at)
+
+    def test_batch_for_ids(self):
+        ids = [booking.pk for booking in self.bookings[:2]]
+        self.assertEqual(send_booking_confirmation_emails(ids), "Processed 2 bookings: 2 sent, 0 failed.")
+        self.assertEqual(FlakyEmailBackend.opened, 1)
+
+    @skipUnless(connection.features.has_select_for_update_skip_locked, "needs SKIP LOCKED")
+    def test_batch_for_ids_claims_rows_like_the_drain(self):
+        ids = [booking.pk for booking in self.bookings[:2]]
+        with CaptureQueriesContext(connection) as queries:
+            send_booking_confirmation_emails(ids)
+        claim = next(query['sql'] for query in queries.captured_queries if 'FOR UPDATE' in query['sql'])
+        self.assertIn('SKIP LOCKED', claim)
+
+        # Sent rows drop out of both claims
+        self.assertEqual(send_booking_confirmation_emails(ids), "Processed 2 bookings: 0 sent, 0 failed.")
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        space = Space.objects.create(name="Outbox Space", capacity=5)
+        self.seat = Seat.objects.create(space=space, visual_id="OB-1")
+        self.data = {
+            'seat': self.seat,
+            'full_name': "Outbox User",
+            'national_id': "0060495219",
+            'mobile': "09123456789",
+            'email': "outbox@example.com",
+            'booking_type': 'daily',
+            'start_date_jalali': jdatetime.date.today(),
+            'end_date_jalali': jdatetime.date.today(),
+            'terms_accepted': True,
+        }
+
+    def test_booking_writes_message_instead_of_sending(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = BookingService.create_booking(dict(self.data))
+
+        self.assertEqual(len(mail.outbox), 0)
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.topic, OutboxService.BOOKING_CONFIRMATION)
+        self.assertEqual(message.payload, {'booking_ids': [str(booking.pk)]})
+
+        self.assertEqual(OutboxService.dispatch_all(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'done')
+        self.assertIsNotNone(message.dispatched_at)
+        self.assertIsNotNone(Booking.objects.get(pk=booking.pk).confirmation_sent_at)
+
+        # Nothing left to deliver
+        self.assertEqual(OutboxService.dispatch_all(), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failed_booking_leaves_no_message(self):
+        BookingService.create_booking(dict(self.data))
+        with self.assertRaises(ValidationError):
+            BookingService.create_booking(dict(self.data))
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+    def test_handler_errors_back_off_then_fail(self):
+        BookingService.create_booking(dict(self.data))
+        failing = {OutboxService.BOOKING_CONFIRMATION: mock.Mock(side_effect=RuntimeError("broker down"))}
+
+        with mock.patch.object(OutboxService, 'handlers', return_value=failing), \
+                self.assertLogs('bookings.services', level='WARNING'):
+            self.assertEqual(OutboxService.dispatch_all(), 1)
+            message = OutboxMessage.objects.get()
+            self.assertEqual(message.status, 'pending')
+            self.assertEqual(message.attempts, 1)
+            self.assertEqual(message.last_error, "broker down")
+            self.assertGreater(message.available_at, timezone.now() + datetime.timedelta(seconds=20))
+
+            # Not due yet
+            self.assertEqual(OutboxService.dispatch_all(), 0)
+
+            OutboxMessage.objects.update(
+                attempts=OutboxService.MAX_ATTEMPTS - 1, available_at=timezone.now()
+            )
+            OutboxService.dispatch_all()
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'failed')
+        self.assertEqual(len(mail.outbox), 0)
+
+
+class FailingSmsBackend(sms.BaseSmsBackend):
+    def send_messages(self, messages):
+        raise ConnectionError("gateway unavailable")
+
+
+@override_settings(
+    REMINDER_CHANNELS=['email', 'sms'], SMS_BACKEND='bookings.sms.LocmemSmsBackend',
+    REMINDER_HOURS_BEFORE=2, REMINDER_EVENING_HOUR=18,
+    TIME_ZONE='UTC', BOOKING_TIME_ZONE='Asia/Tehran',
+)
+class ReminderTests(TestCase):
+    def setUp(self):
+        sms.outbox.clear()
+        space = Space.objects.create(name="Reminder Space", capacity=5)
+        self.seat = Seat.objects.create(space=space, visual_id="RM-1")
+        self.now = datetime.datetime(2026, 10, 16, 10, 0, tzinfo=zoneinfo.ZoneInfo('Asia/Tehran'))
+        self.today = jdatetime.date.fromgregorian(date=self.now.date())
+
+    def book(self, day, start=None, end=None, booking_type='hourly', **extra):
+        return Booking.objects.create(
+            seat=self.seat, full_name="Reminder User", national_id="0060495219", mobile="09123456789",
+            email="reminder@example.com", booking_type=booking_type,
+            start_date_jalali=day, end_date_jalali=day, start_time=start, end_time=end, **extra
+        )
+
+    def run_at(self, now, **kwargs):
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            return send_booking_reminders(**kwargs)
+
+    def test_only_due_bookings_are_reminded(self):
+        tomorrow = self.today + jdatetime.timedelta(days=1)
+        soon = self.book(self.today, datetime.time(11, 0), datetime.time(12, 0))
+        later = self.book(self.today, datetime.time(13, 0), datetime.time(14, 0))
+        started = self.book(self.today, datetime.time(9, 30), datetime.time(10, 30))
+        self.book(self.today, datetime.time(11, 30), datetime.time(12, 0), status='cancelled')
+        daily = self.book(tomorrow, booking_type='daily')
+
+        self.assertEqual(self.run_at(self.now), "Sent 1 reminders, 0 failed.")
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("at 11:00", mail.outbox[0].body)
+        self.assertEqual([message.to for message in sms.outbox], ["09123456789"])
+        self.assertIsNotNone(Booking.objects.get(pk=soon.pk).reminder_sent_at)
+        self.assertIsNone(Booking.objects.get(pk=later.pk).reminder_sent_at)
+        self.assertIsNone(Booking.objects.get(pk=started.pk).reminder_sent_at)
+
+        # The evening before, daily bookings for tomorrow are due as well
+        self.assertEqual(self.run_at(self.now.replace(hour=18, minute=5)), "Sent 1 reminders, 0 failed.")
+        self.assertIsNotNone(Booking.objects.get(pk=daily.pk).reminder_sent_at)
+        self.assertIsNone(Booking.objects.get(pk=later.pk).reminder_sent_at)
+
+    def test_due_window_follows_the_booking_time_zone(self):
+        # 08:00 UTC is 11:30 in Tehran: a 12:00 booking there is half an hour away
+        now = datetime.datetime(2026, 10, 16, 8, 0, tzinfo=datetime.timezone.utc)
+        due = self.book(self.today, datetime.time(12, 0), datetime.time(13, 0))
+        started = self.book(self.today, datetime.time(9, 0), datetime.time(10, 0))
+
+        self.assertEqual(self.run_at(now), "Sent 1 reminders, 0 failed.")
+        self.assertIsNotNone(Booking.objects.get(pk=due.pk).reminder_sent_at)
+        self.assertIsNone(Booking.objects.get(pk=started.pk).reminder_sent_at)
+
+    def test_evening_follows_the_booking_time_zone(self):
+        # 15:00 UTC is 18:30 in Tehran, past REMINDER_EVENING_HOUR
+        daily = self.book(self.today + jdatetime.timedelta(days=1), booking_type='daily')
+        self.assertEqual(
+            self.run_at(datetime.datetime(2026, 10, 16, 15, 0, tzinfo=datetime.timezone.utc)),
+            "Sent 1 reminders, 0 failed."
+        )
+        self.assertIsNotNone(Booking.objects.get(pk=daily.pk).reminder_sent_at)
+
+    def test_day_boundary_follows_the_booking_time_zone(self):
+        # 21:00 UTC is already 00:30 tomorrow in Tehran
+        early = self.book(self.today + jdatetime.timedelta(days=1), datetime.time(1, 0), datetime.time(2, 0))
+        self.assertEqual(
+            self.run_at(datetime.datetime(2026, 10, 16, 21, 0, tzinfo=datetime.timezone.utc)),
+            "Sent 1 reminders, 0 failed."
+        )
+        self.assertIsNotNone(Booking.objects.get(pk=early.pk).reminder_sent_at)
+
+    def test_reminders_are_sent_once(self):
+        self.book(self.today, datetime.time(11, 0), datetime.time(12, 0))
+        self.run_at(self.now)
+        self.run_at(self.now + datetime.timedelta(minutes=5))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(len(sms.outbox), 1)
+
+    def test_chunks(self):
+        for minute in range(0, 50, 10):
+            self.book(self.today, datetime.time(11, minute), datetime.time(11, minute + 5))
+        self.assertEqual(self.run_at(self.now, batch_size=2), "Sent 5 reminders, 0 failed.")
+        self.assertEqual(len(mail.outbox), 5)
+
+    @override_settings(SMS_BACKEND='bookings.tests.test_tasks.FailingSmsBackend')
+    def test_one_channel_reaching_the_member_is_enough(self):
+        booking = self.book(self.today, datetime.time(11, 0), datetime.time(12, 0))
+        with self.assertLogs('bookings.reminders', level='WARNING'):
+            self.assertEqual(self.run_at(self.now), "Sent 1 reminders, 0 failed.")
+        self.assertIsNotNone(Booking.objects.get(pk=booking.pk).reminder_sent_at)
+
+    @override_settings(REMINDER_CHANNELS=['sms'], SMS_BACKEND='bookings.tests.test_tasks.FailingSmsBackend')
+    def test_undelivered_reminders_are_retried_next_run(self):
+        booking = self.book(self.today, datetime.time(11, 0), datetime.time(12, 0))
+        with self.assertLogs('bookings.reminders', level='WARNING'):
+            self.assertEqual(self.run_at(self.now), "Sent 0 reminders, 1 failed.")
+        self.assertIsNone(Booking.objects.get(pk=booking.pk).reminder_sent_at)
+        self.assertEqual(Booking.objects.get(pk=booking.pk).reminder_attempts, 1)
+
+        with override_settings(SMS_BACKEND='bookings.sms.LocmemSmsBackend'):
+            self.assertEqual(self.run_at(self.now), "Sent 1 reminders, 0 failed.")
+        self.assertEqual(len(sms.outbox), 1)
+
@@ -1,11 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SpaceViewSet, BookingViewSet, SeatViewSet
+from .views import (
+    SpaceViewSet, BookingViewSet, SeatViewSet, BookingSeriesViewSet,
+    BackOfficeBookingViewSet, BackOfficeAuditLogViewSet, BackOfficeArchivedBookingViewSet
+)
 
 router = DefaultRouter()
 router.register(r'spaces', SpaceViewSet)
 router.register(r'bookings', BookingViewSet)
 router.register(r'seats', SeatViewSet, basename='seats')
+router.register(r'series', BookingSeriesViewSet)
+router.register(r'backoffice/bookings', BackOfficeBookingViewSet, basename='backoffice-bookings')
+router.register(r'backoffice/audit-logs', BackOfficeAuditLogViewSet, basename='backoffice-audit-logs')
+router.register(r'backoffice/archived-bookings', BackOfficeArchivedBookingViewSet, basename='backoffice-archived-bookings')
 
 urlpatterns = [
     path('', include(router.urls)),
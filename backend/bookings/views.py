@@ -1,11 +1,34 @@
 from rest_framework import viewsets, mixins, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from django.db.models import Exists, OuterRef, Q
-from .models import Space, Booking, Availability, Seat
-from .serializers import SpaceSerializer, BookingSerializer, AvailabilitySerializer, SeatSerializer
-from .services import AvailabilityService
-import jdatetime
+from .models import Space, Booking, BookingSeries, Availability, AuditLog, Seat, ArchivedBooking
+from django.core.exceptions import ValidationError as DjangoValidationError
+from .serializers import (
+    SpaceSerializer, BookingSerializer, AvailabilitySerializer, SeatSerializer, BulkBookingSerializer,
+    BookingSeriesSerializer, AutoAssignBookingSerializer, AuditLogSerializer, MemberBookingSerializer,
+    ArchivedBookingSerializer, FreeSeatQuerySerializer
+)
+from .services import AvailabilityService, BookingService
+from . import archive
+from . import catalog
+from . import jalali
+from .pagination import (
+    BookingCursorPagination, AuditLogCursorPagination, MemberUpcomingCursorPagination, MemberPastCursorPagination
+)
+import uuid
+
+# Upper bound for the seats x days availability grid
+MAX_AVAILABILITY_DAYS = 62
+
+def _parse_jalali_date(value):
+    """
+    Parses a 'YYYY-MM-DD' Jalali date string. Raises ValueError on bad input.
+    """
+    if not value:
+        raise ValueError("Missing date.")
+    return jalali.parse_date(value)
 
 class SpaceViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -16,6 +39,17 @@ class SpaceViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['name', 'description']
     filterset_fields = ['type', 'capacity']
 
+    def is_catalog_request(self, request):
+        return True
+
+    @catalog.conditional
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @catalog.conditional
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 class SeatViewSet(viewsets.ReadOnlyModelViewSet):
     """
     List seats with status for a specific date.
@@ -26,6 +60,15 @@ class SeatViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         return Seat.objects.filter(is_active=True)
 
+    def is_catalog_request(self, request):
+        # Seat status for a date depends on bookings, not just the catalog
+        return not request.query_params.get('date')
+
+    @catalog.conditional
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @catalog.conditional
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
         serializer = self.get_serializer(queryset, many=True)
@@ -34,42 +77,94 @@ class SeatViewSet(viewsets.ReadOnlyModelViewSet):
         date_str = self.request.query_params.get('date')
         if date_str:
             try:
-                year, month, day = map(int, date_str.split('-'))
-                query_date = jdatetime.date(year, month, day)
-                
-                # Fetch bookings overlapping with this date
-                active_bookings = Booking.objects.filter(
-                    status__in=['pending', 'confirmed'],
-                    start_date_jalali__lte=query_date,
-                    end_date_jalali__gte=query_date
-                ).select_related('seat')
-                
-                # Map seat_id to booking
-                booking_map = {}
-                for b in active_bookings:
-                    # If multiple bookings (e.g. hourly), we might have issues.
-                    # For now, take the last one or just mark as booked.
-                    booking_map[str(b.seat.id)] = b
-                
-                for seat_data in data:
-                    seat_id = seat_data['id']
-                    booking = booking_map.get(seat_id)
-                    
-                    if booking:
-                        seat_data['status'] = 'booked'
-                        seat_data['booked_until'] = str(booking.end_date_jalali)
-                        # Add more details if needed for authenticated users
-                    else:
-                        seat_data['status'] = 'available'
-                        
+                query_date = _parse_jalali_date(date_str)
             except ValueError:
-                pass
+                return Response(data)
+
+            # Status and every busy interval per seat, cached per (space, date)
+            space_ids = list({seat_data['space'] for seat_data in data})
+            statuses = AvailabilityService.seat_statuses_for_date(space_ids, query_date)
+
+            for seat_data in data:
+                seat_data.update(statuses.get(seat_data['id'], {'status': 'available', 'busy': []}))
         else:
              for seat_data in data:
                 seat_data['status'] = 'available'
 
         return Response(data)
 
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        """
+        Seats x days status grid: ?space=<id>&from=YYYY-MM-DD&to=YYYY-MM-DD (Jalali).
+        Each seat gets one code per day: A (available), P (partially booked), B (booked).
+        """
+        try:
+            start_date = _parse_jalali_date(request.query_params.get('from'))
+            end_date = _parse_jalali_date(request.query_params.get('to'))
+        except ValueError:
+            return Response(
+                {"detail": "'from' and 'to' must be Jalali dates in YYYY-MM-DD format."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        day_count = jalali.days_between(start_date, end_date) + 1
+        if day_count < 1:
+            return Response({"detail": "'to' must be on or after 'from'."}, status=status.HTTP_400_BAD_REQUEST)
+        if day_count > MAX_AVAILABILITY_DAYS:
+            return Response(
+                {"detail": f"Date range cannot exceed {MAX_AVAILABILITY_DAYS} days."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Filter by space directly instead of through the filterset, which would
+        # spend an extra query validating the space id.
+        seats = self.get_queryset()
+        space_id = request.query_params.get('space')
+        if space_id:
+            try:
+                seats = seats.filter(space_id=uuid.UUID(space_id))
+            except ValueError:
+                return Response({"detail": "'space' must be a valid id."}, status=status.HTTP_400_BAD_REQUEST)
+
+        seats = list(seats.order_by('visual_id').values('id', 'visual_id'))
+        matrix = AvailabilityService.seat_day_matrix([seat['id'] for seat in seats], start_date, end_date)
+
+        return Response({
+            'from': str(start_date),
+            'to': str(end_date),
+            'legend': {
+                AvailabilityService.DAY_AVAILABLE: 'available',
+                AvailabilityService.DAY_PARTIAL: 'partial',
+                AvailabilityService.DAY_BOOKED: 'booked',
+            },
+            'seats': [
+                {'id': seat['id'], 'visual_id': seat['visual_id'], 'days': matrix[seat['id']]}
+                for seat in seats
+            ],
+        })
+
+    @action(detail=False, methods=['get'])
+    def free(self, request):
+        """
+        First free seat for ?space=<id> or ?type=<space type>, plus booking_type
+        (default hourly), date, optional end_date and, for hourly, start/end
+        times (HH:MM). Answered with a single query.
+        """
+        serializer = FreeSeatQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        query = serializer.validated_data
+
+        seats = AvailabilityService.bookable_seats(
+            query['booking_type'], space_id=query.get('space'), space_type=query.get('type')
+        )
+        seat = AvailabilityService.find_free_seat(
+            seats, query['date'], query['end_date'], query['start_time'], query['end_time']
+        )
+        if seat is None:
+            return Response({"detail": "No seat is available for the requested time."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(SeatSerializer(seat).data)
+
 class BookingViewSet(mixins.CreateModelMixin,
                      mixins.RetrieveModelMixin,
                      viewsets.GenericViewSet):
@@ -78,3 +173,132 @@ class BookingViewSet(mixins.CreateModelMixin,
     """
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def mine(self, request):
+        """
+        The signed-in member's bookings: ?when=upcoming (default) or ?when=past.
+        One query per page, however long the history is.
+        """
+        when = request.query_params.get('when', 'upcoming')
+        if when not in ('upcoming', 'past'):
+            return Response({"detail": "'when' must be 'upcoming' or 'past'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = MemberPastCursorPagination() if when == 'past' else MemberUpcomingCursorPagination()
+        page = paginator.paginate_queryset(BookingService.member_history(request.user, when), request, view=self)
+        return paginator.get_paginated_response(MemberBookingSerializer(page, many=True).data)
+
+    @action(detail=False, methods=['post'], url_path='auto-assign', serializer_class=AutoAssignBookingSerializer)
+    def auto_assign(self, request):
+        """
+        Book any free seat: the booking fields without 'seat', plus 'space' or 'space_type'.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Create many bookings at once: {"bookings": [...], "mode": "all_or_nothing" | "partial"}.
+        """
+        envelope = BulkBookingSerializer(data=request.data)
+        envelope.is_valid(raise_exception=True)
+        items = envelope.validated_data['bookings']
+        all_or_nothing = envelope.validated_data['mode'] == 'all_or_nothing'
+
+        # Resolve every referenced seat with one query
+        seat_ids = set()
+        for item in items:
+            try:
+                seat_ids.add(uuid.UUID(str(item.get('seat'))))
+            except ValueError:
+                pass
+        context = self.get_serializer_context()
+        context['seats'] = Seat.objects.select_related('space').in_bulk(seat_ids)
+
+        rejected = []
+        valid = []
+        for index, item in enumerate(items):
+            serializer = BookingSerializer(data=item, context=context)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                rejected.append({'index': index, 'code': 'invalid', 'errors': serializer.errors})
+
+        created = []
+        if valid and not (rejected and all_or_nothing):
+            try:
+                created, conflicts = BookingService.create_bookings_bulk(valid, all_or_nothing=all_or_nothing)
+            except DjangoValidationError as e:
+                return Response({'detail': e.messages[0], 'code': e.code}, status=status.HTTP_400_BAD_REQUEST)
+            rejected.extend(
+                {'index': index, 'code': error.code, 'detail': error.messages[0]}
+                for index, error in conflicts.items()
+            )
+
+        rejected.sort(key=lambda entry: entry['index'])
+        if not created:
+            return Response({'created': [], 'rejected': rejected}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'created': BookingSerializer(created, many=True, context=context).data,
+            'rejected': rejected,
+        }, status=status.HTTP_201_CREATED)
+
+class BookingSeriesViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Create recurring bookings and retrieve them with their stored occurrences.
+    """
+    queryset = BookingSeries.objects.select_related('seat')
+    serializer_class = BookingSeriesSerializer
+
+    @action(detail=True, methods=['get'])
+    def occurrences(self, request, pk=None):
+        """
+        Materialized occurrences of the series, in date order.
+        """
+        series = self.get_object()
+        bookings = series.occurrences.select_related('seat').order_by('start_date_jalali')
+        return Response(BookingSerializer(bookings, many=True, context=self.get_serializer_context()).data)
+
+
+class BackOfficeBookingViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Staff listing of all bookings, newest first, with cursor pagination.
+    """
+    queryset = Booking.objects.select_related('seat')
+    serializer_class = BookingSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = BookingCursorPagination
+    filterset_fields = ['status', 'booking_type', 'seat', 'seat__space']
+
+
+class BackOfficeAuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Staff listing of the audit trail, newest first, with cursor pagination.
+    """
+    queryset = AuditLog.objects.all()
+    serializer_class = AuditLogSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = AuditLogCursorPagination
+    filterset_fields = ['booking', 'action']
+
+
+class BackOfficeArchivedBookingViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Staff lookup of an archived booking by its id, with the record read back
+    from the archive file.
+    """
+    queryset = ArchivedBooking.objects.all()
+    serializer_class = ArchivedBookingSerializer
+    permission_classes = [IsAdminUser]
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except archive.ArchiveFileMissing as e:
+            return Response({"detail": str(e)}, status=status.HTTP_404_NOT_FOUND)
+
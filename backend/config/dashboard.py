@@ -1,22 +1,40 @@
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from bookings.models import Booking, Space
+from bookings.services import RevenueService, StatsService
+import jdatetime
+
+# Months (current one included) shown in the revenue breakdown table
+REVENUE_BREAKDOWN_MONTHS = 3
+
+
+def breakdown_start(months=REVENUE_BREAKDOWN_MONTHS):
+    """
+    First day of the Jalali month months - 1 before the current one.
+    """
+    today = jdatetime.date.today()
+    year, month = divmod(today.year * 12 + today.month - 1 - (months - 1), 12)
+    return jdatetime.date(year, month + 1, 1)
 
 def dashboard_callback(request, context):
     """
     Callback to provide custom dashboard widgets for Unfold.
     """
-    # Simple stats
-    total_bookings = Booking.objects.count()
-    confirmed_bookings = Booking.objects.filter(status='confirmed').count()
+    # Booking KPIs come from the DailyStats rollup (refreshed by a periodic task)
+    stats = StatsService.totals()
+    if stats['refreshed_at'] is not None:
+        total_bookings = stats['pending'] + stats['confirmed'] + stats['cancelled'] + stats['completed']
+        confirmed_bookings = stats['confirmed']
+        revenue = stats['revenue']
+    else:
+        # Rollup not built yet: aggregate live
+        total_bookings = Booking.objects.count()
+        confirmed_bookings = Booking.objects.filter(status='confirmed').count()
+        revenue = RevenueService.total()
+
     active_spaces = Space.objects.filter(is_active=True).count()
-    
-    # Calculate simple revenue (sum of hourly_rate * duration_hours for confirmed bookings)
-    # Note: precise calculation should be done in DB, this is just a quick estimate for dashboard
-    revenue = 0
-    confirmed_objs = Booking.objects.filter(status='confirmed').select_related('space')
-    for b in confirmed_objs:
-        revenue += b.space.hourly_rate * b.duration_hours
+
+    breakdown = RevenueService.breakdown(Booking.objects.filter(start_date_jalali__gte=breakdown_start()))
 
     context.update({
         "navigation": [
@@ -39,5 +57,12 @@ def dashboard_callback(request, context):
                 "metric": active_spaces,
             },
         ],
+        "revenue_breakdown": {
+            "headers": [_("Month"), _("Space"), _("Booking type"), _("Revenue")],
+            "rows": [
+                [row["month"], row["space_name"], row["booking_type"], f"${row['revenue']:,.2f}"]
+                for row in breakdown
+            ],
+        },
     })
     return context
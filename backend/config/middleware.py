@@ -0,0 +1,128 @@
+"""
+Request instrumentation.
+
+RequestMetricsMiddleware feeds the Prometheus request latency histogram (see
+bookings.metrics) and is always on. QueryInstrumentationMiddleware is opt-in
+(settings.SQL_INSTRUMENTATION).
+
+With the query instrumentation on, every query of the request runs through a
+connection.execute_wrapper that counts it and times it. The totals go out as a Server-Timing header, which
+browser devtools show next to the request, and as one log line per request
+tagged with the view (the DRF viewset and action where there is one), so
+N+1 regressions show up as a jump in the query count of a single view.
+"""
+import logging
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from bookings.metrics import REQUEST_LATENCY
+
+logger = logging.getLogger(__name__)
+
+# Longest slowest-statement text kept in the log line
+MAX_SQL_LENGTH = 300
+
+
+class QueryStats:
+    """
+    connection.execute_wrapper that adds up the queries it sees.
+    """
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = ''
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if elapsed >= self.slowest:
+                self.slowest = elapsed
+                self.slowest_sql = sql
+
+
+def view_name(request, view_func):
+    """
+    'SeatViewSet.list' for DRF viewsets, 'ClassName.get' for other class based
+    views, the URL name (e.g. 'admin:bookings_booking_changelist') otherwise.
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if view_class is None:
+        match = request.resolver_match
+        return match.view_name if match else view_func.__qualname__
+    # Viewsets map HTTP methods to actions, e.g. {'get': 'list', 'post': 'create'}
+    actions = getattr(view_func, 'actions', None) or {}
+    method = request.method.lower()
+    return f"{view_class.__name__}.{actions.get(method, method)}"
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.warn_queries = settings.SQL_INSTRUMENTATION_WARN_QUERIES
+
+    def __call__(self, request):
+        stats = QueryStats()
+        request._query_view = None
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        response['Server-Timing'] = ', '.join([
+            f'db;desc="{stats.count} queries";dur={stats.duration * 1000:.1f}',
+            f'db-slowest;dur={stats.slowest * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        view = request._query_view or '-'
+        level = logging.WARNING if stats.count > self.warn_queries else logging.INFO
+        logger.log(
+            level,
+            "view=%s method=%s path=%s status=%s queries=%d sql_ms=%.1f slowest_ms=%.1f total_ms=%.1f slowest_sql=%r",
+            view, request.method, request.path, response.status_code, stats.count,
+            stats.duration * 1000, stats.slowest * 1000, total * 1000, stats.slowest_sql[:MAX_SQL_LENGTH],
+            extra={
+                'view': view,
+                'queries': stats.count,
+                'sql_ms': round(stats.duration * 1000, 1),
+                'slowest_ms': round(stats.slowest * 1000, 1),
+                'slowest_sql': stats.slowest_sql[:MAX_SQL_LENGTH],
+                'total_ms': round(total * 1000, 1),
+            }
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_view = view_name(request, view_func)
+
+
+class RequestMetricsMiddleware:
+    """
+    Observes every request's latency in the Prometheus request histogram,
+    labelled with the same view name as the instrumentation log line.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._metrics_view = None
+        started = time.perf_counter()
+        response = self.get_response(request)
+        REQUEST_LATENCY.labels(
+            view=request._metrics_view or 'unmatched',
+            method=request.method,
+            status=f"{response.status_code // 100}xx",
+        ).observe(time.perf_counter() - started)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view = view_name(request, view_func)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -81,6 +82,7 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    'config.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Add CorsMiddleware
@@ -91,6 +93,14 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request query count and SQL time as Server-Timing headers and a log line
+# (see config.middleware). Opt-in; first so it also sees middleware queries.
+SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '') == '1'
+# Requests running more queries than this are logged as warnings
+SQL_INSTRUMENTATION_WARN_QUERIES = 50
+if SQL_INSTRUMENTATION:
+    MIDDLEWARE.insert(0, 'config.middleware.QueryInstrumentationMiddleware')
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
     "http://127.0.0.1:5173",
@@ -127,6 +137,17 @@ DATABASES = {
     }
 }
 
+# PostgreSQL (docker-compose). Enables the booking overlap exclusion constraint.
+if os.environ.get('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['POSTGRES_DB'],
+        'USER': os.environ.get('POSTGRES_USER', 'coworking'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -158,6 +179,11 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Wall clock that booking dates and times are entered in. Timestamps stay in
+# UTC; jobs that compare bookings against the current time (reminders,
+# completion) convert to this zone first.
+BOOKING_TIME_ZONE = os.environ.get('BOOKING_TIME_ZONE', 'Asia/Tehran')
+
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
@@ -173,7 +199,94 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'dispatch-outbox': {
+        'task': 'bookings.tasks.dispatch_outbox',
+        'schedule': 5.0,
+    },
+    'refresh-daily-stats': {
+        'task': 'bookings.tasks.refresh_daily_stats',
+        'schedule': 300.0,
+    },
+    'send-pending-confirmations': {
+        'task': 'bookings.tasks.send_pending_confirmations',
+        'schedule': 60.0,
+    },
+    'send-booking-reminders': {
+        'task': 'bookings.tasks.send_booking_reminders',
+        'schedule': 300.0,
+    },
+    'expire-pending-holds': {
+        'task': 'bookings.tasks.expire_pending_holds',
+        'schedule': 60.0,
+    },
+    'complete-ended-bookings': {
+        'task': 'bookings.tasks.complete_ended_bookings',
+        'schedule': 600.0,
+    },
+    'archive-finished-bookings': {
+        'task': 'bookings.tasks.archive_finished_bookings',
+        'schedule': 86400.0,
+    },
+    'materialize-booking-series': {
+        'task': 'bookings.tasks.materialize_booking_series',
+        'schedule': 3600.0,
+    },
+}
+
+# Cache (Redis in deployments, e.g. redis://localhost:6379/1 with
+# docker-compose; per-process memory otherwise)
+REDIS_CACHE_URL = os.environ.get('REDIS_CACHE_URL', '')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# The availability cache (bookings.cache) needs a cache every worker shares:
+# with per-process memory one worker's invalidations never reach the others,
+# which would keep showing just-booked seats as free. Off without Redis.
+AVAILABILITY_CACHE_ENABLED = bool(REDIS_CACHE_URL)
+# Seconds a cached (space, date) seat status may live; writes invalidate it earlier
+AVAILABILITY_CACHE_TIMEOUT = 300
+
+# The catalog stamp (bookings.catalog) is cached under the same condition, so
+# a matching conditional GET is answered without a query. Seconds it may live;
+# catalog writes replace it on commit.
+CATALOG_CACHE_ENABLED = bool(REDIS_CACHE_URL)
+CATALOG_CACHE_TIMEOUT = 300
+
+# Seconds a pending (unconfirmed) booking holds its seat before it expires and
+# its customer is told the seat was released. Opt-in: the default 0 keeps
+# pending bookings until staff confirm or cancel them. Confirming a booking
+# clears its expiry.
+PENDING_HOLD_TTL = int(os.environ.get('PENDING_HOLD_TTL', 0))
+
+# Finished bookings older than this many days move to compressed files under
+# ARCHIVE_ROOT (see bookings.archive)
+BOOKING_RETENTION_DAYS = 365
+ARCHIVE_ROOT = os.environ.get('ARCHIVE_ROOT', BASE_DIR / 'archive')
+
+# Prometheus scrapes of /metrics must send this as a bearer token. Empty (the
+# default) closes the endpoint, so metrics are never public by accident.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
 
 # Email Configuration (Console for development)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
-EMAIL_HOST_USER = 'support@coworking.com'
\ No newline at end of file
+EMAIL_HOST_USER = 'support@coworking.com'
+
+# SMS (see bookings.sms); swap in a provider backend in deployments
+SMS_BACKEND = 'bookings.sms.ConsoleSmsBackend'
+
+# Booking reminders (see bookings.reminders)
+REMINDER_CHANNELS = ['email']
+REMINDER_HOURS_BEFORE = 2
+REMINDER_EVENING_HOUR = 18
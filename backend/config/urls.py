@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.authtoken.views import obtain_auth_token
+from bookings.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/v1/', include('bookings.urls')),
     path('api/v1/auth/', include('users.urls')), # Registration
     path('api-auth/', include('rest_framework.urls')), # For Browsable API login
@@ -0,0 +1,23 @@
+# Gunicorn settings for running the API with several worker processes.
+# Each worker writes its Prometheus metrics to PROMETHEUS_MULTIPROC_DIR and
+# /metrics merges them (see bookings.metrics).
+import os
+import shutil
+import tempfile
+
+wsgi_app = 'config.wsgi:application'
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'coworking-metrics'))
+
+
+def on_starting(server):
+    # Files left by a previous run would be merged into the new counters
+    shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -50,13 +50,15 @@ const SEAT_CONFIG = [
 
 const SeatStatus = {
   AVAILABLE: 'available',
+  PARTIAL: 'partial',
   BOOKED: 'booked',
   SELECTED: 'selected',
   RESTRICTED: 'restricted',
 };
 
-const Seat = ({ config, status, bookedUntil, user, onSelect }) => {
+const Seat = ({ config, status, bookedUntil, busy, user, onSelect }) => {
   const isSelected = status === SeatStatus.SELECTED;
+  const isPartial = status === SeatStatus.PARTIAL;
   const isBooked = status === SeatStatus.BOOKED;
   const isRestricted = status === SeatStatus.RESTRICTED;
 
@@ -64,6 +66,7 @@ const Seat = ({ config, status, bookedUntil, user, onSelect }) => {
   
   const statusClasses = {
     [SeatStatus.AVAILABLE]: "bg-green-100 border-green-500 text-green-700 hover:bg-green-200 hover:shadow-green-200/50",
+    [SeatStatus.PARTIAL]: "bg-amber-100 border-amber-500 text-amber-700 hover:bg-amber-200 hover:shadow-amber-200/50",
     [SeatStatus.SELECTED]: "bg-indigo-600 border-indigo-800 text-white scale-125 shadow-lg shadow-indigo-500/50 z-20",
     [SeatStatus.BOOKED]: "bg-red-100 border-red-300 text-red-300 cursor-not-allowed",
     [SeatStatus.RESTRICTED]: "bg-gray-200 border-gray-300 text-gray-400 cursor-not-allowed opacity-80",
@@ -93,7 +96,9 @@ const Seat = ({ config, status, bookedUntil, user, onSelect }) => {
       id: config.id,
       status,
       label: config.label,
-      bookedUntil: isBooked ? (user ? bookedUntil : 'Occupied') : null
+      bookedUntil: isBooked ? (user ? bookedUntil : 'Occupied') : null,
+      // Partially booked seats can still take an hourly booking outside these intervals
+      busy: isPartial ? busy.map(({ start, end }) => `${start}-${end}`) : null
   };
 
   return (
@@ -108,9 +113,10 @@ const Seat = ({ config, status, bookedUntil, user, onSelect }) => {
     >
       {isSelected && <User className="w-4 h-4" />}
       {isBooked && <span className="text-xs font-bold">✕</span>}
+      {isPartial && <span className="text-xs font-bold">◐</span>}
       {isRestricted && <Lock className="w-3 h-3" />}
       
-      {config.type === 'rect' && !isSelected && !isBooked && (
+      {config.type === 'rect' && !isSelected && !isBooked && !isPartial && (
         <span className="text-[8px] font-bold opacity-70 truncate px-0.5">
             {config.label || config.id}
         </span>
@@ -144,6 +150,7 @@ const OfficeLayout = ({ onSeatSelect, selectedSeat }) => {
       const apiSeat = apiSeats.find(s => s.visual_id === seatId);
       if (selectedSeat === seatId) return { status: SeatStatus.SELECTED };
       if (apiSeat?.status === 'booked') return { status: SeatStatus.BOOKED, bookedUntil: apiSeat.booked_until };
+      if (apiSeat?.status === 'partial') return { status: SeatStatus.PARTIAL, busy: apiSeat.busy || [] };
       return { status: SeatStatus.AVAILABLE };
   };
 
@@ -158,6 +165,9 @@ const OfficeLayout = ({ onSeatSelect, selectedSeat }) => {
         <div className="flex items-center gap-2">
             <div className="w-3 h-3 rounded-full bg-indigo-600 border border-indigo-800"></div> Selected
         </div>
+        <div className="flex items-center gap-2">
+            <div className="w-3 h-3 rounded-full bg-amber-100 border border-amber-500"></div> Partially booked
+        </div>
         <div className="flex items-center gap-2">
             <div className="w-3 h-3 rounded-full bg-red-100 border border-red-300"></div> Booked
         </div>
@@ -177,13 +187,14 @@ const OfficeLayout = ({ onSeatSelect, selectedSeat }) => {
                 <img src="/floor-plan.png" alt="Office Floor Plan" className="w-full h-auto object-contain select-none" draggable={false} />
                 <div className="absolute inset-0">
                   {!loading && SEAT_CONFIG.map((seat) => {
-                      const { status, bookedUntil } = getSeatData(seat.id);
+                      const { status, bookedUntil, busy } = getSeatData(seat.id);
                       return (
                         <Seat
                           key={seat.id}
                           config={seat}
                           status={status}
                           bookedUntil={bookedUntil}
+                          busy={busy}
                           user={user}
                           onSelect={onSeatSelect}
                         />
@@ -208,6 +219,9 @@ const OfficeLayout = ({ onSeatSelect, selectedSeat }) => {
                     <div className="text-xs uppercase opacity-75">
                         {data.status === 'booked' ? (data.bookedUntil || 'Occupied') : data.status}
                     </div>
+                    {data.busy && (
+                        <div className="text-xs opacity-75">Busy: {data.busy.join(', ')}</div>
+                    )}
                 </div>
             );
         }}
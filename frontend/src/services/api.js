@@ -21,9 +21,30 @@ export const getSeats = async (date) => {
   return response.data;
 };
 
+export const getSeatAvailability = async (spaceId, from, to) => {
+  // from/to: YYYY-MM-DD (Jalali). Returns one status code per seat per day.
+  const params = { from, to };
+  if (spaceId) params.space = spaceId;
+
+  const response = await api.get('/seats/availability/', { params });
+  return response.data;
+};
+
 export const createBooking = async (bookingData) => {
   const response = await api.post('/bookings/', bookingData);
   return response.data;
 };
 
+export const autoAssignBooking = async (bookingData) => {
+  // Same fields as createBooking, with space or space_type instead of seat
+  const response = await api.post('/bookings/auto-assign/', bookingData);
+  return response.data;
+};
+
+export const createBookingSeries = async (seriesData) => {
+  // Recurring booking: frequency (daily/weekly/monthly), interval, start/until dates (Jalali)
+  const response = await api.post('/series/', seriesData);
+  return response.data;
+};
+
 export default api;
\ No newline at end of file